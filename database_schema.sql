@@ -49,12 +49,23 @@ CREATE TABLE producto (
     activo BOOLEAN NOT NULL DEFAULT TRUE,
     fecha_creacion DATETIME(6) NOT NULL,
     fecha_modificacion DATETIME(6) NOT NULL,
+    costo_minimo DECIMAL(10, 2) NULL COMMENT 'Costo más bajo entre los proveedores activos',
+    cantidad_proveedores INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Cantidad de proveedores activos',
+    proveedor_costo_minimo_id INT NULL COMMENT 'Proveedor activo con el costo más bajo',
     INDEX idx_clave (clave),
     INDEX idx_tipo_producto (tipo_producto_id),
+    INDEX idx_nombre_id (nombre, id),
+    INDEX idx_fecha_creacion_id (fecha_creacion, id),
+    INDEX idx_costo_minimo (costo_minimo),
+    FULLTEXT INDEX ft_clave_nombre (clave, nombre),
     CONSTRAINT fk_producto_tipo 
         FOREIGN KEY (tipo_producto_id) 
         REFERENCES tipo_producto(id)
-        ON DELETE RESTRICT
+        ON DELETE RESTRICT,
+    CONSTRAINT fk_producto_proveedor_costo_minimo 
+        FOREIGN KEY (proveedor_costo_minimo_id) 
+        REFERENCES proveedor(id)
+        ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- ============================================
@@ -72,6 +83,9 @@ CREATE TABLE producto_proveedor (
     UNIQUE KEY unique_producto_proveedor (producto_id, proveedor_id),
     INDEX idx_producto (producto_id),
     INDEX idx_proveedor (proveedor_id),
+    INDEX idx_producto_activo_costo (producto_id, activo, costo),
+    INDEX idx_proveedor_activo_producto (proveedor_id, activo, producto_id),
+    INDEX idx_proveedor_clave_proveedor (proveedor_id, clave_proveedor),
     CONSTRAINT fk_producto_proveedor_producto 
         FOREIGN KEY (producto_id) 
         REFERENCES producto(id)
@@ -119,6 +133,23 @@ INSERT INTO producto_proveedor (producto_id, proveedor_id, clave_proveedor, cost
 (3, 4, 'FOOD-ARR-001', 42.00, TRUE, NOW(), NOW()),
 (4, 5, 'PLY-ALG-UNI', 120.00, TRUE, NOW(), NOW());
 
+-- Calcular resumen de proveedores activos (equivale a: python manage.py recalcular_resumen)
+UPDATE producto p SET
+    cantidad_proveedores = (
+        SELECT COUNT(*) FROM producto_proveedor pp
+        WHERE pp.producto_id = p.id AND pp.activo = TRUE
+    ),
+    costo_minimo = (
+        SELECT pp.costo FROM producto_proveedor pp
+        WHERE pp.producto_id = p.id AND pp.activo = TRUE
+        ORDER BY pp.costo, pp.id LIMIT 1
+    ),
+    proveedor_costo_minimo_id = (
+        SELECT pp.proveedor_id FROM producto_proveedor pp
+        WHERE pp.producto_id = p.id AND pp.activo = TRUE
+        ORDER BY pp.costo, pp.id LIMIT 1
+    );
+
 -- ============================================
 -- Consultas útiles para verificar
 -- ============================================
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'distribuidora.settings')
+# Lecturas asíncronas en las rutas más consultadas (productos/asincrono.py);
+# PRODUCTOS_VISTAS_ASYNC=0 deja todas las vistas síncronas
+os.environ.setdefault('PRODUCTOS_VISTAS_ASYNC', '1')
 
 application = get_asgi_application()
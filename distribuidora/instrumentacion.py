@@ -0,0 +1,210 @@
+"""
+Instrumentación por petición: consultas SQL, tiempo en base de datos, en
+serializers y en render.
+
+Se activa con ``INSTRUMENTACION_PETICIONES = True``; si está apagada el
+middleware se retira solo (``MiddlewareNotUsed``) y no agrega costo.
+
+Por cada petición:
+
+- encabezado ``Server-Timing`` (visible en las herramientas de desarrollo
+  del navegador) con ``db``, ``serializer``, ``render`` y ``total``
+- una línea de log JSON en el logger ``distribuidora.instrumentacion`` con
+  la vista y acción de DRF, por ejemplo ``ProductoViewSet.list``
+- aviso de SQL repetido (patrón N+1): la misma sentencia ejecutada
+  ``INSTRUMENTACION_UMBRAL_REPETIDAS`` veces o más en la petición
+
+Las mediciones quedan en ``request.instrumentacion`` para otros middlewares.
+"""
+import contextvars
+import json
+import logging
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger('distribuidora.instrumentacion')
+
+_medicion = contextvars.ContextVar('instrumentacion', default=None)
+_serializers_instrumentados = False
+
+
+def vista_y_accion(view_func, metodo):
+    """('ProductoViewSet', 'list') para ViewSets de DRF; (nombre de la función, método) en otro caso"""
+    clase = getattr(view_func, 'cls', None)
+    if clase is None:
+        return getattr(view_func, '__name__', type(view_func).__name__), metodo.lower()
+    acciones = getattr(view_func, 'actions', None) or {}
+    return clase.__name__, acciones.get(metodo.lower(), metodo.lower())
+
+
+def nombre_vista(view_func, metodo):
+    """'ProductoViewSet.list' para ViewSets de DRF; el nombre de la función en otro caso"""
+    if getattr(view_func, 'cls', None) is None:
+        return getattr(view_func, '__name__', type(view_func).__name__)
+    return '.'.join(vista_y_accion(view_func, metodo))
+
+
+def instrumentar_serializers():
+    """
+    Envuelve ``BaseSerializer.data`` para medir el tiempo de serialización.
+    Solo se mide la llamada más externa (ListSerializer.data llama a la base).
+    """
+    global _serializers_instrumentados
+    if _serializers_instrumentados:
+        return
+    from rest_framework.serializers import BaseSerializer
+
+    data_original = BaseSerializer.data
+
+    def data(self):
+        medicion = _medicion.get()
+        if medicion is None or medicion['_serializando']:
+            return data_original.fget(self)
+        medicion['_serializando'] = True
+        inicio = time.perf_counter()
+        try:
+            return data_original.fget(self)
+        finally:
+            medicion['serializer_ms'] += (time.perf_counter() - inicio) * 1000
+            medicion['_serializando'] = False
+
+    BaseSerializer.data = property(data)
+    _serializers_instrumentados = True
+
+
+def instalar_envoltura(envoltura):
+    """
+    Agrega ``envoltura`` (un execute_wrapper) a las conexiones ya creadas en
+    este hilo y a todas las que se abran después, en cualquier hilo.
+
+    Con el ORM asíncrono las consultas corren en hilos distintos al de la
+    petición, así que la envoltura no se instala por petición: queda fija en
+    cada conexión y lee la petición actual de un ContextVar (que
+    ``sync_to_async`` copia al hilo).
+    """
+    def agregar(connection, **kwargs):
+        if envoltura not in connection.execute_wrappers:
+            connection.execute_wrappers.append(envoltura)
+
+    for connection in connections.all(initialized_only=True):
+        agregar(connection)
+    connection_created.connect(
+        agregar, weak=False, dispatch_uid=f'{envoltura.__module__}.{envoltura.__qualname__}'
+    )
+
+
+def medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if medicion is not None:
+            medicion['db_ms'] += (time.perf_counter() - inicio) * 1000
+            medicion['consultas'] += 1
+            medicion['_sentencias'][sql] += 1
+
+
+class InstrumentacionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION_PETICIONES', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.umbral_repetidas = getattr(settings, 'INSTRUMENTACION_UMBRAL_REPETIDAS', 5)
+        instrumentar_serializers()
+        instalar_envoltura(medir_consulta)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        medicion, token = self.iniciar(request)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.terminar(request, response, medicion, inicio)
+
+    async def __acall__(self, request):
+        medicion, token = self.iniciar(request)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.terminar(request, response, medicion, inicio)
+
+    def iniciar(self, request):
+        medicion = {
+            'vista': None,
+            'consultas': 0,
+            'db_ms': 0.0,
+            'serializer_ms': 0.0,
+            'render_ms': 0.0,
+            '_serializando': False,
+            '_sentencias': Counter(),
+        }
+        request.instrumentacion = medicion
+        return medicion, _medicion.set(medicion)
+
+    def terminar(self, request, response, medicion, inicio):
+        medicion['total_ms'] = (time.perf_counter() - inicio) * 1000
+
+        repetidas = [
+            {'sql': sql, 'veces': veces}
+            for sql, veces in medicion.pop('_sentencias').most_common()
+            if veces >= self.umbral_repetidas
+        ]
+        medicion['repetidas'] = repetidas
+        del medicion['_serializando']
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={medicion["db_ms"]:.1f};desc="{medicion["consultas"]} consultas"',
+            f'serializer;dur={medicion["serializer_ms"]:.1f}',
+            f'render;dur={medicion["render_ms"]:.1f}',
+            f'total;dur={medicion["total_ms"]:.1f}',
+        ))
+
+        registro = {
+            'vista': medicion['vista'] or request.path,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'total_ms': round(medicion['total_ms'], 2),
+            'db_ms': round(medicion['db_ms'], 2),
+            'consultas': medicion['consultas'],
+            'serializer_ms': round(medicion['serializer_ms'], 2),
+            'render_ms': round(medicion['render_ms'], 2),
+        }
+        if repetidas:
+            registro['repetidas'] = repetidas
+            logger.warning(json.dumps(registro, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(registro, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.instrumentacion['vista'] = nombre_vista(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # Las respuestas de DRF se renderizan después de este hook
+        inicio = time.perf_counter()
+
+        def fin_render(respuesta):
+            request.instrumentacion['render_ms'] += (time.perf_counter() - inicio) * 1000
+
+        response.add_post_render_callback(fin_render)
+        return response
@@ -0,0 +1,390 @@
+"""
+Métricas en formato de texto de Prometheus en ``/metrics``.
+
+Por petición, con etiquetas ``viewset`` y ``action`` (por ejemplo
+``ProductoViewSet`` / ``proveedores``):
+
+- ``distribuidora_http_request_duration_seconds``: histograma de latencia
+- ``distribuidora_http_request_db_queries``: histograma de consultas SQL
+- ``distribuidora_http_response_size_bytes``: histograma del tamaño del cuerpo
+- ``distribuidora_http_errors_total``: respuestas 4xx/5xx, con ``status``
+
+Y por cache (``respuestas``, ``facetas``, ``referencia``):
+``distribuidora_cache_hits_total``, ``distribuidora_cache_misses_total`` y
+``distribuidora_cache_hit_ratio``.
+
+Con réplicas de lectura (distribuidora/replicas.py),
+``distribuidora_db_read_requests_total`` cuenta las peticiones seguras por
+la base (``database``) que las atendió.
+
+Con el pool de conexiones de MySQL (distribuidora/mysql_pool), por base
+(``database``): ``distribuidora_db_pool_connections`` (medidor, con
+``state`` ``idle``/``in_use``), ``distribuidora_db_pool_waiting`` (hilos
+esperando una conexión), ``distribuidora_db_pool_wait_seconds``
+(histograma de la espera al tomar una conexión) y
+``distribuidora_db_pool_timeouts_total``.
+
+Cada proceso acumula en memoria y, si ``METRICAS_DIRECTORIO`` está definido,
+vuelca sus valores cada ``METRICAS_INTERVALO_ESCRITURA`` segundos a
+``metricas_<pid>.json`` en ese directorio (escritura atómica, un archivo por
+proceso). ``/metrics`` suma los archivos de todos los procesos (los medidores,
+solo de los procesos que siguen vivos), así que con
+varios workers de gunicorn/uvicorn cualquiera de ellos responde el total. El
+directorio debe vaciarse al desplegar, igual que el modo multiproceso de
+prometheus_client.
+
+Registrar una observación es un bisect y unas sumas bajo un candado.
+"""
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import HttpResponse
+
+from .instrumentacion import instalar_envoltura, vista_y_accion
+
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BUCKETS_TAMANO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+BUCKETS_ESPERA = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+HISTOGRAMAS = {
+    'distribuidora_http_request_duration_seconds': ('Latencia de las peticiones en segundos', BUCKETS_LATENCIA),
+    'distribuidora_http_request_db_queries': ('Consultas SQL por petición', BUCKETS_CONSULTAS),
+    'distribuidora_http_response_size_bytes': ('Tamaño del cuerpo de la respuesta en bytes', BUCKETS_TAMANO),
+    'distribuidora_db_pool_wait_seconds': ('Espera para tomar una conexión del pool en segundos', BUCKETS_ESPERA),
+}
+CONTADORES = {
+    'distribuidora_http_errors_total': 'Respuestas con estado 4xx o 5xx',
+    'distribuidora_cache_hits_total': 'Aciertos de cache',
+    'distribuidora_cache_misses_total': 'Fallos de cache',
+    'distribuidora_db_read_requests_total': 'Peticiones de lectura por base de datos que las atiende',
+    'distribuidora_db_pool_timeouts_total': 'Esperas por una conexión del pool que vencieron',
+}
+MEDIDORES = {
+    'distribuidora_db_pool_connections': 'Conexiones abiertas del pool por estado',
+    'distribuidora_db_pool_waiting': 'Hilos esperando una conexión del pool',
+}
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+_consultas = contextvars.ContextVar('metricas_consultas', default=None)
+
+
+def desde_json(datos):
+    """``(histogramas, contadores, medidores)`` a partir del contenido de un archivo de proceso"""
+    histogramas = {
+        (nombre, tuple(map(tuple, etiquetas))): serie
+        for nombre, etiquetas, serie in datos.get('histogramas', ()) if nombre in HISTOGRAMAS
+    }
+    contadores = {
+        (nombre, tuple(map(tuple, etiquetas))): valor
+        for nombre, etiquetas, valor in datos.get('contadores', ()) if nombre in CONTADORES
+    }
+    medidores = {
+        (nombre, tuple(map(tuple, etiquetas))): valor
+        for nombre, etiquetas, valor in datos.get('medidores', ()) if nombre in MEDIDORES
+    }
+    return histogramas, contadores, medidores
+
+
+def proceso_vivo(pid):
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registro:
+    """Valores de un proceso; las etiquetas son tuplas ordenadas de pares"""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.pid = os.getpid()
+        self.histogramas = {}
+        self.contadores = {}
+        self.medidores = {}
+        self.ultima_escritura = time.monotonic()
+        directorio = self.directorio()
+        if directorio:
+            # Un proceso anterior con el mismo pid: se continúa desde sus
+            # valores para que los contadores no retrocedan
+            try:
+                with open(self.archivo(directorio), encoding='utf-8') as archivo:
+                    self.cargar(json.load(archivo))
+            except (OSError, ValueError):
+                pass
+
+    @staticmethod
+    def directorio():
+        return getattr(settings, 'METRICAS_DIRECTORIO', '')
+
+    def archivo(self, directorio):
+        return os.path.join(directorio, f'metricas_{self.pid}.json')
+
+    def observar(self, nombre, etiquetas, valor):
+        buckets = HISTOGRAMAS[nombre][1]
+        with self._candado:
+            if self.pid != os.getpid():
+                # Proceso hijo tras fork: no hereda las cuentas del padre
+                self._reiniciar()
+            serie = self.histogramas.get((nombre, etiquetas))
+            if serie is None:
+                # Un contador por bucket más +Inf, luego suma
+                serie = self.histogramas[(nombre, etiquetas)] = [0] * (len(buckets) + 1) + [0]
+            serie[bisect_left(buckets, valor)] += 1
+            serie[-1] += valor
+        self.escribir()
+
+    def incrementar(self, nombre, etiquetas, valor=1):
+        with self._candado:
+            if self.pid != os.getpid():
+                self._reiniciar()
+            self.contadores[(nombre, etiquetas)] = self.contadores.get((nombre, etiquetas), 0) + valor
+        self.escribir()
+
+    def fijar(self, nombre, etiquetas, valor):
+        with self._candado:
+            if self.pid != os.getpid():
+                self._reiniciar()
+            self.medidores[(nombre, etiquetas)] = valor
+        self.escribir()
+
+    def volcar(self):
+        return {
+            'histogramas': [[nombre, list(etiquetas), serie] for (nombre, etiquetas), serie in self.histogramas.items()],
+            'contadores': [[nombre, list(etiquetas), valor] for (nombre, etiquetas), valor in self.contadores.items()],
+            'medidores': [[nombre, list(etiquetas), valor] for (nombre, etiquetas), valor in self.medidores.items()],
+        }
+
+    def cargar(self, datos):
+        # Los medidores de un proceso anterior no describen a este
+        histogramas, contadores, _ = desde_json(datos)
+        self.histogramas.update(histogramas)
+        self.contadores.update(contadores)
+
+    def escribir(self, forzar=False):
+        directorio = self.directorio()
+        if not directorio:
+            return
+        intervalo = getattr(settings, 'METRICAS_INTERVALO_ESCRITURA', 1)
+        ahora = time.monotonic()
+        if not forzar and ahora - self.ultima_escritura < intervalo:
+            return
+        with self._candado:
+            self.ultima_escritura = ahora
+            contenido = json.dumps(self.volcar())
+        os.makedirs(directorio, exist_ok=True)
+        destino = self.archivo(directorio)
+        temporal = f'{destino}.{threading.get_ident()}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, destino)
+
+
+_registro = Registro()
+
+
+def observar(nombre, valor, **etiquetas):
+    _registro.observar(nombre, tuple(sorted(etiquetas.items())), valor)
+
+
+def incrementar(nombre, valor=1, **etiquetas):
+    _registro.incrementar(nombre, tuple(sorted(etiquetas.items())), valor)
+
+
+def fijar(nombre, valor, **etiquetas):
+    _registro.fijar(nombre, tuple(sorted(etiquetas.items())), valor)
+
+
+def registrar_cache(cache, acierto):
+    """Acierto o fallo de uno de los caches de la aplicación"""
+    nombre = 'distribuidora_cache_hits_total' if acierto else 'distribuidora_cache_misses_total'
+    incrementar(nombre, cache=cache)
+
+
+def recolectar():
+    """Suma los valores de todos los procesos (o solo del actual sin directorio)"""
+    directorio = _registro.directorio()
+    if not directorio:
+        with _registro._candado:
+            return {
+                'histogramas': {clave: list(serie) for clave, serie in _registro.histogramas.items()},
+                'contadores': dict(_registro.contadores),
+                'medidores': dict(_registro.medidores),
+            }
+
+    _registro.escribir(forzar=True)
+    histogramas = {}
+    contadores = {}
+    medidores = {}
+    for ruta in glob.glob(os.path.join(directorio, 'metricas_*.json')):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                proceso_histogramas, proceso_contadores, proceso_medidores = desde_json(json.load(archivo))
+            pid = int(os.path.basename(ruta)[len('metricas_'):-len('.json')])
+        except (OSError, ValueError):
+            # Archivo ajeno o dañado; los de los procesos se escriben atómicamente
+            continue
+        for clave, serie in proceso_histogramas.items():
+            acumulada = histogramas.setdefault(clave, [0] * len(serie))
+            for i, valor in enumerate(serie):
+                acumulada[i] += valor
+        for clave, valor in proceso_contadores.items():
+            contadores[clave] = contadores.get(clave, 0) + valor
+        if pid == os.getpid() or proceso_vivo(pid):
+            for clave, valor in proceso_medidores.items():
+                medidores[clave] = medidores.get(clave, 0) + valor
+    return {'histogramas': histogramas, 'contadores': contadores, 'medidores': medidores}
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(nombre, str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for nombre, valor in pares
+    ) + '}'
+
+
+def _numero(valor):
+    if isinstance(valor, float) and not valor.is_integer():
+        return repr(valor)
+    return str(int(valor))
+
+
+def exposicion(datos):
+    """Texto en el formato de exposición de Prometheus (versión 0.0.4)"""
+    lineas = []
+    for nombre, (ayuda, buckets) in HISTOGRAMAS.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} histogram')
+        for etiquetas, serie in sorted(
+            (etiquetas, serie) for (metrica, etiquetas), serie in datos['histogramas'].items() if metrica == nombre
+        ):
+            acumulado = 0
+            for limite, cuenta in zip(buckets + ('+Inf',), serie):
+                acumulado += cuenta
+                le = limite if limite == '+Inf' else _numero(float(limite))
+                lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", le),))} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(serie[-1])}')
+            lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {acumulado}')
+
+    for nombre, ayuda in CONTADORES.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} counter')
+        for etiquetas, valor in sorted(
+            (etiquetas, valor) for (metrica, etiquetas), valor in datos['contadores'].items() if metrica == nombre
+        ):
+            lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+
+    for nombre, ayuda in MEDIDORES.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} gauge')
+        for etiquetas, valor in sorted(
+            (etiquetas, valor) for (metrica, etiquetas), valor in datos.get('medidores', {}).items() if metrica == nombre
+        ):
+            lineas.append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+
+    lineas.append('# HELP distribuidora_cache_hit_ratio Aciertos / (aciertos + fallos) por cache')
+    lineas.append('# TYPE distribuidora_cache_hit_ratio gauge')
+    caches = {}
+    for (metrica, etiquetas), valor in datos['contadores'].items():
+        if metrica in ('distribuidora_cache_hits_total', 'distribuidora_cache_misses_total'):
+            aciertos, fallos = caches.get(etiquetas, (0, 0))
+            if metrica == 'distribuidora_cache_hits_total':
+                aciertos += valor
+            else:
+                fallos += valor
+            caches[etiquetas] = (aciertos, fallos)
+    for etiquetas, (aciertos, fallos) in sorted(caches.items()):
+        lineas.append(f'distribuidora_cache_hit_ratio{_etiquetas(etiquetas)} {_numero(aciertos / (aciertos + fallos))}')
+    return '\n'.join(lineas) + '\n'
+
+
+def vista_metricas(request):
+    """
+    GET /metrics
+    Solo desde ``METRICAS_IPS_PERMITIDAS`` (el agente local de Prometheus).
+    """
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICAS_IPS_PERMITIDAS', ('127.0.0.1', '::1')):
+        raise PermissionDenied
+    return HttpResponse(exposicion(recolectar()), content_type=TIPO_CONTENIDO)
+
+
+def contar_consulta(execute, sql, params, many, context):
+    consultas = _consultas.get()
+    if consultas is not None:
+        # append es atómico: las consultas concurrentes de una vista
+        # asíncrona corren en varios hilos a la vez
+        consultas.append(None)
+    return execute(sql, params, many, context)
+
+
+class MetricasMiddleware:
+    """Va primero en MIDDLEWARE para medir la petición completa"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_ACTIVAS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instalar_envoltura(contar_consulta)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.metricas_vista = ('sin_vista', request.method.lower())
+        consultas = []
+        token = _consultas.set(consultas)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _consultas.reset(token)
+        return self.registrar(request, response, time.perf_counter() - inicio, len(consultas))
+
+    async def __acall__(self, request):
+        request.metricas_vista = ('sin_vista', request.method.lower())
+        consultas = []
+        token = _consultas.set(consultas)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _consultas.reset(token)
+        return self.registrar(request, response, time.perf_counter() - inicio, len(consultas))
+
+    def registrar(self, request, response, duracion, consultas):
+        viewset, accion = request.metricas_vista
+        etiquetas = {'viewset': viewset, 'action': accion}
+        observar('distribuidora_http_request_duration_seconds', duracion, **etiquetas)
+        observar('distribuidora_http_request_db_queries', consultas, **etiquetas)
+        if not response.streaming:
+            observar('distribuidora_http_response_size_bytes', len(response.content), **etiquetas)
+        if response.status_code >= 400:
+            incrementar('distribuidora_http_errors_total', status=str(response.status_code), **etiquetas)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metricas_vista = vista_y_accion(view_func, request.method)
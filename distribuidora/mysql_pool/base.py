@@ -0,0 +1,108 @@
+"""
+Backend de MySQL con pool de conexiones por proceso.
+
+Misma configuración que ``django.db.backends.mysql`` con
+``'ENGINE': 'distribuidora.mysql_pool'`` y la clave ``POOL``::
+
+    'POOL': {
+        'MINIMO': 2,          # abiertas aunque no se usen
+        'MAXIMO': 20,         # tope por proceso (y por alias)
+        'VIDA_MAXIMA': 1800,  # segundos; al vencer se cierra en vez de volver al pool
+        'ESPERA_MAXIMA': 10,  # segundos esperando una libre; luego OperationalError
+        'VERIFICAR': True,    # ping() al tomarla del pool
+    }
+
+Cada hilo sigue teniendo su conexión en ``connections``, pero al cerrarla
+(fin de la petición con ``CONN_MAX_AGE = 0``, o al terminar una consulta de
+``en_paralelo``) vuelve al pool, y la siguiente se toma de ahí. Una conexión
+que se devuelve dentro de una transacción se revierte antes. Las métricas
+del pool se publican en distribuidora/metricas.py.
+"""
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.mysql import base
+from django.db.backends.base.base import NO_DB_ALIAS
+
+from .pool import PoolConexiones
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # alias -> (clave de configuración, pool); compartido por todos los hilos
+    _pools = {}
+    _candado_pools = threading.Lock()
+
+    @property
+    def pool(self):
+        configuracion = self.settings_dict.get('POOL')
+        if self.alias == NO_DB_ALIAS or not configuracion:
+            return None
+        # Un proceso hijo (fork) o un cambio de base (la base de pruebas)
+        # necesitan un pool propio
+        clave = (
+            os.getpid(),
+            *(self.settings_dict[campo] for campo in ('NAME', 'USER', 'HOST', 'PORT')),
+        )
+        registrado = self._pools.get(self.alias)
+        if registrado is not None and registrado[0] == clave:
+            return registrado[1]
+
+        with self._candado_pools:
+            registrado = self._pools.get(self.alias)
+            if registrado is not None and registrado[0] == clave:
+                return registrado[1]
+            if self.settings_dict.get('CONN_MAX_AGE', 0) != 0:
+                raise ImproperlyConfigured('El pool de conexiones requiere CONN_MAX_AGE = 0')
+            if registrado is not None and registrado[0][0] == os.getpid():
+                registrado[1].cerrar()
+            pool = self.crear_pool(configuracion)
+            self._pools[self.alias] = (clave, pool)
+        pool.llenar()
+        return pool
+
+    def crear_pool(self, configuracion):
+        parametros = self.get_connection_params()
+        conectar = super().get_new_connection
+        return PoolConexiones(
+            lambda: conectar(parametros),
+            nombre=self.alias,
+            minimo=configuracion.get('MINIMO', 0),
+            maximo=configuracion.get('MAXIMO', 10),
+            vida_maxima=configuracion.get('VIDA_MAXIMA'),
+            espera_maxima=configuracion.get('ESPERA_MAXIMA', 30),
+            verificar=(lambda conexion: conexion.ping()) if configuracion.get('VERIFICAR', True) else None,
+        )
+
+    def close_pool(self):
+        with self._candado_pools:
+            registrado = self._pools.pop(self.alias, None)
+        if registrado is not None:
+            registrado[1].cerrar()
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        return pool.obtener()
+
+    def _close(self):
+        pool = self.pool
+        if self.connection is None or pool is None:
+            return super()._close()
+        descartar = False
+        if self.in_atomic_block or not self.autocommit:
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                descartar = True
+        with self.wrap_database_errors:
+            pool.devolver(self.connection, descartar=descartar)
+        # Ya pertenece al pool aunque la transacción siga marcada
+        self.connection = None
+
+    def close_if_health_check_failed(self):
+        if self.pool is not None:
+            # El pool verifica cada conexión al entregarla
+            return
+        return super().close_if_health_check_failed()
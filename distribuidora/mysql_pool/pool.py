@@ -0,0 +1,203 @@
+"""
+Pool de conexiones DB-API independiente del driver.
+
+``PoolConexiones(conectar, ...)`` guarda hasta ``maximo`` conexiones
+abiertas por ``conectar()``:
+
+- ``obtener()`` entrega la libre usada más recientemente (verificada con
+  ``verificar(conexion)``; si falla se descarta y se toma otra), abre una
+  nueva si hay lugar, o espera a que se devuelva una hasta
+  ``espera_maxima`` segundos y luego lanza ``PoolAgotado``.
+- ``devolver(conexion)`` la deja libre, o la cierra si superó
+  ``vida_maxima`` segundos desde que se abrió o si se pide descartarla.
+- Se mantienen al menos ``minimo`` conexiones abiertas: se abren al crear
+  el pool con ``llenar()`` y se reponen al devolver.
+
+Cada cambio publica en distribuidora/metricas.py las conexiones libres y en
+uso, los hilos esperando, la espera de cada ``obtener()`` y las esperas
+vencidas, con la etiqueta ``database``.
+"""
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+
+from distribuidora.metricas import fijar, incrementar, observar
+
+
+class PoolAgotado(OperationalError):
+    """Ninguna conexión se liberó dentro de la espera máxima"""
+
+
+class PoolConexiones:
+
+    def __init__(self, conectar, nombre='default', minimo=0, maximo=10, vida_maxima=None,
+                 espera_maxima=30, verificar=None, cerrar=None):
+        if maximo < 1 or not 0 <= minimo <= maximo:
+            raise ValueError('El pool necesita 0 <= minimo <= maximo y maximo >= 1')
+        self.conectar = conectar
+        self.nombre = nombre
+        self.minimo = minimo
+        self.maximo = maximo
+        self.vida_maxima = vida_maxima
+        self.espera_maxima = espera_maxima
+        self.verificar = verificar
+        self.cerrar_conexion = cerrar or (lambda conexion: conexion.close())
+
+        self._condicion = threading.Condition()
+        # (conexión, momento en que se abrió); se toma del final (LIFO)
+        self._libres = deque()
+        # id(conexión) -> momento en que se abrió
+        self._en_uso = {}
+        # Abiertas más las que se están abriendo
+        self._total = 0
+        self._esperando = 0
+        self._cerrado = False
+
+    def obtener(self):
+        inicio = time.monotonic()
+        limite = inicio + self.espera_maxima
+        while True:
+            conexion, abierta = self._reservar(limite)
+            if conexion is None:
+                conexion, abierta = self._abrir(), time.monotonic()
+                break
+            if self._sana(conexion):
+                break
+            self._descartar(conexion)
+
+        with self._condicion:
+            self._en_uso[id(conexion)] = abierta
+        observar('distribuidora_db_pool_wait_seconds', time.monotonic() - inicio, database=self.nombre)
+        self._publicar()
+        return conexion
+
+    def devolver(self, conexion, descartar=False):
+        with self._condicion:
+            abierta = self._en_uso.pop(id(conexion), None)
+            cerrar = descartar or self._cerrado or abierta is None or self._vencida(abierta)
+            if abierta is not None:
+                if cerrar:
+                    self._total -= 1
+                else:
+                    self._libres.append((conexion, abierta))
+                self._condicion.notify()
+        if cerrar:
+            self._cerrar(conexion)
+            self.llenar()
+        self._publicar()
+
+    def llenar(self):
+        """Abre conexiones libres hasta tener ``minimo`` abiertas"""
+        while True:
+            with self._condicion:
+                if self._cerrado or self._total >= self.minimo:
+                    return
+                self._total += 1
+            try:
+                conexion = self._abrir()
+            except Exception:
+                # El mínimo se repone en la siguiente devolución
+                return
+            with self._condicion:
+                self._libres.append((conexion, time.monotonic()))
+                self._condicion.notify()
+
+    def cerrar(self):
+        """Cierra las libres; las que están en uso se cierran al devolverse"""
+        with self._condicion:
+            self._cerrado = True
+            libres = [conexion for conexion, _ in self._libres]
+            self._libres.clear()
+            self._total -= len(libres)
+            self._condicion.notify_all()
+        for conexion in libres:
+            self._cerrar(conexion)
+        self._publicar()
+
+    def estado(self):
+        with self._condicion:
+            return {
+                'libres': len(self._libres),
+                'en_uso': len(self._en_uso),
+                'esperando': self._esperando,
+                'maximo': self.maximo,
+            }
+
+    def _reservar(self, limite):
+        """
+        Una conexión libre vigente, o ``(None, None)`` con un lugar reservado
+        para abrir una nueva.
+        """
+        vencidas = []
+        try:
+            with self._condicion:
+                while True:
+                    if self._cerrado:
+                        raise OperationalError(f'El pool de conexiones de {self.nombre} está cerrado')
+                    while self._libres:
+                        conexion, abierta = self._libres.pop()
+                        if not self._vencida(abierta):
+                            return conexion, abierta
+                        self._total -= 1
+                        vencidas.append(conexion)
+                    if self._total < self.maximo:
+                        self._total += 1
+                        return None, None
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        incrementar('distribuidora_db_pool_timeouts_total', database=self.nombre)
+                        raise PoolAgotado(
+                            f'Sin conexiones libres en el pool de {self.nombre} después de '
+                            f'{self.espera_maxima} s ({self.maximo} en uso)'
+                        )
+                    self._esperando += 1
+                    try:
+                        self._condicion.wait(restante)
+                    finally:
+                        self._esperando -= 1
+        finally:
+            for conexion in vencidas:
+                self._cerrar(conexion)
+
+    def _abrir(self):
+        """Abre una conexión en un lugar ya reservado; si falla, libera el lugar"""
+        try:
+            return self.conectar()
+        except BaseException:
+            with self._condicion:
+                self._total -= 1
+                self._condicion.notify()
+            raise
+
+    def _sana(self, conexion):
+        if self.verificar is None:
+            return True
+        try:
+            return self.verificar(conexion) is not False
+        except Exception:
+            return False
+
+    def _descartar(self, conexion):
+        with self._condicion:
+            self._total -= 1
+            self._condicion.notify()
+        self._cerrar(conexion)
+
+    def _vencida(self, abierta):
+        return self.vida_maxima is not None and time.monotonic() - abierta >= self.vida_maxima
+
+    def _cerrar(self, conexion):
+        try:
+            self.cerrar_conexion(conexion)
+        except Exception:
+            # Conexión ya rota: no hay nada más que liberar
+            pass
+
+    def _publicar(self):
+        with self._condicion:
+            libres, en_uso, esperando = len(self._libres), len(self._en_uso), self._esperando
+        fijar('distribuidora_db_pool_connections', libres, database=self.nombre, state='idle')
+        fijar('distribuidora_db_pool_connections', en_uso, database=self.nombre, state='in_use')
+        fijar('distribuidora_db_pool_waiting', esperando, database=self.nombre)
@@ -0,0 +1,176 @@
+"""
+Perfilado bajo demanda de una petición real con cProfile.
+
+Un usuario staff agrega ``?_profile=1`` (o el encabezado ``X-Profile: 1``) a
+cualquier endpoint de la API. La petición corre bajo cProfile y se escriben
+dos archivos en ``PERFILADO_DIRECTORIO``:
+
+- ``<nombre>.prof``: estadísticas de pstats (snakeviz, ``python -m pstats``)
+- ``<nombre>.folded``: pilas colapsadas para flamegraph.pl / speedscope
+
+La respuesta indica las rutas en los encabezados ``X-Perfil-Pstats`` y
+``X-Perfil-Folded``. Sin la marca, el middleware solo revisa un parámetro y
+un encabezado.
+
+cProfile registra llamadas entre pares de funciones, no pilas completas: las
+pilas colapsadas reparten el tiempo de cada función entre sus llamadores en
+proporción a lo que cada uno aportó. Las ramas por debajo de
+``FRACCION_MINIMA`` del tiempo total se descartan: en Django el número de
+caminos posibles por el grafo de llamadas crece exponencialmente.
+
+Solo se perfila bajo WSGI (o ``runserver``). Bajo ASGI la cadena de
+middlewares es asíncrona y cProfile mediría el hilo entero del event loop:
+el informe mezclaría las corrutinas de otras peticiones que corren mientras
+esta espera, y le mostraría al staff consultas y vistas de otros usuarios.
+Ahí la petición se atiende sin perfilar y la respuesta lo indica con
+``X-Perfil-Omitido``.
+"""
+import cProfile
+import os
+import pstats
+import re
+import uuid
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+PARAMETRO = '_profile'
+ENCABEZADO = 'X-Profile'
+ENCABEZADO_OMITIDO = 'X-Perfil-Omitido'
+PROFUNDIDAD_MAXIMA = 200
+FRACCION_MINIMA = 0.0001
+
+
+def nombre_funcion(funcion):
+    archivo, linea, nombre = funcion
+    if archivo == '~':
+        # Funciones integradas: '<built-in method time.sleep>'
+        return nombre
+    return f'{os.path.basename(archivo)}:{linea}:{nombre}'
+
+
+def pilas_colapsadas(estadisticas):
+    """
+    ``{'raiz;...;funcion': microsegundos}`` a partir de ``pstats.Stats``.
+
+    El tiempo de cada nodo se reparte entre su tiempo propio y sus llamados en
+    proporción a lo medido; así la suma de todas las pilas es el tiempo total
+    aunque haya recursión (cProfile cuenta varias veces las aristas recursivas).
+    """
+    llamados = {}
+    for funcion, (_, _, _, _, llamadores) in estadisticas.stats.items():
+        for llamador, (_, _, _, acumulado) in llamadores.items():
+            llamados.setdefault(llamador, []).append((funcion, acumulado))
+
+    pilas = {}
+    minimo = estadisticas.total_tt * FRACCION_MINIMA
+
+    def recorrer(funcion, tiempo, pila):
+        propio = estadisticas.stats[funcion][2]
+        pila = pila + (nombre_funcion(funcion),)
+        hijos = []
+        if len(pila) < PROFUNDIDAD_MAXIMA:
+            # Recursión: el tiempo ya está contado en el llamado original
+            hijos = [
+                (llamado, peso) for llamado, peso in llamados.get(funcion, ())
+                if nombre_funcion(llamado) not in pila
+            ]
+        total = propio + sum(peso for _, peso in hijos)
+        escala = tiempo / total if total else 0
+        clave = ';'.join(pila)
+        pilas[clave] = pilas.get(clave, 0) + (propio * escala if total else tiempo)
+        for llamado, peso in hijos:
+            if peso * escala >= minimo:
+                recorrer(llamado, peso * escala, pila)
+
+    # Raíces: las llamadas sin llamador perfilado (las que hizo el frame que
+    # activó el perfil). Una misma función puede ser raíz y también tener
+    # llamadores, p. ej. el get_response que encadena los middlewares.
+    raices = []
+    for funcion, (_, llamadas, _, acumulado, llamadores) in estadisticas.stats.items():
+        sin_llamador = llamadas - sum(datos[1] for datos in llamadores.values())
+        if sin_llamador > 0 and llamadas:
+            raices.append((funcion, acumulado * sin_llamador / llamadas))
+    total_raices = sum(peso for _, peso in raices)
+    for funcion, peso in raices:
+        if total_raices:
+            recorrer(funcion, estadisticas.total_tt * peso / total_raices, ())
+
+    return {pila: round(segundos * 1e6) for pila, segundos in pilas.items() if segundos * 1e6 >= 1}
+
+
+def escribir_pilas(estadisticas, ruta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        for pila, microsegundos in sorted(pilas_colapsadas(estadisticas).items()):
+            archivo.write(f'{pila} {microsegundos}\n')
+
+
+class PerfiladoMiddleware:
+    """
+    Debe ir después de AuthenticationMiddleware (usa ``request.user``).
+
+    En modo asíncrono (ASGI) no perfila: responde con ``X-Perfil-Omitido``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if PARAMETRO not in request.GET and ENCABEZADO not in request.headers:
+            return self.get_response(request)
+        if not self.debe_perfilar(request, getattr(request, 'user', None)):
+            return self.get_response(request)
+
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            perfil.disable()
+        return self.agregar_rutas(response, *self.guardar(request, perfil))
+
+    async def __acall__(self, request):
+        if PARAMETRO not in request.GET and ENCABEZADO not in request.headers:
+            return await self.get_response(request)
+        usuario = await request.auser() if hasattr(request, 'auser') else None
+        response = await self.get_response(request)
+        if self.debe_perfilar(request, usuario):
+            # cProfile es por hilo y el event loop es compartido (ver el docstring del módulo)
+            response[ENCABEZADO_OMITIDO] = 'asincrono'
+        return response
+
+    def debe_perfilar(self, request, usuario):
+        marca = request.GET.get(PARAMETRO) or request.headers.get(ENCABEZADO)
+        if marca not in ('1', 'true'):
+            return False
+        if not any(request.path.startswith(prefijo) for prefijo in settings.PERFILADO_RUTAS):
+            return False
+        return bool(usuario and usuario.is_staff)
+
+    def agregar_rutas(self, response, pstats_ruta, folded_ruta):
+        response['X-Perfil-Pstats'] = pstats_ruta
+        response['X-Perfil-Folded'] = folded_ruta
+        return response
+
+    def guardar(self, request, perfil):
+        directorio = str(settings.PERFILADO_DIRECTORIO)
+        os.makedirs(directorio, exist_ok=True)
+        ruta = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'raiz'
+        nombre = '{:%Y%m%d-%H%M%S}_{}_{}_{}'.format(
+            datetime.now(), request.method, ruta[:80], uuid.uuid4().hex[:6]
+        )
+        base = os.path.join(directorio, nombre)
+
+        estadisticas = pstats.Stats(perfil)
+        estadisticas.dump_stats(base + '.prof')
+        escribir_pilas(estadisticas, base + '.folded')
+        return base + '.prof', base + '.folded'
@@ -0,0 +1,194 @@
+"""
+Réplicas de lectura para los modelos de ``productos``.
+
+``REPLICAS_LECTURA`` lista alias de ``DATABASES`` que atienden las lecturas
+de las peticiones GET/HEAD/OPTIONS; vacío deja todo en ``default`` y el
+router y el middleware no hacen nada.
+
+- ``ReplicasMiddleware`` elige una réplica al empezar cada petición segura:
+  ``REPLICAS_SELECCION = 'round_robin'`` las turna y ``'menor_latencia'``
+  toma la de menor promedio móvil de duración de consultas (una de cada
+  ``MUESTREO_LATENCIA`` peticiones se turna igual, para refrescar la
+  medición de las demás).
+- ``ReplicasRouter`` (en ``DATABASE_ROUTERS``) manda las lecturas de
+  ``productos`` a esa réplica y todas las escrituras a ``default``.
+
+Lectura después de escritura:
+
+- dentro de una petición, desde la primera escritura las lecturas van a
+  ``default``;
+- un cliente que escribió lee de ``default`` durante
+  ``REPLICAS_PEGAJOSIDAD`` segundos: la respuesta le deja la cookie
+  ``replicas_primaria`` con la hora hasta la que aplica.
+
+El cache de respuestas y el de datos de referencia de ``productos`` tienen
+en cuenta ``alias_lectura()``: lo leído de una réplica no se sirve a quien
+debe leer de ``default``.
+
+Las peticiones no seguras, los comandos de management y el shell leen de
+``default``. El estado de la petición va en un ContextVar, así que llega a
+los hilos de ``sync_to_async`` y de ``en_paralelo`` (productos/asincrono.py).
+"""
+import contextvars
+import itertools
+import math
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+from .instrumentacion import instalar_envoltura
+from .metricas import incrementar
+
+
+APPS_REPLICADAS = ('productos',)
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+COOKIE_PRIMARIA = 'replicas_primaria'
+
+# Peso de la última consulta en el promedio móvil de latencia por réplica
+PESO_LATENCIA = 0.2
+MUESTREO_LATENCIA = 10
+
+_peticion = contextvars.ContextVar('replicas_peticion', default=None)
+_turno = itertools.count()
+_latencias = {}
+
+
+class EstadoPeticion:
+    """Réplica elegida para la petición (None: primaria) y si ya escribió"""
+    __slots__ = ('replica', 'escribio')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.escribio = False
+
+
+def replicas():
+    return list(getattr(settings, 'REPLICAS_LECTURA', ()))
+
+
+def elegir_replica():
+    aliases = replicas()
+    if not aliases:
+        return None
+    turno = next(_turno)
+    if getattr(settings, 'REPLICAS_SELECCION', 'round_robin') == 'menor_latencia' and turno % MUESTREO_LATENCIA:
+        # Sin medición cuenta como 0: toda réplica recibe tráfico al menos una vez
+        return min(aliases, key=lambda alias: _latencias.get(alias, 0.0))
+    return aliases[turno % len(aliases)]
+
+
+def alias_lectura():
+    """
+    Base de la que lee ahora la petición en curso: la réplica elegida, o
+    ``default`` fuera de una petición, con el cliente pegado a la primaria o
+    después de escribir. Los caches la usan para no mezclar lo leído de una
+    réplica atrasada con lo leído de ``default``.
+    """
+    estado = _peticion.get()
+    if estado is None or estado.replica is None or estado.escribio:
+        return DEFAULT_DB_ALIAS
+    return estado.replica
+
+
+def medir_latencia(execute, sql, params, many, context):
+    alias = context['connection'].alias
+    if alias not in replicas():
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        anterior = _latencias.get(alias)
+        _latencias[alias] = duracion if anterior is None else anterior + PESO_LATENCIA * (duracion - anterior)
+
+
+class ReplicasRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in APPS_REPLICADAS:
+            return None
+        estado = _peticion.get()
+        if estado is None:
+            return None
+        if estado.replica is None or estado.escribio:
+            # Explícito: un objeto leído antes de la réplica no arrastra ahí
+            # las lecturas de sus relaciones
+            return DEFAULT_DB_ALIAS
+        return estado.replica
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in APPS_REPLICADAS or not replicas():
+            return None
+        estado = _peticion.get()
+        if estado is not None:
+            estado.escribio = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        if getattr(settings, 'REPLICAS_SELECCION', 'round_robin') == 'menor_latencia':
+            instalar_envoltura(medir_latencia)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        estado = self.estado(request)
+        token = _peticion.set(estado)
+        try:
+            response = self.get_response(request)
+        finally:
+            _peticion.reset(token)
+        return self.fijar_primaria(response, estado)
+
+    async def __acall__(self, request):
+        estado = self.estado(request)
+        token = _peticion.set(estado)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _peticion.reset(token)
+        return self.fijar_primaria(response, estado)
+
+    def estado(self, request):
+        if request.method not in METODOS_SEGUROS:
+            return EstadoPeticion(None)
+        replica = None if self.pegado(request) else elegir_replica()
+        incrementar('distribuidora_db_read_requests_total', database=replica or DEFAULT_DB_ALIAS)
+        return EstadoPeticion(replica)
+
+    @staticmethod
+    def pegado(request):
+        """True si el cliente escribió hace menos de ``REPLICAS_PEGAJOSIDAD`` segundos"""
+        try:
+            return float(request.COOKIES.get(COOKIE_PRIMARIA, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def fijar_primaria(self, response, estado):
+        ventana = getattr(settings, 'REPLICAS_PEGAJOSIDAD', 0)
+        if estado.escribio and ventana > 0:
+            response.set_cookie(
+                COOKIE_PRIMARIA, f'{time.time() + ventana:.3f}',
+                max_age=math.ceil(ventana), httponly=True, samesite='Lax',
+            )
+        return response
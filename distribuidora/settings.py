@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,11 +46,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Histogramas por vista y acción para /metrics; ver distribuidora/metricas.py
+    'distribuidora.metricas.MetricasMiddleware',
+    # Se retira solo si INSTRUMENTACION_PETICIONES es False
+    'distribuidora.instrumentacion.InstrumentacionMiddleware',
+    # Lecturas de productos a REPLICAS_LECTURA; ver distribuidora/replicas.py
+    'distribuidora.replicas.ReplicasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # ?_profile=1 o X-Profile: 1 (solo staff); ver distribuidora/perfilado.py
+    'distribuidora.perfilado.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -76,7 +88,8 @@ WSGI_APPLICATION = 'distribuidora.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # django.db.backends.mysql con pool de conexiones; ver distribuidora/mysql_pool
+        'ENGINE': 'distribuidora.mysql_pool',
         'NAME': 'distribuidora_db',
         'USER': 'root',  # Tu usuario de MySQL
         'PASSWORD': 'linux',  # Tu contraseña de MySQL
@@ -84,10 +97,25 @@ DATABASES = {
         'PORT': '3306',
         'OPTIONS': {
             'charset': 'utf8mb4',
-        }
+        },
+        # Por proceso: conexiones mínimas y máximas, segundos de vida de cada
+        # una y segundos de espera por una libre (luego OperationalError)
+        'POOL': {
+            'MINIMO': 2,
+            'MAXIMO': 20,
+            'VIDA_MAXIMA': 1800,
+            'ESPERA_MAXIMA': 10,
+        },
     }
 }
 
+# Réplicas de lectura: una por host de DB_REPLICAS (separados por coma), con
+# las mismas credenciales que 'default'
+for numero, host in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica_{numero}'] = dict(DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['distribuidora.replicas.ReplicasRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,6 +163,9 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
+        # ?format=msgpack y ?format=columnar; ver productos/renderers.py
+        'productos.renderers.MessagePackRenderer',
+        'productos.renderers.ColumnarRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -143,4 +174,91 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-}
\ No newline at end of file
+}
+
+# Cache compartido por todos los workers: las versiones con que se invalidan
+# los caches de respuestas y de datos de referencia deben verse en todos los
+# procesos. Con REDIS_URL (paquete redis de requirements.txt) se usa Redis;
+# sin él queda el cache en memoria de cada proceso y el cache de respuestas se
+# apaga
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    if importlib.util.find_spec('redis') is None:
+        # Sin esto el error aparecería recién en el primer acceso al cache
+        raise ImproperlyConfigured('REDIS_URL requiere el paquete redis: pip install redis')
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Segundos que se cachean los conteos de /api/productos/facetas/ (0 desactiva)
+PRODUCTOS_FACETAS_CACHE_TTL = 30
+
+# Segundos que se cachean las respuestas de listado y detalle de productos y
+# producto-proveedor; las escrituras las invalidan (0 desactiva). Solo con
+# cache compartido: en memoria, una escritura no invalidaría a los demás workers
+PRODUCTOS_RESPUESTAS_CACHE_TTL = 300 if REDIS_URL else 0
+
+# Segundos que cada proceso reutiliza tipos, proveedores y departamentos ya
+# calculados (ver productos/referencia.py); sin cache compartido es el plazo
+# en que los demás workers ven un cambio
+PRODUCTOS_REFERENCIA_CACHE_TTL = 3600 if REDIS_URL else 30
+
+# Listados de productos y producto-proveedor desde values() con el mismo JSON
+# que los serializers; ver productos/listado_rapido.py
+PRODUCTOS_LISTADO_RAPIDO = True
+
+# Lecturas con el ORM asíncrono en las rutas más consultadas; distribuidora/asgi.py
+# las activa por defecto (bajo WSGI cada corrutina necesitaría su propio
+# event loop). Ver productos/asincrono.py
+PRODUCTOS_VISTAS_ASYNC = os.environ.get('PRODUCTOS_VISTAS_ASYNC', '') == '1'
+# Consultas independientes de una petición asíncrona a la vez, cada una con
+# su conexión; False las ejecuta una tras otra
+PRODUCTOS_ASYNC_PARALELO = True
+
+# Instrumentación por petición (Server-Timing y log JSON con consultas y
+# tiempos por vista); ver distribuidora/instrumentacion.py
+INSTRUMENTACION_PETICIONES = os.environ.get('INSTRUMENTACION_PETICIONES', '') == '1'
+# Veces que una misma sentencia SQL debe repetirse en una petición para
+# reportarla como posible N+1
+INSTRUMENTACION_UMBRAL_REPETIDAS = 5
+
+# Perfilado bajo demanda: dónde se escriben los .prof/.folded y qué rutas
+# lo admiten
+PERFILADO_DIRECTORIO = os.environ.get('PERFILADO_DIRECTORIO', str(BASE_DIR / 'perfiles'))
+PERFILADO_RUTAS = ('/api/', '/productos/api/')
+
+# Métricas de Prometheus en /metrics. Con varios workers (gunicorn/uvicorn)
+# METRICAS_DIRECTORIO debe apuntar a un directorio compartido por todos, vacío
+# al arrancar; sin él cada proceso reporta solo sus propios valores
+METRICAS_ACTIVAS = True
+METRICAS_DIRECTORIO = os.environ.get('METRICAS_DIRECTORIO', '')
+METRICAS_INTERVALO_ESCRITURA = 1
+METRICAS_IPS_PERMITIDAS = ('127.0.0.1', '::1')
+
+# Alias de DATABASES que atienden las lecturas GET de productos (vacío: todo
+# a 'default'). Selección 'round_robin' o 'menor_latencia'; un cliente que
+# escribe lee de la primaria los siguientes REPLICAS_PEGAJOSIDAD segundos.
+# Ver distribuidora/replicas.py
+REPLICAS_LECTURA = [alias for alias in DATABASES if alias.startswith('replica_')]
+REPLICAS_SELECCION = 'round_robin'
+REPLICAS_PEGAJOSIDAD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'distribuidora.instrumentacion': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
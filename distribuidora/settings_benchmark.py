@@ -0,0 +1,23 @@
+"""
+Configuración para ``python manage.py benchmark_endpoints``: la misma
+aplicación sobre SQLite, sin caches de respuestas, para medir el camino
+completo a la base de datos. El comando crea un archivo por tamaño de
+catálogo en ``BENCHMARK_DIR`` (default: ./benchmarks). ``BENCHMARK_DB``
+apunta a uno de esos archivos (lo usan los servidores de ``benchmark_asgi``).
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+BENCHMARK_DIR = os.environ.get('BENCHMARK_DIR', str(BASE_DIR / 'benchmarks'))
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_DB', os.path.join(BENCHMARK_DIR, 'benchmark.sqlite3')),
+    }
+}
+
+PRODUCTOS_FACETAS_CACHE_TTL = 0
+PRODUCTOS_RESPUESTAS_CACHE_TTL = 0
@@ -2,8 +2,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
 
+from .metricas import vista_metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', vista_metricas, name='metricas'),
     path('productos/', include('productos.urls')),
     path('api/', include('productos.urls')),  # Mantener compatibilidad con /api/
     path('', RedirectView.as_view(url='/productos/', permanent=False)),
@@ -24,7 +24,7 @@ class ProductoProveedorInline(admin.TabularInline):
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
-    list_display = ['clave', 'nombre', 'tipo_producto', 'activo', 'fecha_creacion']
+    list_display = ['clave', 'nombre', 'tipo_producto', 'costo_minimo', 'cantidad_proveedores', 'activo', 'fecha_creacion']
     list_filter = ['tipo_producto', 'activo']
     search_fields = ['clave', 'nombre']
     inlines = [ProductoProveedorInline]
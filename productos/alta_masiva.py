@@ -0,0 +1,152 @@
+"""
+Alta masiva de productos con sus proveedores.
+
+1. Cada elemento se valida con ``ProductoAltaMasivaSerializer`` (solo forma,
+   sin consultas).
+2. Para toda la lista: claves repetidas en la petición, claves existentes,
+   tipos de producto y proveedores inexistentes, con una consulta por
+   conjunto (las claves se consultan por lotes).
+3. Los productos válidos y sus relaciones se insertan con ``bulk_create`` por
+   lotes dentro de una sola transacción.
+
+Sin modo parcial, cualquier error cancela toda la carga. En modo parcial los
+elementos con error se reportan y el resto se crea.
+"""
+from django.db import transaction
+
+from .models import TipoProducto, Proveedor, Producto, ProductoProveedor
+from .serializers import ProductoAltaMasivaSerializer
+
+
+MAX_PRODUCTOS = 5000
+
+
+class ErrorAltaMasiva(Exception):
+    """El cuerpo de la petición no tiene la forma esperada"""
+
+
+class AltaMasivaProductos:
+    """
+    Uso::
+
+        resultado = AltaMasivaProductos(parcial=True).procesar(elementos)
+    """
+
+    def __init__(self, parcial=False, tamano_lote=500):
+        self.parcial = parcial
+        self.tamano_lote = tamano_lote
+        self.errores = {}
+
+    def registrar_error(self, indice, campo, mensaje):
+        self.errores.setdefault(indice, {}).setdefault(campo, []).append(mensaje)
+
+    def procesar(self, elementos):
+        if not isinstance(elementos, list):
+            raise ErrorAltaMasiva('Se esperaba una lista de productos')
+        if len(elementos) > MAX_PRODUCTOS:
+            raise ErrorAltaMasiva(f'La carga admite hasta {MAX_PRODUCTOS} productos por petición')
+
+        validos = self.validar(elementos)
+        if self.errores and not self.parcial:
+            return {'creados': 0, 'productos': [], 'errores': self.detalle_errores()}
+
+        creados = self.insertar(validos) if validos else []
+        return {
+            'creados': len(creados),
+            'productos': creados,
+            'errores': self.detalle_errores(),
+        }
+
+    def detalle_errores(self):
+        return [
+            {'indice': indice, 'errores': errores}
+            for indice, errores in sorted(self.errores.items())
+        ]
+
+    def validar(self, elementos):
+        """Retorna ``[(indice, datos)]`` de los elementos sin errores"""
+        datos = {}
+        for indice, elemento in enumerate(elementos):
+            serializer = ProductoAltaMasivaSerializer(data=elemento)
+            if serializer.is_valid():
+                datos[indice] = serializer.validated_data
+            else:
+                self.errores[indice] = serializer.errors
+
+        # Claves repetidas dentro de la misma petición
+        vistas = {}
+        for indice, item in datos.items():
+            if item['clave'] in vistas:
+                self.registrar_error(indice, 'clave', 'La clave se repite en la carga')
+            vistas.setdefault(item['clave'], indice)
+
+        claves = list(vistas)
+        existentes = set()
+        for inicio in range(0, len(claves), self.tamano_lote):
+            existentes.update(
+                Producto.objects.filter(clave__in=claves[inicio:inicio + self.tamano_lote])
+                .values_list('clave', flat=True)
+            )
+
+        tipo_ids = {item['tipo_producto'] for item in datos.values()}
+        tipos = set(TipoProducto.objects.filter(pk__in=tipo_ids).values_list('pk', flat=True))
+
+        proveedor_ids = {prov['proveedor'] for item in datos.values() for prov in item['proveedores']}
+        proveedores = set(
+            Proveedor.objects.filter(pk__in=proveedor_ids).values_list('pk', flat=True)
+        ) if proveedor_ids else set()
+
+        for indice, item in datos.items():
+            if item['clave'] in existentes:
+                self.registrar_error(indice, 'clave', 'Ya existe un producto con esta clave')
+            if item['tipo_producto'] not in tipos:
+                self.registrar_error(indice, 'tipo_producto', f'No existe el tipo de producto {item["tipo_producto"]}')
+            faltantes = sorted({prov['proveedor'] for prov in item['proveedores']} - proveedores)
+            if faltantes:
+                self.registrar_error(
+                    indice, 'proveedores',
+                    f'No existen los proveedores: {", ".join(str(pk) for pk in faltantes)}'
+                )
+
+        return [(indice, item) for indice, item in datos.items() if indice not in self.errores]
+
+    def insertar(self, validos):
+        creados = []
+        with transaction.atomic():
+            for inicio in range(0, len(validos), self.tamano_lote):
+                creados.extend(self.insertar_lote(validos[inicio:inicio + self.tamano_lote]))
+        return creados
+
+    def insertar_lote(self, lote):
+        productos = Producto.objects.bulk_create([
+            Producto(
+                clave=item['clave'],
+                nombre=item['nombre'],
+                tipo_producto_id=item['tipo_producto'],
+                activo=item['activo'],
+            )
+            for _, item in lote
+        ])
+        ids = {producto.clave: producto.pk for producto in productos}
+        if None in ids.values():
+            # MySQL no devuelve los ids de bulk_create
+            ids = dict(Producto.objects.filter(clave__in=ids.keys()).values_list('clave', 'pk'))
+
+        ProductoProveedor.objects.bulk_create([
+            ProductoProveedor(
+                producto_id=ids[item['clave']],
+                proveedor_id=prov['proveedor'],
+                clave_proveedor=prov['clave_proveedor'],
+                costo=prov['costo'],
+                activo=prov['activo'],
+            )
+            for _, item in lote
+            for prov in item['proveedores']
+        ])
+        # También invalida el cache de respuestas para los productos sin proveedores
+        Producto.actualizar_resumen_proveedores(ids.values())
+
+        return [
+            {'indice': indice, 'id': ids[item['clave']], 'clave': item['clave']}
+            for indice, item in lote
+        ]
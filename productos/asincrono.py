@@ -0,0 +1,175 @@
+"""
+Lectura asíncrona (ASGI) de los endpoints más consultados con el ORM
+asíncrono de Django (``aget()``, ``aiterator()``, ``acount()``,
+``aaggregate()``).
+
+Con ``PRODUCTOS_VISTAS_ASYNC`` activo (``distribuidora/asgi.py`` lo activa
+por defecto) las peticiones GET de:
+
+- ``/api/productos/`` y ``/api/productos/{id}/``
+- ``/api/productos/{id}/proveedores/``
+- ``/api/proveedores/departamentos/``
+- ``/api/tipos-producto/`` y ``/api/proveedores/`` (listado y detalle)
+
+se atienden con corrutinas (``alist``, ``aretrieve``, ``a<acción>``) sobre el
+mismo ViewSet: mismo queryset, filtros, campos dispersos, paginación, ETag y
+cache de respuestas, y el mismo JSON que la versión síncrona. El resto de
+los métodos de esas rutas, y el navegador de la API, pasan a la vista
+síncrona de siempre.
+
+Las consultas independientes de una petición (la página y los validadores
+de las dependencias; el producto y sus proveedores) se lanzan a la vez con
+``en_paralelo``. Bajo ASGI cada una corre en su propio hilo con su propia
+conexión, que se cierra al terminar (Django ya abre una conexión por
+petición bajo ASGI). ``PRODUCTOS_ASYNC_PARALELO = False`` las ejecuta una
+tras otra en la conexión de la petición.
+"""
+import asyncio
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.views.decorators.csrf import csrf_exempt
+
+
+# Formatos que se dejan a la vista síncrona (el navegador de la API arma
+# formularios con consultas propias)
+FORMATOS_SINCRONOS = ('api',)
+
+
+def cerrar_conexiones():
+    """Cierra las conexiones que abrió el hilo de una consulta concurrente"""
+    for conexion in connections.all(initialized_only=True):
+        # Bajo async_to_sync (pruebas, WSGI) la consulta corre en el hilo
+        # de la petición: no se cierra una conexión dentro de una transacción
+        if not conexion.in_atomic_block:
+            conexion.close()
+
+
+async def _en_hilo_propio(consulta):
+    async with ThreadSensitiveContext():
+        try:
+            return await consulta
+        finally:
+            await sync_to_async(cerrar_conexiones)()
+
+
+async def en_paralelo(*consultas):
+    """
+    Espera corrutinas del ORM asíncrono independientes entre sí y devuelve
+    sus resultados en el mismo orden.
+    """
+    if len(consultas) < 2 or not getattr(settings, 'PRODUCTOS_ASYNC_PARALELO', True):
+        return [await consulta for consulta in consultas]
+    return await asyncio.gather(*(_en_hilo_propio(consulta) for consulta in consultas))
+
+
+async def en_lista(queryset):
+    return [fila async for fila in queryset.aiterator()]
+
+
+def respuesta_renderizada(response):
+    """
+    Renderiza una Response de DRF y la devuelve como HttpResponse: el
+    handler ASGI renderiza las TemplateResponse en un hilo aparte.
+    """
+    if not isinstance(response, SimpleTemplateResponse):
+        return response
+    response.render()
+    final = HttpResponse(response.content, status=response.status_code)
+    for nombre, valor in response.items():
+        final[nombre] = valor
+    final.cookies = response.cookies
+    return final
+
+
+class LecturaAsyncMixin:
+    """
+    Despacho asíncrono de las acciones de lectura del ViewSet. Va justo
+    antes de la clase de DRF en las bases; los demás mixins agregan sus
+    propias versiones ``alist``/``aretrieve``.
+    """
+
+    @classmethod
+    def as_vista_async(cls, actions, **initkwargs):
+        """
+        Vista asíncrona para una ruta del router. ``actions`` es el mismo
+        mapeo método -> acción que recibe ``as_view``; los métodos cuya
+        acción tiene versión ``a<acción>`` se atienden aquí y los demás con
+        la vista síncrona.
+        """
+        vista_sync = cls.as_view(actions, **initkwargs)
+        acciones = dict(actions)
+        if 'get' in acciones and 'head' not in acciones:
+            acciones['head'] = acciones['get']
+        asincronas = {metodo for metodo, accion in acciones.items() if hasattr(cls, 'a' + accion)}
+
+        async def vista(request, *args, **kwargs):
+            if request.method.lower() not in asincronas:
+                return await sync_to_async(vista_sync)(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = acciones
+            response = await self.adespachar(request, *args, **kwargs)
+            if response is None:
+                return await sync_to_async(vista_sync)(request, *args, **kwargs)
+            return respuesta_renderizada(response)
+
+        vista = csrf_exempt(vista)
+        # Mismos atributos que la vista de DRF (los usan métricas e instrumentación)
+        vista.cls = cls
+        vista.initkwargs = initkwargs
+        vista.actions = acciones
+        return vista
+
+    async def adespachar(self, request, *args, **kwargs):
+        """
+        ``APIView.dispatch`` con la acción asíncrona; None si la petición
+        negoció un formato que se atiende de forma síncrona.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            if request.accepted_renderer.format in FORMATOS_SINCRONOS:
+                return None
+            response = await getattr(self, 'a' + self.action)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def afilter_queryset(self, queryset):
+        # Los filtros pueden consultar la base (p. ej. la detección de la
+        # tabla FTS5 de la búsqueda en SQLite)
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+    def filtro_objeto(self, queryset):
+        """``queryset`` filtrado por el lookup de la URL; Http404 si el valor no es válido"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+
+    async def aget_object(self, queryset=None):
+        if queryset is None:
+            queryset = self.filtro_objeto(await self.afilter_queryset(self.get_queryset()))
+        try:
+            obj = await queryset.aget()
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None or not hasattr(self.paginator, 'apaginate_queryset'):
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
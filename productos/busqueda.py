@@ -0,0 +1,123 @@
+"""
+Búsqueda de productos por texto sobre un índice de texto completo.
+
+- MySQL: índice ``FULLTEXT (clave, nombre)`` consultado con
+  ``MATCH ... AGAINST`` en modo booleano. La colación utf8mb4_unicode_ci ya
+  ignora acentos y mayúsculas.
+- SQLite: tabla virtual FTS5 ``producto_busqueda`` (tokenizer unicode61 sin
+  diacríticos) sincronizada con ``producto`` mediante triggers.
+- Otros motores: ``icontains`` por término, sin ranking.
+
+Cada término se busca como prefijo ("mec" encuentra "Mecánico") y todos los
+términos deben aparecer. Los resultados se anotan con ``relevancia`` (mayor
+es mejor); ver ``ProductoCursorPagination.get_ordering``.
+"""
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import F, FloatField, Func, Lookup, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import ProductoBusqueda
+
+
+TABLA_FTS_SQLITE = 'producto_busqueda'
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: 'Sábanas' -> 'sabanas'"""
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def terminos(consulta):
+    """Palabras de la consulta, sin operadores ni signos de puntuación"""
+    return re.findall(r'\w+', normalizar(consulta))
+
+
+class Coincide(Lookup):
+    """``columna MATCH consulta`` de FTS5"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', (*lhs_params, *rhs_params)
+
+
+ProductoBusqueda._meta.get_field('producto_busqueda').register_lookup(Coincide)
+
+
+def fts_sqlite_disponible(connection):
+    if not hasattr(connection, '_fts_productos'):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [TABLA_FTS_SQLITE]
+            )
+            connection._fts_productos = cursor.fetchone() is not None
+    return connection._fts_productos
+
+
+def buscar_productos(queryset, consulta):
+    """Filtra ``queryset`` (de Producto) por ``consulta`` y anota ``relevancia``"""
+    palabras = terminos(consulta)
+    if not palabras:
+        return queryset
+
+    connection = connections[queryset.db]
+    tabla = connection.ops.quote_name(queryset.model._meta.db_table)
+
+    if connection.vendor == 'mysql':
+        expresion = ' '.join(f'+{palabra}*' for palabra in palabras)
+        relevancia = RawSQL(
+            f'MATCH ({tabla}.`clave`, {tabla}.`nombre`) AGAINST (%s IN BOOLEAN MODE)',
+            [expresion],
+            output_field=FloatField()
+        )
+        return queryset.annotate(relevancia=relevancia).filter(relevancia__gt=0)
+
+    if connection.vendor == 'sqlite' and fts_sqlite_disponible(connection):
+        expresion = ' '.join('"{}"*'.format(palabra.replace('"', '""')) for palabra in palabras)
+        # Join con la tabla FTS5 (modelo ProductoBusqueda): bm25() se calcula en
+        # el mismo recorrido del índice. bm25() es menor mientras más relevante
+        return queryset.filter(busqueda_texto__producto_busqueda__match=expresion).annotate(
+            relevancia=Func(
+                F('busqueda_texto__producto_busqueda'),
+                template='-bm25(%(expressions)s)',
+                output_field=FloatField()
+            )
+        )
+
+    condiciones = Q()
+    for palabra in palabras:
+        condiciones &= Q(clave__icontains=palabra) | Q(nombre__icontains=palabra)
+    return queryset.filter(condiciones)
+
+
+class BusquedaProductoFilter(BaseFilterBackend):
+    """
+    Reemplazo de SearchFilter para productos: usa el índice de texto completo
+    en lugar de ``LIKE '%x%'``. Lee el mismo parámetro (``?search=``).
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        consulta = request.query_params.get(self.search_param, '')
+        if not consulta.strip():
+            return queryset
+        return buscar_productos(queryset, consulta)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Búsqueda por prefijo en clave y nombre (sin distinguir acentos)',
+                'schema': {'type': 'string'},
+            },
+        ]
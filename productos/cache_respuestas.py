@@ -0,0 +1,170 @@
+"""
+Cache de respuestas de lectura (listado y detalle) sobre el framework de
+cache de Django.
+
+La clave combina una versión global, la base de la que lee la petición
+(``alias_lectura()``: una réplica atrasada no contamina lo que lee quien
+acaba de escribir), la vista, la acción, los argumentos de
+la URL, el formato y los parámetros de consulta ordenados. Cualquier
+escritura de TipoProducto, Proveedor, Producto o ProductoProveedor incrementa
+la versión (ver productos/signals.py y ``Producto.actualizar_resumen_proveedores``
+para las escrituras masivas), de modo que las entradas anteriores dejan de
+leerse y expiran solas por TTL.
+
+Se guarda el cuerpo ya renderizado junto con ETag y Last-Modified, así que un
+acierto no toca la base de datos y también puede responder 304.
+
+``PRODUCTOS_RESPUESTAS_CACHE_TTL`` (segundos) activa el cache; 0 lo desactiva.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, urlencode
+
+from distribuidora.metricas import registrar_cache
+from distribuidora.replicas import alias_lectura
+
+
+CLAVE_VERSION = 'productos:respuestas:version'
+CLAVE_ACIERTOS = 'productos:respuestas:aciertos'
+CLAVE_FALLOS = 'productos:respuestas:fallos'
+ENCABEZADOS_GUARDADOS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def ttl_respuestas():
+    return getattr(settings, 'PRODUCTOS_RESPUESTAS_CACHE_TTL', 0)
+
+
+def version_actual():
+    cache.add(CLAVE_VERSION, 1, None)
+    return cache.get(CLAVE_VERSION, 1)
+
+
+def _incrementar(clave):
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave no existe (primer uso o el backend la descartó)
+        cache.add(clave, 0, None)
+        return cache.incr(clave)
+
+
+def invalidar_respuestas():
+    """
+    Incrementa la versión ahora y otra vez al confirmar la transacción: una
+    lectura concurrente que haya guardado datos previos al commit queda
+    también invalidada.
+    """
+    _incrementar(CLAVE_VERSION)
+    transaction.on_commit(lambda: _incrementar(CLAVE_VERSION))
+
+
+def estadisticas():
+    aciertos = cache.get(CLAVE_ACIERTOS, 0)
+    fallos = cache.get(CLAVE_FALLOS, 0)
+    consultas = aciertos + fallos
+    return {
+        'activo': bool(ttl_respuestas()),
+        'version': version_actual(),
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'tasa_aciertos': round(aciertos / consultas, 4) if consultas else None,
+    }
+
+
+class CacheRespuestaMixin:
+    """
+    Cachea las respuestas 200 de ``list`` y ``retrieve``. Debe ir antes de
+    GetCondicionalMixin en las bases del ViewSet.
+    """
+    formatos_sin_cache = ('api',)
+
+    def clave_cache(self, request):
+        parametros = urlencode(sorted(request.query_params.lists()), doseq=True)
+        argumentos = urlencode(sorted(self.kwargs.items()))
+        firma = '|'.join((
+            alias_lectura(), type(self).__name__, self.action, argumentos,
+            request.accepted_renderer.format, parametros,
+        ))
+        return 'productos:respuestas:{}:{}'.format(
+            version_actual(), hashlib.md5(firma.encode()).hexdigest()
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.responder_con_cache(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.responder_con_cache(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aresponder_con_cache(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aresponder_con_cache(super().aretrieve, request, *args, **kwargs)
+
+    def responder_con_cache(self, generar, request, *args, **kwargs):
+        clave, guardada = self.buscar_en_cache(request)
+        if guardada is not None:
+            return guardada
+        response = generar(request, *args, **kwargs)
+        return self.guardar_al_renderizar(response, clave)
+
+    async def aresponder_con_cache(self, generar, request, *args, **kwargs):
+        # El cache no toca la base de datos: se consulta directamente
+        clave, guardada = self.buscar_en_cache(request)
+        if guardada is not None:
+            return guardada
+        response = await generar(request, *args, **kwargs)
+        return self.guardar_al_renderizar(response, clave)
+
+    def buscar_en_cache(self, request):
+        """``(clave, respuesta guardada o None)``; clave None si esta petición no se cachea"""
+        if not ttl_respuestas() or request.accepted_renderer.format in self.formatos_sin_cache:
+            return None, None
+
+        clave = self.clave_cache(request)
+        guardada = cache.get(clave)
+        if guardada is not None:
+            _incrementar(CLAVE_ACIERTOS)
+            registrar_cache('respuestas', acierto=True)
+            return clave, self.respuesta_guardada(request, guardada)
+
+        _incrementar(CLAVE_FALLOS)
+        registrar_cache('respuestas', acierto=False)
+        return clave, None
+
+    def guardar_al_renderizar(self, response, clave):
+        if clave is None:
+            return response
+        ttl = ttl_respuestas()
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda renderizada: cache.set(clave, {
+                    'contenido': renderizada.content,
+                    'encabezados': {
+                        nombre: renderizada[nombre]
+                        for nombre in ENCABEZADOS_GUARDADOS if renderizada.has_header(nombre)
+                    },
+                }, ttl)
+            )
+        return response
+
+    def respuesta_guardada(self, request, guardada):
+        encabezados = guardada['encabezados']
+        response = get_conditional_response(
+            request._request,
+            etag=encabezados.get('ETag'),
+            last_modified=parse_http_date_safe(encabezados.get('Last-Modified', '')),
+        )
+        if response is None:
+            response = HttpResponse(guardada['contenido'])
+        for nombre, valor in encabezados.items():
+            if nombre != 'Content-Type' or response.status_code == 200:
+                response[nombre] = valor
+        response['X-Cache'] = 'HIT'
+        return response
@@ -0,0 +1,162 @@
+"""
+Campos dispersos en ``list`` y ``retrieve``: ``?fields=id,clave,nombre`` o
+``?exclude=proveedores_detalle``.
+
+Además de quitar los campos del serializer, la consulta se recorta para que
+coincida:
+
+- ``only()`` con las columnas que leen los campos pedidos, más
+  ``fecha_modificacion`` (la usa GetCondicionalMixin) y los campos de
+  ordenamiento (los usa la paginación por cursor)
+- ``select_related`` solo de las llaves foráneas que algún campo recorre,
+  por ejemplo ``tipo_producto.nombre``
+- ``prefetch_related`` solo de las relaciones múltiples pedidas, por ejemplo
+  ``proveedores_detalle``
+
+Si un campo pedido no sale de un campo del modelo (una propiedad, un método
+o ``source='*'``) la consulta se deja completa para no provocar una consulta
+por fila.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+PARAMETRO_CAMPOS = 'fields'
+PARAMETRO_EXCLUIR = 'exclude'
+ACCIONES = ('list', 'retrieve')
+
+
+def parsear_campos(valor):
+    """'id, clave,,nombre' -> ['id', 'clave', 'nombre']"""
+    return [campo.strip() for campo in valor.split(',') if campo.strip()]
+
+
+def origenes(modelo, atributos, anidado=False):
+    """
+    ``(columnas, select_related, prefetch_related)`` que necesita un campo de
+    serializer con ``source_attrs == atributos``; None si no se puede saber.
+    ``anidado`` indica que el campo es un serializer completo.
+    """
+    if not atributos:
+        return None
+    try:
+        campo = modelo._meta.get_field(atributos[0])
+    except FieldDoesNotExist:
+        return None
+
+    if not campo.is_relation:
+        return None if anidado else ({campo.name}, set(), set())
+    if campo.many_to_many or campo.one_to_many:
+        return set(), set(), {campo.name}
+    if not campo.concrete:
+        # Lado inverso de un uno a uno
+        return None
+    if len(atributos) == 1:
+        # PrimaryKeyRelatedField lee el id de la columna sin cargar el objeto
+        return None if anidado else ({campo.name}, set(), set())
+
+    resto = origenes(campo.related_model, atributos[1:], anidado)
+    if resto is None or resto[2]:
+        return None
+    columnas, relaciones, _ = resto
+    return (
+        {campo.name} | {f'{campo.name}__{columna}' for columna in columnas},
+        {campo.name} | {f'{campo.name}__{relacion}' for relacion in relaciones},
+        set(),
+    )
+
+
+class CamposDispersosMixin:
+    """Debe ir antes de la clase de DRF en las bases del ViewSet"""
+    campos_siempre = ('fecha_modificacion',)
+
+    def campos_serializer(self):
+        """Campos legibles del serializer de la acción, ya enlazados"""
+        if not hasattr(self, '_campos_serializer'):
+            serializer = self.get_serializer_class()(context=self.get_serializer_context())
+            self._campos_serializer = {
+                nombre: campo for nombre, campo in serializer.fields.items() if not campo.write_only
+            }
+        return self._campos_serializer
+
+    def campos_solicitados(self):
+        """Nombres de los campos a serializar en orden; None si no se pidió recorte"""
+        if self.action not in ACCIONES:
+            return None
+        parametros = self.request.query_params
+        if PARAMETRO_CAMPOS not in parametros and PARAMETRO_EXCLUIR not in parametros:
+            return None
+
+        disponibles = self.campos_serializer()
+        pedidos = parsear_campos(parametros.get(PARAMETRO_CAMPOS, '')) or list(disponibles)
+        excluidos = parsear_campos(parametros.get(PARAMETRO_EXCLUIR, ''))
+        desconocidos = [campo for campo in pedidos + excluidos if campo not in disponibles]
+        if desconocidos:
+            raise ValidationError({
+                'error': 'Campos desconocidos: {}. Disponibles: {}'.format(
+                    ', '.join(desconocidos), ', '.join(disponibles)
+                )
+            })
+        return [campo for campo in disponibles if campo in pedidos and campo not in excluidos]
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        campos = self.campos_solicitados()
+        if campos is not None:
+            destino = serializer.child if isinstance(serializer, ListSerializer) else serializer
+            for nombre in list(destino.fields):
+                if nombre not in campos:
+                    destino.fields.pop(nombre)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        campos = self.campos_solicitados()
+        if campos is None:
+            return queryset
+        return self.recortar_queryset(queryset, campos)
+
+    def columnas_internas(self, modelo):
+        """Columnas que el ViewSet lee de cada fila aunque no se serialicen"""
+        columnas = set()
+        nombres = list(self.campos_siempre) + list(getattr(self, 'ordering_fields', None) or ())
+        nombres += [campo.lstrip('-') for campo in getattr(self, 'ordering', None) or ()]
+        for nombre in nombres:
+            try:
+                if not modelo._meta.get_field(nombre).is_relation:
+                    columnas.add(nombre)
+            except FieldDoesNotExist:
+                # 'producto__clave' y similares: el JOIN del ORDER BY no necesita cargar columnas
+                pass
+        return columnas
+
+    def recortar_queryset(self, queryset, campos):
+        modelo = queryset.model
+        disponibles = self.campos_serializer()
+        columnas, relaciones, multiples = set(), set(), set()
+        for nombre in campos:
+            campo = disponibles[nombre]
+            resuelto = origenes(
+                modelo, campo.source_attrs,
+                anidado=isinstance(campo, BaseSerializer) and not isinstance(campo, ListSerializer)
+            )
+            if resuelto is None:
+                return queryset
+            columnas |= resuelto[0]
+            relaciones |= resuelto[1]
+            multiples |= resuelto[2]
+
+        columnas |= self.columnas_internas(modelo)
+
+        prefetch = [
+            busqueda for busqueda in queryset._prefetch_related_lookups
+            if (busqueda.prefetch_through if isinstance(busqueda, Prefetch) else busqueda).split('__')[0] in multiples
+        ]
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if relaciones:
+            queryset = queryset.select_related(*relaciones)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*columnas)
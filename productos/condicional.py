@@ -0,0 +1,183 @@
+"""
+GET condicional (ETag / Last-Modified) para los ViewSets de solo lectura.
+
+Los validadores salen de consultas baratas y nunca del serializer:
+
+- listado paginado: ``(pk, fecha_modificacion)`` de las filas de la página,
+  que ya se leen para paginar, más los enlaces next/previous
+- listado sin paginar y detalle: ``MAX(fecha_modificacion)`` y ``COUNT(*)``
+  del queryset filtrado
+- en ambos casos, ``MAX(fecha_modificacion)`` y ``COUNT(*)`` de los modelos
+  en ``dependencias_validacion`` (los que aportan datos a la respuesta, como
+  el nombre del tipo de producto o del proveedor)
+
+``alist`` y ``aretrieve`` hacen lo mismo con el ORM asíncrono (ver
+productos/asincrono.py).
+
+Las escrituras de ProductoProveedor actualizan ``fecha_modificacion`` del
+producto al recalcular su resumen, por eso Producto no depende de esa tabla.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .asincrono import en_paralelo
+
+
+class GetCondicionalMixin:
+    """Agrega ETag/Last-Modified a list y retrieve y responde 304 cuando aplica"""
+    dependencias_validacion = ()
+
+    def agregados_estado(self):
+        return {'ultima': Max('fecha_modificacion'), 'total': Count('pk')}
+
+    def estado_queryset(self, queryset):
+        return queryset.order_by().aggregate(**self.agregados_estado())
+
+    async def aestado_queryset(self, queryset):
+        return await queryset.order_by().aaggregate(**self.agregados_estado())
+
+    def aestados_dependencias(self):
+        """Corrutinas con el estado de cada modelo de ``dependencias_validacion``"""
+        return [self.aestado_queryset(modelo.objects.all()) for modelo in self.dependencias_validacion]
+
+    def calcular_validadores(self, partes, ultima, dependencias=None):
+        if dependencias is None:
+            dependencias = [self.estado_queryset(modelo.objects.all()) for modelo in self.dependencias_validacion]
+        for modelo, estado in zip(self.dependencias_validacion, dependencias):
+            partes.append((modelo._meta.label, estado['ultima'], estado['total']))
+            if estado['ultima'] and (ultima is None or estado['ultima'] > ultima):
+                ultima = estado['ultima']
+
+        partes.append(self.request.accepted_renderer.format)
+        etag = 'W/"%s"' % hashlib.md5(repr(partes).encode()).hexdigest()
+        last_modified = int(ultima.timestamp()) if ultima else None
+        return etag, last_modified
+
+    def respuesta_condicional(self, etag, last_modified):
+        """Respuesta 304 (o 412) si los validadores coinciden; None en otro caso"""
+        respuesta = get_conditional_response(
+            self.request._request, etag=etag, last_modified=last_modified
+        )
+        if respuesta is not None:
+            self.agregar_validadores(respuesta, etag, last_modified)
+        return respuesta
+
+    def agregar_validadores(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def validadores_pagina(self, page):
+        """``(pk, fecha_modificacion)`` de cada fila de la página"""
+        return [(obj.pk, obj.fecha_modificacion) for obj in page]
+
+    def datos_listado(self, objetos):
+        return self.get_serializer(objetos, many=True).data
+
+    async def adatos_listado(self, objetos):
+        # El serializer puede recorrer relaciones: se ejecuta en un hilo
+        return await sync_to_async(self.datos_listado)(objetos)
+
+    def partes_listado(self, page, estado):
+        """``(partes, ultima)`` para los validadores de un listado"""
+        if page is not None:
+            filas = self.validadores_pagina(page)
+            partes = [
+                filas,
+                self.paginator.get_next_link(),
+                self.paginator.get_previous_link(),
+                getattr(self.paginator, 'total', None),
+            ]
+            return partes, max((fecha for _, fecha in filas), default=None)
+        return [estado['ultima'], estado['total']], estado['ultima']
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        estado = self.estado_queryset(queryset) if page is None else None
+        etag, last_modified = self.calcular_validadores(*self.partes_listado(page, estado))
+        respuesta = self.respuesta_condicional(etag, last_modified)
+        if respuesta is not None:
+            return respuesta
+
+        if page is not None:
+            response = self.get_paginated_response(self.datos_listado(page))
+        else:
+            response = Response(self.datos_listado(queryset))
+        return self.agregar_validadores(response, etag, last_modified)
+
+    async def alist(self, request, *args, **kwargs):
+        """``list`` con la página (o el estado) y las dependencias consultadas a la vez"""
+        queryset = await self.afilter_queryset(self.get_queryset())
+
+        paginado = self.paginator is not None
+        primera = self.apaginate_queryset(queryset) if paginado else self.aestado_queryset(queryset)
+        resultado, *dependencias = await en_paralelo(primera, *self.aestados_dependencias())
+        page = resultado if paginado else None
+        if paginado and page is None:
+            resultado = await self.aestado_queryset(queryset)
+        estado = resultado if page is None else None
+
+        etag, last_modified = self.calcular_validadores(*self.partes_listado(page, estado), dependencias)
+        respuesta = self.respuesta_condicional(etag, last_modified)
+        if respuesta is not None:
+            return respuesta
+
+        if page is not None:
+            response = self.get_paginated_response(await self.adatos_listado(page))
+        else:
+            response = Response(await self.adatos_listado(queryset))
+        return self.agregar_validadores(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            estado = self.estado_queryset(queryset)
+        except (TypeError, ValueError, ValidationError):
+            estado = {'total': 0}
+        if not estado['total']:
+            # Sin validadores: el flujo normal responde 404
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, last_modified = self.calcular_validadores(
+            [estado['ultima'], estado['total']], estado['ultima']
+        )
+        respuesta = self.respuesta_condicional(etag, last_modified)
+        if respuesta is not None:
+            return respuesta
+
+        response = super().retrieve(request, *args, **kwargs)
+        return self.agregar_validadores(response, etag, last_modified)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """
+        ``retrieve`` con el objeto, su estado y las dependencias consultados a
+        la vez; si la respuesta termina en 304 el objeto se leyó de más. El
+        serializer no debe provocar consultas (select_related/prefetch_related
+        del queryset).
+        """
+        queryset = self.filtro_objeto(await self.afilter_queryset(self.get_queryset()))
+        instancia, estado, *dependencias = await en_paralelo(
+            self.aget_object(queryset), self.aestado_queryset(queryset), *self.aestados_dependencias()
+        )
+
+        etag, last_modified = self.calcular_validadores(
+            [estado['ultima'], estado['total']], estado['ultima'], dependencias
+        )
+        respuesta = self.respuesta_condicional(etag, last_modified)
+        if respuesta is not None:
+            return respuesta
+
+        response = Response(self.get_serializer(instancia).data)
+        return self.agregar_validadores(response, etag, last_modified)
@@ -0,0 +1,170 @@
+"""
+Generador determinista de catálogos sintéticos para pruebas de rendimiento.
+
+Cada producto ``i`` usa su propio ``random.Random(semilla, i)``: el resultado
+no depende del tamaño de lote ni de cuántos procesos generen los bloques.
+Las funciones devuelven tuplas simples (sin modelos de Django) para que un
+``multiprocessing.Pool`` pueda generar bloques en paralelo y el proceso
+principal se encargue de insertarlos.
+
+Los costos siguen una distribución log-normal por departamento y cada
+proveedor de un producto cotiza alrededor del mismo costo base.
+"""
+import math
+import random
+from decimal import Decimal
+
+
+# departamento: (tipo de producto, prefijo de clave, mediana de costo, dispersión,
+#                artículos, marcas, variantes)
+DEPARTAMENTOS = {
+    'Electrónicos': (
+        'Electrónica', 'ELE', 900, 1.1,
+        ['Laptop', 'Mouse', 'Teclado', 'Monitor', 'Audífonos', 'Bocina', 'Cargador', 'Cable USB-C',
+         'Tablet', 'Disco SSD', 'Memoria USB', 'Webcam', 'Router', 'Impresora'],
+        ['HP', 'Lenovo', 'Logitech', 'Samsung', 'Sony', 'Kingston', 'TP-Link', 'Epson', 'Genérico'],
+        ['Inalámbrico', 'RGB', 'Pro', 'Mini', 'Bluetooth', '15"', '24"', '1TB', '64GB', 'Negro', 'Blanco'],
+    ),
+    'Alimentos': (
+        'Alimentos', 'ALI', 45, 0.7,
+        ['Arroz', 'Frijol', 'Aceite de Oliva', 'Pasta', 'Café', 'Azúcar', 'Harina', 'Atún',
+         'Leche', 'Galletas', 'Cereal', 'Salsa', 'Chocolate'],
+        ['La Costeña', 'Nestlé', 'Verde Valle', 'Barilla', 'Herdez', 'Bimbo', 'Genérico'],
+        ['500g', '1kg', '250ml', '1L', 'Orgánico', 'Integral', 'Light', 'Premium', 'Paquete 6pz'],
+    ),
+    'Ropa': (
+        'Ropa', 'ROP', 280, 0.8,
+        ['Playera', 'Jeans', 'Sudadera', 'Chamarra', 'Calcetines', 'Camisa', 'Falda', 'Pants',
+         'Gorra', 'Bufanda'],
+        ['Levi\'s', 'Nike', 'Adidas', 'Zara', 'Genérico'],
+        ['Algodón', 'Mezclilla', 'Unisex', 'Talla CH', 'Talla M', 'Talla G', 'Negro', 'Azul', 'Gris'],
+    ),
+    'Hogar': (
+        'Hogar', 'HOG', 350, 0.9,
+        ['Juego de Sábanas', 'Toallas', 'Almohada', 'Sartén', 'Vajilla', 'Lámpara', 'Cortina',
+         'Organizador', 'Cafetera', 'Licuadora'],
+        ['T-Fal', 'Oster', 'Home Basics', 'Genérico'],
+        ['King Size', 'Matrimonial', 'Set 3pz', 'Antiadherente', 'Cerámica', 'LED', 'Blanco'],
+    ),
+    'Ferretería': (
+        'Ferretería', 'FER', 180, 1.0,
+        ['Martillo', 'Desarmador', 'Taladro', 'Llave Inglesa', 'Pinzas', 'Cinta Métrica',
+         'Tornillos', 'Brocas', 'Nivel', 'Sierra'],
+        ['Truper', 'Stanley', 'DeWalt', 'Bosch', 'Urrea', 'Genérico'],
+        ['Profesional', '1/2"', '3/8"', 'Caja 100pz', 'Inalámbrico', '18V', 'Juego 10pz'],
+    ),
+}
+
+# Proporción de proveedores y productos por departamento
+PESOS_DEPARTAMENTO = {
+    'Electrónicos': 3, 'Alimentos': 4, 'Ropa': 2, 'Hogar': 2, 'Ferretería': 2,
+}
+
+RAICES_PROVEEDOR = [
+    'Distribuidora', 'Comercializadora', 'Importadora', 'Grupo', 'Abastecedora', 'Mayoreo',
+]
+NOMBRES_PROVEEDOR = [
+    'del Norte', 'del Bajío', 'Central', 'Pacífico', 'Golfo', 'Peninsular', 'Metropolitana',
+    'Internacional', 'Express', 'Continental',
+]
+RAZONES_SOCIALES = ['SA de CV', 'S de RL', 'SA', 'SAPI de CV']
+
+COSTO_MINIMO = Decimal('0.50')
+COSTO_MAXIMO = Decimal('99999999.99')
+CENTAVOS = Decimal('0.01')
+
+_departamentos = list(PESOS_DEPARTAMENTO)
+_pesos = list(PESOS_DEPARTAMENTO.values())
+
+
+def parsear_rango(valor):
+    """'1-8' -> (1, 8); '3' -> (3, 3)"""
+    partes = str(valor).split('-', 1)
+    minimo = int(partes[0])
+    maximo = int(partes[-1])
+    if minimo < 0 or maximo < minimo:
+        raise ValueError(f'Rango inválido: {valor}')
+    return minimo, maximo
+
+
+def generar_proveedores(semilla, cantidad, primer_id):
+    """``[(id, nombre, descripcion, departamento)]`` de ``cantidad`` proveedores"""
+    rng = random.Random(semilla)
+    proveedores = []
+    for n in range(cantidad):
+        departamento = rng.choices(_departamentos, _pesos)[0]
+        nombre = '{} {} {:05d} {}'.format(
+            rng.choice(RAICES_PROVEEDOR), rng.choice(NOMBRES_PROVEEDOR),
+            primer_id + n, rng.choice(RAZONES_SOCIALES)
+        )
+        descripcion = f'Proveedor de {departamento.lower()}'
+        proveedores.append((primer_id + n, nombre, descripcion, departamento))
+    return proveedores
+
+
+def _costo(valor):
+    return min(max(Decimal(repr(valor)).quantize(CENTAVOS), COSTO_MINIMO), COSTO_MAXIMO)
+
+
+def generar_bloque(parametros, inicio, fin):
+    """
+    Genera los productos ``inicio <= i < fin``.
+
+    ``parametros`` contiene ``semilla``, ``primer_id``, ``tipos`` (tipo -> id),
+    ``proveedores`` (departamento -> [ids]), ``todos_los_proveedores`` y
+    ``por_producto`` (mínimo, máximo).
+
+    Retorna ``(productos, relaciones)``:
+
+    - producto: ``(id, clave, nombre, tipo_id, activo, costo_minimo,
+      cantidad_proveedores, proveedor_costo_minimo)`` con el resumen ya calculado
+    - relación: ``(producto_id, proveedor_id, clave_proveedor, costo, activo)``
+    """
+    semilla = parametros['semilla']
+    minimo, maximo = parametros['por_producto']
+    todos = parametros['todos_los_proveedores']
+    productos = []
+    relaciones = []
+
+    for i in range(inicio, fin):
+        rng = random.Random(semilla * 1000003 + i)
+        producto_id = parametros['primer_id'] + i
+        departamento = rng.choices(_departamentos, _pesos)[0]
+        tipo, prefijo, mediana, dispersion, articulos, marcas, variantes = DEPARTAMENTOS[departamento]
+
+        nombre = f'{rng.choice(articulos)} {rng.choice(marcas)} {rng.choice(variantes)}'
+        clave = f'{prefijo}-{producto_id:07d}'
+        base = mediana * math.exp(rng.gauss(0, dispersion))
+
+        # 80% de los proveedores salen del mismo departamento
+        candidatos = parametros['proveedores'].get(departamento) or todos
+        cantidad = min(rng.randint(minimo, maximo), len(todos))
+        elegidos = []
+        while len(elegidos) < cantidad:
+            origen = candidatos if rng.random() < 0.8 else todos
+            proveedor_id = rng.choice(origen)
+            if proveedor_id not in elegidos:
+                elegidos.append(proveedor_id)
+
+        mas_barato = None
+        activos = 0
+        for proveedor_id in elegidos:
+            costo = _costo(base * rng.uniform(0.85, 1.15))
+            activo = rng.random() < 0.9
+            relaciones.append((
+                producto_id, proveedor_id, f'P{proveedor_id}-{rng.randrange(16 ** 6):06X}', costo, activo
+            ))
+            if activo:
+                activos += 1
+                # Mismo desempate que actualizar_resumen_proveedores: costo y orden de alta
+                if mas_barato is None or costo < mas_barato[0]:
+                    mas_barato = (costo, proveedor_id)
+
+        productos.append((
+            producto_id, clave, nombre, parametros['tipos'][tipo], rng.random() < 0.95,
+            mas_barato[0] if mas_barato else None,
+            activos,
+            mas_barato[1] if mas_barato else None,
+        ))
+
+    return productos, relaciones
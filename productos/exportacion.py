@@ -0,0 +1,105 @@
+"""
+Exportación del catálogo producto × proveedor como flujo.
+
+Las filas se leen por lotes de productos (keyset sobre ``pk``) con un
+``.values()`` plano sobre producto, tipo_producto, producto_proveedor y
+proveedor, así la memoria no crece con el tamaño del catálogo aun en MySQL,
+donde ``iterator()`` no usa cursores del lado del servidor.
+
+Las columnas son compatibles con ``importacion.py``: un archivo exportado
+se puede volver a importar.
+"""
+import csv
+import json
+import tempfile
+
+from .models import Producto
+
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+COLUMNAS = [
+    ('clave', 'clave'),
+    ('nombre', 'nombre'),
+    ('tipo_producto', 'tipo_producto__nombre'),
+    ('producto_activo', 'activo'),
+    ('proveedor', 'producto_proveedores__proveedor__nombre'),
+    ('departamento', 'producto_proveedores__proveedor__departamento'),
+    ('clave_proveedor', 'producto_proveedores__clave_proveedor'),
+    ('costo', 'producto_proveedores__costo'),
+    ('activo', 'producto_proveedores__activo'),
+]
+ENCABEZADOS = [nombre for nombre, _ in COLUMNAS]
+
+
+def filas_catalogo(productos, tamano_lote=2000):
+    """
+    Genera tuplas (en el orden de ``COLUMNAS``) para los productos del
+    queryset, una por relación con proveedor o una sola si no tiene.
+    """
+    ids = productos.order_by('pk').values_list('pk', flat=True)
+    campos = [campo for _, campo in COLUMNAS]
+    ultimo_id = 0
+    while True:
+        lote_ids = list(ids.filter(pk__gt=ultimo_id)[:tamano_lote])
+        if not lote_ids:
+            return
+        filas = Producto.objects.filter(pk__in=lote_ids).order_by(
+            'pk', 'producto_proveedores__proveedor__nombre'
+        ).values_list(*campos)
+        yield from filas.iterator(chunk_size=tamano_lote)
+        ultimo_id = lote_ids[-1]
+
+
+class _Eco:
+    """Buffer que devuelve lo escrito, para usar csv.writer en un flujo"""
+
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(filas):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(ENCABEZADOS)
+    for fila in filas:
+        yield writer.writerow(fila)
+
+
+def exportar_ndjson(filas):
+    for fila in filas:
+        registro = dict(zip(ENCABEZADOS, fila))
+        if registro['costo'] is not None:
+            registro['costo'] = str(registro['costo'])
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+
+def exportar_xlsx(filas, tamano_bloque=64 * 1024):
+    """
+    El formato XLSX es un ZIP y no se puede emitir antes de cerrarlo: las
+    filas se escriben en modo write-only a un archivo temporal y después se
+    envía el archivo por bloques. La memoria se mantiene constante.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('catalogo')
+    hoja.append(ENCABEZADOS)
+    for fila in filas:
+        hoja.append(fila)
+
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while bloque := archivo.read(tamano_bloque):
+            yield bloque
+
+
+EXPORTADORES = {
+    'csv': exportar_csv,
+    'ndjson': exportar_ndjson,
+    'xlsx': exportar_xlsx,
+}
@@ -0,0 +1,85 @@
+"""
+Conteos por faceta para el navegador de productos.
+
+Todas las facetas se calculan sobre el mismo conjunto filtrado con tres
+consultas agrupadas, sin importar el tamaño del catálogo:
+
+1. total, activo/inactivo y rangos de costo (agregación condicional)
+2. conteo por tipo de producto (GROUP BY tipo_producto)
+3. conteo por departamento de proveedores activos (GROUP BY departamento)
+
+Los rangos de costo usan el costo mínimo activo de cada producto.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Q
+
+from .models import Producto, ProductoProveedor
+
+
+RANGOS_COSTO = (Decimal('100'), Decimal('500'), Decimal('1000'), Decimal('5000'))
+
+
+def parsear_rangos(valor):
+    """'100,500,1000' -> (Decimal('100'), ...) ordenados; None si no es válido"""
+    try:
+        limites = sorted({Decimal(parte.strip()) for parte in valor.split(',') if parte.strip()})
+    except InvalidOperation:
+        return None
+    if not limites or len(limites) > 20 or not all(limite.is_finite() for limite in limites):
+        return None
+    return tuple(limites)
+
+
+def calcular_facetas(productos, rangos=RANGOS_COSTO):
+    """``productos`` es el queryset ya filtrado del listado"""
+    base = Producto.objects.filter(pk__in=productos.order_by().values('pk'))
+
+    desdes = (None,) + tuple(rangos)
+    hastas = tuple(rangos) + (None,)
+    conteos = {
+        'total': Count('pk'),
+        'activos': Count('pk', filter=Q(activo=True)),
+        'sin_costo': Count('pk', filter=Q(costo_minimo__isnull=True)),
+    }
+    for i, (desde, hasta) in enumerate(zip(desdes, hastas)):
+        condicion = Q(costo_minimo__isnull=False)
+        if desde is not None:
+            condicion &= Q(costo_minimo__gte=desde)
+        if hasta is not None:
+            condicion &= Q(costo_minimo__lt=hasta)
+        conteos[f'rango_{i}'] = Count('pk', filter=condicion)
+    resumen = base.order_by().aggregate(**conteos)
+
+    tipos = base.order_by().values(
+        'tipo_producto', 'tipo_producto__nombre'
+    ).annotate(total=Count('pk')).order_by('tipo_producto__nombre')
+
+    departamentos = ProductoProveedor.objects.filter(
+        activo=True,
+        producto__in=productos.order_by().values('pk')
+    ).order_by().values('proveedor__departamento').annotate(
+        total=Count('producto', distinct=True)
+    ).order_by('proveedor__departamento')
+
+    return {
+        'total': resumen['total'],
+        'tipo_producto': [
+            {'id': tipo['tipo_producto'], 'nombre': tipo['tipo_producto__nombre'], 'total': tipo['total']}
+            for tipo in tipos
+        ],
+        'departamento': [
+            {'departamento': depto['proveedor__departamento'], 'total': depto['total']}
+            for depto in departamentos
+        ],
+        'activo': [
+            {'activo': True, 'total': resumen['activos']},
+            {'activo': False, 'total': resumen['total'] - resumen['activos']},
+        ],
+        'costo': [
+            {'desde': desde, 'hasta': hasta, 'total': resumen[f'rango_{i}']}
+            for i, (desde, hasta) in enumerate(zip(desdes, hastas))
+        ] + [
+            {'desde': None, 'hasta': None, 'sin_costo': True, 'total': resumen['sin_costo']},
+        ],
+    }
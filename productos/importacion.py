@@ -0,0 +1,254 @@
+"""
+Importación masiva del catálogo de productos y costos de proveedores.
+
+El archivo (CSV o XLSX) se lee como flujo y se procesa por lotes: cada lote
+resuelve tipos de producto y proveedores por nombre con una consulta, y
+escribe productos y relaciones con ``bulk_create(update_conflicts=True)``
+(``ON DUPLICATE KEY UPDATE`` en MySQL, ``ON CONFLICT`` en SQLite).
+La memoria depende del tamaño del lote, no del tamaño del archivo.
+
+Columnas reconocidas (la primera fila es el encabezado):
+
+    clave, nombre, tipo_producto, proveedor, clave_proveedor, costo, activo
+
+``proveedor``, ``clave_proveedor`` y ``costo`` pueden quedar vacíos para dar
+de alta solo el producto. ``activo`` aplica a la relación con el proveedor.
+"""
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connections, router, transaction
+
+from .cache_respuestas import invalidar_respuestas
+from .models import TipoProducto, Proveedor, Producto, ProductoProveedor
+
+
+FORMATOS = ('csv', 'xlsx')
+COLUMNAS_REQUERIDAS = ('clave', 'nombre', 'tipo_producto')
+MAX_ERRORES_REPORTADOS = 100
+LOTE_MAXIMO = 10000
+VALORES_FALSOS = ('0', 'false', 'falso', 'no', 'n')
+COSTO_MAXIMO = Decimal('100000000')  # DecimalField(max_digits=10, decimal_places=2)
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede procesar (formato o encabezados inválidos)"""
+
+
+def detectar_formato(nombre_archivo):
+    extension = nombre_archivo.rsplit('.', 1)[-1].lower() if '.' in nombre_archivo else ''
+    if extension not in FORMATOS:
+        raise ErrorImportacion(f'Formato no soportado: "{extension}". Use csv o xlsx')
+    return extension
+
+
+def leer_filas(archivo, formato):
+    """
+    Genera un diccionario por fila de datos sin cargar el archivo completo.
+    ``archivo`` es un archivo binario abierto.
+    """
+    if formato == 'csv':
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+        try:
+            lector = csv.DictReader(texto)
+            validar_encabezados(lector.fieldnames or [])
+            yield from lector
+        finally:
+            texto.detach()
+    elif formato == 'xlsx':
+        from openpyxl import load_workbook
+
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezados = [
+                str(valor).strip() if valor is not None else ''
+                for valor in next(filas, ())
+            ]
+            validar_encabezados(encabezados)
+            for valores in filas:
+                yield {
+                    encabezado: '' if valor is None else str(valor)
+                    for encabezado, valor in zip(encabezados, valores)
+                }
+        finally:
+            libro.close()
+    else:
+        raise ErrorImportacion(f'Formato no soportado: "{formato}". Use csv o xlsx')
+
+
+def opciones_upsert(modelo, unique_fields, update_fields):
+    """
+    kwargs de ``bulk_create`` para insertar o actualizar. MySQL no acepta
+    ``unique_fields``: ``ON DUPLICATE KEY UPDATE`` usa cualquier índice único
+    (``clave`` del producto, ``(producto, proveedor)`` de la relación).
+    """
+    opciones = {'update_conflicts': True, 'update_fields': update_fields}
+    if connections[router.db_for_write(modelo)].features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = unique_fields
+    return opciones
+
+
+def validar_encabezados(encabezados):
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in encabezados]
+    if faltantes:
+        raise ErrorImportacion(f'Faltan columnas requeridas: {", ".join(faltantes)}')
+
+
+class ImportadorCatalogo:
+    """
+    Aplica las filas del catálogo por lotes y acumula estadísticas.
+
+    Uso::
+
+        importador = ImportadorCatalogo(tamano_lote=2000)
+        resumen = importador.importar(leer_filas(archivo, 'csv'))
+    """
+
+    def __init__(self, tamano_lote=1000):
+        self.tamano_lote = tamano_lote
+        self.tipos = {}
+        self.proveedores = {}
+        self.filas = 0
+        self.productos = 0
+        self.relaciones = 0
+        self.errores = 0
+        self.detalle_errores = []
+
+    def importar(self, filas):
+        inicio = time.perf_counter()
+        # La fila 1 es el encabezado
+        numeradas = enumerate(filas, start=2)
+        while True:
+            lote = list(islice(numeradas, self.tamano_lote))
+            if not lote:
+                break
+            self.procesar_lote(lote)
+
+        segundos = time.perf_counter() - inicio
+        return {
+            'filas': self.filas,
+            'productos': self.productos,
+            'relaciones': self.relaciones,
+            'errores': self.errores,
+            'detalle_errores': self.detalle_errores,
+            'segundos': round(segundos, 3),
+            'filas_por_segundo': round(self.filas / segundos, 1) if segundos else None,
+        }
+
+    def registrar_error(self, linea, mensaje):
+        self.errores += 1
+        if len(self.detalle_errores) < MAX_ERRORES_REPORTADOS:
+            self.detalle_errores.append({'linea': linea, 'error': mensaje})
+
+    def resolver_nombres(self, modelo, cache, nombres):
+        """Completa ``cache`` (nombre -> id) con una consulta para los nombres nuevos"""
+        faltantes = set(nombres) - cache.keys()
+        if faltantes:
+            cache.update(
+                modelo.objects.filter(nombre__in=faltantes).values_list('nombre', 'pk')
+            )
+
+    def procesar_lote(self, lote):
+        self.filas += len(lote)
+        filas = []
+        for linea, fila in lote:
+            fila = {clave: (valor or '').strip() for clave, valor in fila.items() if clave}
+            if not any(fila.values()):
+                continue
+            filas.append((linea, fila))
+
+        self.resolver_nombres(TipoProducto, self.tipos, {f['tipo_producto'] for _, f in filas})
+        self.resolver_nombres(
+            Proveedor, self.proveedores, {f['proveedor'] for _, f in filas if f.get('proveedor')}
+        )
+
+        productos = {}
+        relaciones = {}
+        for linea, fila in filas:
+            error = self.validar_fila(fila)
+            if error:
+                self.registrar_error(linea, error)
+                continue
+
+            productos[fila['clave']] = Producto(
+                clave=fila['clave'],
+                nombre=fila['nombre'],
+                tipo_producto_id=self.tipos[fila['tipo_producto']],
+            )
+            if fila.get('proveedor'):
+                proveedor_id = self.proveedores[fila['proveedor']]
+                relaciones[(fila['clave'], proveedor_id)] = fila
+
+        if not productos:
+            return
+
+        with transaction.atomic():
+            Producto.objects.bulk_create(
+                productos.values(),
+                **opciones_upsert(Producto, ['clave'], ['nombre', 'tipo_producto', 'fecha_modificacion']),
+            )
+            # bulk_create no emite señales: los productos actualizados sin
+            # proveedores también deben invalidar el cache de respuestas
+            invalidar_respuestas()
+            # MySQL no devuelve los ids de un upsert: una consulta por lote
+            ids = dict(
+                Producto.objects.filter(clave__in=productos.keys()).values_list('clave', 'pk')
+            )
+
+            if relaciones:
+                ProductoProveedor.objects.bulk_create(
+                    [
+                        ProductoProveedor(
+                            producto_id=ids[clave],
+                            proveedor_id=proveedor_id,
+                            clave_proveedor=fila['clave_proveedor'],
+                            costo=Decimal(fila['costo']).quantize(Decimal('0.01')),
+                            activo=fila.get('activo', '').lower() not in VALORES_FALSOS,
+                        )
+                        for (clave, proveedor_id), fila in relaciones.items()
+                    ],
+                    **opciones_upsert(
+                        ProductoProveedor, ['producto', 'proveedor'],
+                        ['clave_proveedor', 'costo', 'activo', 'fecha_modificacion'],
+                    ),
+                )
+                Producto.actualizar_resumen_proveedores(
+                    {ids[clave] for clave, _ in relaciones}
+                )
+
+        self.productos += len(productos)
+        self.relaciones += len(relaciones)
+
+    def validar_fila(self, fila):
+        """Retorna el mensaje de error de la fila o None si es válida"""
+        for columna in COLUMNAS_REQUERIDAS:
+            if not fila.get(columna):
+                return f'Falta el valor de "{columna}"'
+        if len(fila['clave']) > 50:
+            return 'La clave excede 50 caracteres'
+        if len(fila['nombre']) > 200:
+            return 'El nombre excede 200 caracteres'
+        if fila['tipo_producto'] not in self.tipos:
+            return f'No existe el tipo de producto "{fila["tipo_producto"]}"'
+
+        if not fila.get('proveedor'):
+            return None
+        if fila['proveedor'] not in self.proveedores:
+            return f'No existe el proveedor "{fila["proveedor"]}"'
+        if not fila.get('clave_proveedor'):
+            return 'Falta el valor de "clave_proveedor"'
+        if len(fila['clave_proveedor']) > 100:
+            return 'La clave del proveedor excede 100 caracteres'
+        try:
+            costo = Decimal(fila.get('costo', ''))
+        except InvalidOperation:
+            return 'El costo debe ser un número válido'
+        if not costo.is_finite() or costo >= COSTO_MAXIMO:
+            return 'El costo debe ser un número válido'
+        if costo.quantize(Decimal('0.01')) <= Decimal('0'):
+            return 'El costo debe ser mayor a 0'
+        return None
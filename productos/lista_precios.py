@@ -0,0 +1,213 @@
+"""
+Carga de la lista de precios completa de un proveedor.
+
+Cada línea trae ``clave_proveedor`` y/o ``clave`` (clave del producto),
+``costo`` y opcionalmente ``activo``. Por lote se hace una consulta indexada
+que busca las relaciones existentes del proveedor por cualquiera de las dos
+claves; las líneas sin relación pero con un producto existente crean una
+nueva. Los cambios se aplican con ``bulk_create``/``bulk_update`` y todo el
+archivo corre en una sola transacción.
+
+Con ``desactivar_faltantes`` las relaciones activas del proveedor que no
+aparecen en la lista quedan inactivas.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .importacion import COSTO_MAXIMO, MAX_ERRORES_REPORTADOS, VALORES_FALSOS
+from .models import Producto, ProductoProveedor
+
+
+CAMPOS_ACTUALIZABLES = ['clave_proveedor', 'costo', 'activo', 'fecha_modificacion']
+
+
+class ErrorListaPrecios(Exception):
+    """El cuerpo de la petición no tiene la forma esperada"""
+
+
+def leer_activo(valor):
+    if valor is None or valor == '':
+        return True
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).strip().lower() not in VALORES_FALSOS
+
+
+class ListaPrecios:
+    """
+    Uso::
+
+        resumen = ListaPrecios(proveedor).aplicar(lineas, desactivar_faltantes=True)
+    """
+
+    def __init__(self, proveedor, tamano_lote=1000):
+        self.proveedor = proveedor
+        self.tamano_lote = tamano_lote
+        self.relaciones_vistas = set()
+        self.productos_nuevos = set()
+        self.creados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.desactivados = 0
+        self.errores = 0
+        self.sin_coincidencia = []
+        self.detalle_errores = []
+
+    def aplicar(self, lineas, desactivar_faltantes=False):
+        if not isinstance(lineas, list):
+            raise ErrorListaPrecios('"lineas" debe ser una lista')
+
+        numeradas = list(enumerate(lineas, start=1))
+        with transaction.atomic():
+            for inicio in range(0, len(numeradas), self.tamano_lote):
+                self.procesar_lote(numeradas[inicio:inicio + self.tamano_lote])
+            if desactivar_faltantes:
+                self.desactivar_faltantes()
+
+        return {
+            'lineas': len(lineas),
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'sin_cambios': self.sin_cambios,
+            'desactivados': self.desactivados,
+            'sin_coincidencia': len(self.sin_coincidencia),
+            'errores': self.errores,
+            'detalle_sin_coincidencia': self.sin_coincidencia[:MAX_ERRORES_REPORTADOS],
+            'detalle_errores': self.detalle_errores,
+        }
+
+    def registrar_error(self, linea, mensaje):
+        self.errores += 1
+        if len(self.detalle_errores) < MAX_ERRORES_REPORTADOS:
+            self.detalle_errores.append({'linea': linea, 'error': mensaje})
+
+    def validar_linea(self, linea):
+        """Retorna ``(datos, error)`` con la línea normalizada"""
+        if not isinstance(linea, dict):
+            return None, 'Cada línea debe ser un objeto'
+
+        clave_proveedor = str(linea.get('clave_proveedor') or '').strip()
+        clave = str(linea.get('clave') or '').strip()
+        if not clave_proveedor and not clave:
+            return None, 'Debe indicar "clave_proveedor" o "clave"'
+        if len(clave_proveedor) > 100:
+            return None, 'La clave del proveedor excede 100 caracteres'
+
+        try:
+            costo = Decimal(str(linea.get('costo', '')).strip())
+        except InvalidOperation:
+            return None, 'El costo debe ser un número válido'
+        if not costo.is_finite() or costo >= COSTO_MAXIMO:
+            return None, 'El costo debe ser un número válido'
+        costo = costo.quantize(Decimal('0.01'))
+        if costo <= Decimal('0'):
+            return None, 'El costo debe ser mayor a 0'
+
+        return {
+            'clave_proveedor': clave_proveedor,
+            'clave': clave,
+            'costo': costo,
+            'activo': leer_activo(linea.get('activo')),
+        }, None
+
+    def procesar_lote(self, lote):
+        validas = []
+        for numero, linea in lote:
+            datos, error = self.validar_linea(linea)
+            if error:
+                self.registrar_error(numero, error)
+            else:
+                validas.append((numero, datos))
+        if not validas:
+            return
+
+        # Una consulta por lote: relaciones del proveedor por cualquiera de las dos claves
+        claves_proveedor = {datos['clave_proveedor'] for _, datos in validas if datos['clave_proveedor']}
+        claves = {datos['clave'] for _, datos in validas if datos['clave']}
+        existentes = ProductoProveedor.objects.filter(proveedor=self.proveedor).filter(
+            Q(clave_proveedor__in=claves_proveedor) | Q(producto__clave__in=claves)
+        ).annotate(clave_producto=F('producto__clave'))
+        por_clave_proveedor = {}
+        por_clave = {}
+        for relacion in existentes:
+            por_clave_proveedor.setdefault(relacion.clave_proveedor, relacion)
+            por_clave[relacion.clave_producto] = relacion
+
+        # Productos sin relación con el proveedor: se crea la relación
+        claves_nuevas = {
+            datos['clave'] for _, datos in validas
+            if datos['clave']
+            and datos['clave_proveedor'] not in por_clave_proveedor
+            and datos['clave'] not in por_clave
+        }
+        productos = dict(
+            Producto.objects.filter(clave__in=claves_nuevas).values_list('clave', 'pk')
+        ) if claves_nuevas else {}
+
+        ahora = timezone.now()
+        actualizar = {}
+        nuevas = {}
+        for numero, datos in validas:
+            relacion = por_clave_proveedor.get(datos['clave_proveedor']) or por_clave.get(datos['clave'])
+            if relacion is None and datos['clave'] in productos:
+                nuevas[productos[datos['clave']]] = ProductoProveedor(
+                    producto_id=productos[datos['clave']],
+                    proveedor=self.proveedor,
+                    clave_proveedor=datos['clave_proveedor'] or datos['clave'],
+                    costo=datos['costo'],
+                    activo=datos['activo'],
+                )
+                continue
+            if relacion is None:
+                self.sin_coincidencia.append({
+                    'linea': numero,
+                    'clave_proveedor': datos['clave_proveedor'],
+                    'clave': datos['clave'],
+                })
+                continue
+
+            self.relaciones_vistas.add(relacion.pk)
+            clave_proveedor = datos['clave_proveedor'] or relacion.clave_proveedor
+            if (relacion.costo, relacion.activo, relacion.clave_proveedor) == (
+                datos['costo'], datos['activo'], clave_proveedor
+            ):
+                if relacion.pk not in actualizar:
+                    self.sin_cambios += 1
+                continue
+            relacion.costo = datos['costo']
+            relacion.activo = datos['activo']
+            relacion.clave_proveedor = clave_proveedor
+            relacion.fecha_modificacion = ahora
+            actualizar[relacion.pk] = relacion
+
+        if nuevas:
+            ProductoProveedor.objects.bulk_create(nuevas.values())
+            self.productos_nuevos.update(nuevas)
+        if actualizar:
+            ProductoProveedor.objects.bulk_update(actualizar.values(), CAMPOS_ACTUALIZABLES)
+
+        self.creados += len(nuevas)
+        self.actualizados += len(actualizar)
+        afectados = set(nuevas) | {relacion.producto_id for relacion in actualizar.values()}
+        if afectados:
+            Producto.actualizar_resumen_proveedores(afectados)
+
+    def desactivar_faltantes(self):
+        # En MySQL bulk_create no devuelve los ids: las relaciones recién
+        # creadas se reconocen por producto (único por proveedor)
+        filas = list(
+            ProductoProveedor.objects.filter(proveedor=self.proveedor, activo=True)
+            .exclude(pk__in=self.relaciones_vistas)
+            .exclude(producto_id__in=self.productos_nuevos)
+            .values_list('pk', 'producto_id')
+        )
+        if not filas:
+            return
+        ProductoProveedor.objects.filter(pk__in=[pk for pk, _ in filas]).update(
+            activo=False, fecha_modificacion=timezone.now()
+        )
+        self.desactivados = len(filas)
+        Producto.actualizar_resumen_proveedores({producto_id for _, producto_id in filas})
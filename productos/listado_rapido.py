@@ -0,0 +1,169 @@
+"""
+Listado rápido: filas de ``values()`` convertidas con extractores
+precompilados, sin instanciar modelos ni recorrer los campos del serializer
+por cada fila.
+
+Los extractores se derivan una vez por serializer (y por combinación de
+``?fields=``/``?exclude=``) a partir de sus campos, y producen los mismos
+valores de Python que el serializer: ids de llaves foráneas, nombres de
+relaciones por JOIN, Decimal cuantizado como texto o float según
+``coerce_to_string``. El JSONRenderer de siempre los convierte en los mismos
+bytes, y como son tipos simples todo el trabajo lo hace el codificador en C
+de ``json``.
+
+Si el serializer tiene un campo que no se puede traducir a una columna (un
+método, un serializer anidado, una fecha con formato), el listado usa el
+serializer normal. ``PRODUCTOS_LISTADO_RAPIDO = False`` lo desactiva.
+"""
+import decimal
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import CharField, QuerySet, TextField
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .campos import origenes
+
+
+_compilados = {}
+
+
+def conversion_decimal(campo):
+    """Misma cuantización que ``DecimalField.to_representation``; None si no se replica"""
+    if campo.decimal_places is None or campo.normalize_output or campo.localize:
+        return None
+    exponente = decimal.Decimal('.1') ** campo.decimal_places
+    contexto = decimal.getcontext().copy()
+    if campo.max_digits is not None:
+        contexto.prec = campo.max_digits
+    redondeo = campo.rounding
+
+    if getattr(campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+        return lambda valor: f'{valor.quantize(exponente, rounding=redondeo, context=contexto):f}'
+    # JSONRenderer convierte Decimal con float()
+    return lambda valor: float(valor.quantize(exponente, rounding=redondeo, context=contexto))
+
+
+def extractor(modelo, nombre, campo):
+    """
+    ``(nombre, ruta de values(), conversión o None)``; None si el campo no se
+    puede leer de una columna con el mismo resultado que el serializer.
+    """
+    resuelto = origenes(modelo, campo.source_attrs)
+    if resuelto is None or resuelto[2]:
+        return None
+    ruta = '__'.join(campo.source_attrs)
+
+    if isinstance(campo, serializers.PrimaryKeyRelatedField):
+        if campo.pk_field is not None or len(campo.source_attrs) != 1:
+            return None
+        return nombre, ruta, None
+    if isinstance(campo, serializers.DecimalField):
+        conversion = conversion_decimal(campo)
+        return None if conversion is None else (nombre, ruta, conversion)
+    if isinstance(campo, (serializers.IntegerField, serializers.BooleanField)):
+        return nombre, ruta, None
+    if isinstance(campo, serializers.CharField):
+        columna = modelo._meta.get_field(campo.source_attrs[0])
+        for atributo in campo.source_attrs[1:]:
+            columna = columna.related_model._meta.get_field(atributo)
+        return nombre, ruta, None if isinstance(columna, (CharField, TextField)) else str
+    if type(campo) is serializers.ReadOnlyField:
+        return nombre, ruta, None
+    return None
+
+
+def compilar(modelo, campos):
+    """
+    ``(rutas, construir)`` para ``campos`` (``{nombre: campo enlazado}``);
+    None si algún campo no tiene extractor.
+    """
+    extractores = [extractor(modelo, nombre, campo) for nombre, campo in campos.items()]
+    if not extractores or None in extractores:
+        return None
+
+    nombres = tuple(nombre for nombre, _, _ in extractores)
+    rutas = tuple(ruta for _, ruta, _ in extractores)
+    conversiones = tuple((i, conversion) for i, (_, _, conversion) in enumerate(extractores) if conversion)
+    leer = itemgetter(*rutas) if len(rutas) > 1 else (lambda fila: (fila[rutas[0]],))
+
+    if not conversiones:
+        def construir(fila):
+            return dict(zip(nombres, leer(fila)))
+    else:
+        def construir(fila):
+            valores = list(leer(fila))
+            for i, conversion in conversiones:
+                if valores[i] is not None:
+                    valores[i] = conversion(valores[i])
+            return dict(zip(nombres, valores))
+
+    return rutas, construir
+
+
+class ListadoRapidoMixin:
+    """
+    Listado desde ``values()`` con el mismo JSON que el serializer. Debe ir
+    antes de GetCondicionalMixin y CamposDispersosMixin en las bases.
+    """
+
+    def listado_rapido(self):
+        """``(rutas, construir)`` para la petición actual; None si aplica el serializer"""
+        if self.action != 'list' or not getattr(settings, 'PRODUCTOS_LISTADO_RAPIDO', True):
+            return None
+        if not hasattr(self, '_listado_rapido'):
+            disponibles = self.campos_serializer()
+            campos = self.campos_solicitados() or list(disponibles)
+            clave = (self.get_serializer_class(), tuple(campos))
+            if clave not in _compilados:
+                _compilados[clave] = compilar(
+                    self.queryset.model, {nombre: disponibles[nombre] for nombre in campos}
+                )
+            self._listado_rapido = _compilados[clave]
+        return self._listado_rapido
+
+    def filas_rapidas(self, queryset, rutas):
+        modelo = queryset.model
+        # Orden estable de columnas; la relevancia de la búsqueda ordena las
+        # páginas de la paginación por cursor
+        columnas = dict.fromkeys((modelo._meta.pk.attname,) + tuple(rutas))
+        columnas.update(dict.fromkeys(sorted(self.columnas_internas(modelo))))
+        columnas.update(dict.fromkeys(queryset.query.annotations))
+        return queryset.select_related(None).prefetch_related(None).values(*columnas)
+
+    def queryset_a_paginar(self, queryset):
+        compilado = self.listado_rapido()
+        if compilado is not None:
+            queryset = self.filas_rapidas(queryset, compilado[0])
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.queryset_a_paginar(queryset))
+
+    async def apaginate_queryset(self, queryset):
+        return await super().apaginate_queryset(self.queryset_a_paginar(queryset))
+
+    def validadores_pagina(self, page):
+        if self.listado_rapido() is None:
+            return super().validadores_pagina(page)
+        pk = self.queryset.model._meta.pk.attname
+        return [(fila[pk], fila['fecha_modificacion']) for fila in page]
+
+    def datos_listado(self, objetos):
+        compilado = self.listado_rapido()
+        if compilado is None:
+            return super().datos_listado(objetos)
+        rutas, construir = compilado
+        if isinstance(objetos, QuerySet):
+            objetos = self.filas_rapidas(objetos, rutas)
+        return [construir(fila) for fila in objetos]
+
+    async def adatos_listado(self, objetos):
+        compilado = self.listado_rapido()
+        if compilado is None:
+            return await super().adatos_listado(objetos)
+        rutas, construir = compilado
+        if isinstance(objetos, QuerySet):
+            return [construir(fila) async for fila in self.filas_rapidas(objetos, rutas).aiterator()]
+        return [construir(fila) for fila in objetos]
@@ -0,0 +1,309 @@
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from productos.models import Producto
+from .benchmark_endpoints import Command as BenchmarkEndpoints, percentil
+
+
+# (módulo del servidor, argumentos, variables de entorno)
+SERVIDORES = {
+    'wsgi': (
+        'gunicorn',
+        ['--worker-class', 'gthread', '--workers', '{procesos}', '--threads', '{hilos}',
+         '--bind', '127.0.0.1:{puerto}', '--keep-alive', '30', 'distribuidora.wsgi:application'],
+        {'PRODUCTOS_VISTAS_ASYNC': '0'},
+    ),
+    'asgi_sync': (
+        'uvicorn',
+        ['--workers', '{procesos}', '--host', '127.0.0.1', '--port', '{puerto}', '--no-access-log',
+         '--timeout-keep-alive', '30', 'distribuidora.asgi:application'],
+        {'PRODUCTOS_VISTAS_ASYNC': '0'},
+    ),
+    'asgi': (
+        'uvicorn',
+        ['--workers', '{procesos}', '--host', '127.0.0.1', '--port', '{puerto}', '--no-access-log',
+         '--timeout-keep-alive', '30', 'distribuidora.asgi:application'],
+        {'PRODUCTOS_VISTAS_ASYNC': '1'},
+    ),
+}
+
+
+async def peticion(lector, escritor, ruta):
+    """GET HTTP/1.1 sobre una conexión abierta; ``(estado, cerrar_conexion)``"""
+    escritor.write(
+        f'GET {ruta} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: application/json\r\n\r\n'.encode()
+    )
+    await escritor.drain()
+    estado = int((await lector.readline()).split()[1])
+
+    largo, fragmentado, cerrar = None, False, False
+    while True:
+        linea = await lector.readline()
+        if linea in (b'\r\n', b''):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        nombre, valor = nombre.strip().lower(), valor.strip().lower()
+        if nombre == 'content-length':
+            largo = int(valor)
+        elif nombre == 'transfer-encoding':
+            fragmentado = 'chunked' in valor
+        elif nombre == 'connection':
+            cerrar = valor == 'close'
+
+    if fragmentado:
+        while True:
+            tamano = int((await lector.readline()).split(b';')[0], 16)
+            await lector.readexactly(tamano + 2)
+            if not tamano:
+                break
+    elif largo is not None:
+        await lector.readexactly(largo)
+    else:
+        await lector.read()
+        cerrar = True
+    return estado, cerrar
+
+
+async def trabajador(puerto, rutas, inicio_rutas, fin, mediciones):
+    """Un cliente con conexión keep-alive que pide ``rutas`` en ronda hasta ``fin``"""
+    conexion = None
+    n = inicio_rutas
+    while time.perf_counter() < fin:
+        nombre, ruta = rutas[n % len(rutas)]
+        n += 1
+        inicio = time.perf_counter()
+        try:
+            if conexion is None:
+                conexion = await asyncio.open_connection('127.0.0.1', puerto)
+            estado, cerrar = await peticion(*conexion, ruta)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            estado, cerrar = 0, True
+        mediciones.append((nombre, time.perf_counter() - inicio, estado))
+        if cerrar and conexion is not None:
+            conexion[1].close()
+            conexion = None
+    if conexion is not None:
+        conexion[1].close()
+
+
+async def medir_carga(puerto, rutas, concurrencia, duracion):
+    """``concurrencia`` clientes simultáneos durante ``duracion`` segundos"""
+    mediciones = []
+    fin = time.perf_counter() + duracion
+    await asyncio.gather(*(
+        trabajador(puerto, rutas, i, fin, mediciones) for i in range(concurrencia)
+    ))
+    return mediciones
+
+
+def resumir(mediciones, duracion):
+    if not mediciones:
+        return {'peticiones': 0, 'errores': 0}
+    tiempos = [segundos * 1000 for _, segundos, _ in mediciones]
+    resumen = {
+        'peticiones': len(mediciones),
+        'peticiones_por_segundo': round(len(mediciones) / duracion, 1),
+        'p50_ms': round(percentil(tiempos, 50), 2),
+        'p95_ms': round(percentil(tiempos, 95), 2),
+        'p99_ms': round(percentil(tiempos, 99), 2),
+        'max_ms': round(max(tiempos), 2),
+        'errores': sum(1 for _, _, estado in mediciones if not 200 <= estado < 400),
+        'escenarios': {},
+    }
+    for nombre in dict.fromkeys(nombre for nombre, _, _ in mediciones):
+        propios = [segundos * 1000 for escenario, segundos, _ in mediciones if escenario == nombre]
+        resumen['escenarios'][nombre] = {
+            'p50_ms': round(percentil(propios, 50), 2),
+            'p99_ms': round(percentil(propios, 99), 2),
+        }
+    return resumen
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara las lecturas síncronas bajo WSGI (gunicorn gthread) con las vistas '
+        'asíncronas bajo ASGI (uvicorn): peticiones por segundo y latencia p50/p95/p99 '
+        'con varios niveles de concurrencia. Usar con --settings=distribuidora.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', type=int, default=1000, help='Productos del catálogo (default: 1000)')
+        parser.add_argument(
+            '--modos',
+            default='wsgi,asgi_sync,asgi',
+            help=f'Servidores a comparar, separados por coma: {", ".join(SERVIDORES)} (default: todos)',
+        )
+        parser.add_argument(
+            '--concurrencia',
+            default='1,16,64,256',
+            help='Clientes simultáneos, separados por coma (default: 1,16,64,256)',
+        )
+        parser.add_argument('--duracion', type=float, default=10, help='Segundos medidos por nivel (default: 10)')
+        parser.add_argument('--calentamiento', type=float, default=2, help='Segundos sin medir por nivel (default: 2)')
+        parser.add_argument('--procesos', type=int, default=1, help='Workers de cada servidor (default: 1)')
+        parser.add_argument('--hilos', type=int, default=8, help='Hilos por worker de gunicorn (default: 8)')
+        parser.add_argument('--puerto', type=int, default=8765, help='Puerto local de los servidores (default: 8765)')
+        parser.add_argument(
+            '--reporte', default='benchmark_asgi.json', help='Archivo JSON del reporte (default: benchmark_asgi.json)'
+        )
+        parser.add_argument('--regenerar', action='store_true', help='Vuelve a generar el catálogo')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'El benchmark corre sobre SQLite: use --settings=distribuidora.settings_benchmark'
+            )
+        modos = [modo.strip() for modo in kwargs['modos'].split(',') if modo.strip()]
+        desconocidos = [modo for modo in modos if modo not in SERVIDORES]
+        if desconocidos:
+            raise CommandError(f'Modos desconocidos: {", ".join(desconocidos)}')
+        faltantes = sorted({SERVIDORES[modo][0] for modo in modos if importlib.util.find_spec(SERVIDORES[modo][0]) is None})
+        if faltantes:
+            raise CommandError(f'Instale {" y ".join(faltantes)} para este benchmark (pip install {" ".join(faltantes)})')
+        try:
+            niveles = [int(valor) for valor in kwargs['concurrencia'].split(',') if valor.strip()]
+        except ValueError:
+            raise CommandError('--concurrencia debe ser una lista de enteros separados por coma')
+
+        directorio = os.path.dirname(connection.settings_dict['NAME']) or '.'
+        os.makedirs(directorio, exist_ok=True)
+        BenchmarkEndpoints(stdout=self.stdout, stderr=self.stderr).preparar_base(
+            directorio, kwargs['tamano'], kwargs['regenerar']
+        )
+        base = os.path.abspath(connection.settings_dict['NAME'])
+        rutas = self.rutas()
+        connection.close()
+
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'tamano': kwargs['tamano'],
+            'procesos': kwargs['procesos'],
+            'hilos_wsgi': kwargs['hilos'],
+            'duracion': kwargs['duracion'],
+            'rutas': dict(rutas),
+            'resultados': {},
+        }
+        for modo in modos:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n {modo}'))
+            with self.servidor(modo, base, kwargs):
+                reporte['resultados'][modo] = {}
+                for concurrencia in niveles:
+                    asyncio.run(medir_carga(kwargs['puerto'], rutas, concurrencia, kwargs['calentamiento']))
+                    mediciones = asyncio.run(medir_carga(kwargs['puerto'], rutas, concurrencia, kwargs['duracion']))
+                    resumen = resumir(mediciones, kwargs['duracion'])
+                    reporte['resultados'][modo][str(concurrencia)] = resumen
+                    self.stdout.write(
+                        f'   c={concurrencia:<4} {resumen.get("peticiones_por_segundo", 0):8.1f} req/s  '
+                        f'p50={resumen.get("p50_ms", 0):8.2f} ms  p95={resumen.get("p95_ms", 0):8.2f} ms  '
+                        f'p99={resumen.get("p99_ms", 0):8.2f} ms  errores={resumen["errores"]}'
+                    )
+
+        reporte['comparacion'] = self.comparar(reporte['resultados'])
+        with open(kwargs['reporte'], 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(f'\n Reporte: {kwargs["reporte"]}\n')
+
+    def rutas(self):
+        producto = Producto.objects.filter(cantidad_proveedores__gte=2).order_by('pk').first()
+        if producto is None:
+            raise CommandError('El catálogo de benchmark está vacío')
+        lista = reverse('producto-list')
+        return [
+            ('lista', lista),
+            ('lista_tipo_producto', f'{lista}?tipo_producto={producto.tipo_producto_id}&total=exacto'),
+            ('detalle', reverse('producto-detail', args=[producto.pk])),
+            ('proveedores', reverse('producto-proveedores', args=[producto.pk])),
+            ('departamentos', reverse('proveedor-departamentos')),
+            ('tipos_producto', reverse('tipoproducto-list')),
+        ]
+
+    def servidor(self, modo, base, kwargs):
+        comando = self
+
+        class Servidor:
+            def __enter__(self):
+                modulo, argumentos, entorno = SERVIDORES[modo]
+                argumentos = [
+                    argumento.format(procesos=kwargs['procesos'], hilos=kwargs['hilos'], puerto=kwargs['puerto'])
+                    for argumento in argumentos
+                ]
+                self.proceso = subprocess.Popen(
+                    [sys.executable, '-m', modulo, *argumentos],
+                    cwd=str(settings.BASE_DIR),
+                    env={**os.environ, **entorno, 'BENCHMARK_DB': base},
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                )
+                comando.esperar_servidor(self.proceso, kwargs['puerto'])
+                return self
+
+            def __exit__(self, *exc):
+                self.proceso.send_signal(signal.SIGTERM)
+                try:
+                    self.proceso.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    self.proceso.kill()
+                    self.proceso.wait()
+
+        return Servidor()
+
+    def esperar_servidor(self, proceso, puerto, limite=30):
+        async def responde():
+            lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+            try:
+                estado, _ = await peticion(lector, escritor, reverse('tipoproducto-list'))
+                return estado == 200
+            finally:
+                escritor.close()
+
+        fin = time.monotonic() + limite
+        while time.monotonic() < fin:
+            if proceso.poll() is not None:
+                raise CommandError(f'El servidor terminó al arrancar:\n{proceso.stderr.read().decode(errors="replace")}')
+            try:
+                if asyncio.run(responde()):
+                    return
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                pass
+            time.sleep(0.2)
+        proceso.kill()
+        raise CommandError(f'El servidor no respondió en {limite} segundos')
+
+    def comparar(self, resultados):
+        """Por nivel de concurrencia, cada modo contra wsgi: throughput y p99 relativos"""
+        base = resultados.get('wsgi')
+        if not base:
+            return {}
+        comparacion = {}
+        for modo, niveles in resultados.items():
+            if modo == 'wsgi':
+                continue
+            for concurrencia, resumen in niveles.items():
+                referencia = base.get(concurrencia)
+                if not referencia or not referencia.get('peticiones') or not resumen.get('peticiones'):
+                    continue
+                comparacion.setdefault(modo, {})[concurrencia] = {
+                    'throughput': round(resumen['peticiones_por_segundo'] / referencia['peticiones_por_segundo'], 2),
+                    'p99': round(resumen['p99_ms'] / referencia['p99_ms'], 2),
+                }
+                self.stdout.write(
+                    f'   {modo} c={concurrencia}: throughput x{comparacion[modo][concurrencia]["throughput"]}, '
+                    f'p99 x{comparacion[modo][concurrencia]["p99"]} respecto a wsgi'
+                )
+        return comparacion
@@ -0,0 +1,283 @@
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from productos.models import TipoProducto, Producto
+
+
+TAMANOS = (1000, 100000, 1000000)
+
+# Consultas SQL máximas por petición; no deben crecer con el catálogo
+PRESUPUESTOS_CONSULTAS = {
+    'lista': 3,
+    'lista_clave': 3,
+    'lista_tipo_producto': 3,
+    'lista_activo': 3,
+    'lista_costo_min': 3,
+    'lista_costo_max': 3,
+    'lista_costo_rango': 3,
+    'lista_departamento': 3,
+    'lista_search': 3,
+    'detalle': 6,
+    'proveedores': 2,
+    'departamentos': 1,
+    'crear': 8,
+    'actualizar': 12,
+}
+
+
+def escenarios(contexto):
+    """``(nombre, método, url, datos)``; ``datos`` puede depender del número de repetición"""
+    lista = reverse('producto-list')
+    producto = contexto['producto']
+    filtros = [
+        ('lista', {}),
+        ('lista_clave', {'clave': producto.clave[:6]}),
+        ('lista_tipo_producto', {'tipo_producto': producto.tipo_producto_id}),
+        ('lista_activo', {'activo': 'true'}),
+        ('lista_costo_min', {'costo_min': '100'}),
+        ('lista_costo_max', {'costo_max': '500'}),
+        ('lista_costo_rango', {'costo_min': '100', 'costo_max': '500'}),
+        ('lista_departamento', {'departamento': 'Electrónicos'}),
+        ('lista_search', {'search': producto.nombre.split()[0]}),
+    ]
+    proveedores = [
+        {'proveedor': relacion.proveedor_id, 'clave_proveedor': relacion.clave_proveedor, 'costo': str(relacion.costo)}
+        for relacion in producto.producto_proveedores.all()
+    ]
+
+    def crear(n):
+        return {
+            'clave': f'BENCH-{contexto["corrida"]}-{n:05d}',
+            'nombre': f'Producto de benchmark {n}',
+            'tipo_producto': producto.tipo_producto_id,
+            'proveedores': proveedores,
+        }
+
+    def actualizar(n):
+        # Alterna el costo del primer proveedor para que siempre haya cambios
+        cambiados = [dict(prov) for prov in proveedores]
+        if cambiados:
+            cambiados[0]['costo'] = '%.2f' % (float(cambiados[0]['costo']) + (n % 2) + 1)
+        return {
+            'clave': producto.clave,
+            'nombre': producto.nombre,
+            'tipo_producto': producto.tipo_producto_id,
+            'proveedores': cambiados,
+        }
+
+    return [
+        (nombre, 'get', lista, parametros) for nombre, parametros in filtros
+    ] + [
+        ('detalle', 'get', reverse('producto-detail', args=[producto.pk]), {}),
+        ('proveedores', 'get', reverse('producto-proveedores', args=[producto.pk]), {}),
+        ('departamentos', 'get', reverse('proveedor-departamentos'), {}),
+        ('crear', 'post', lista, crear),
+        ('actualizar', 'put', reverse('producto-detail', args=[producto.pk]), actualizar),
+    ]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95/p99), consultas SQL y memoria pico de los endpoints '
+        'principales sobre catálogos sintéticos en SQLite y escribe un reporte JSON. '
+        'Usar con --settings=distribuidora.settings_benchmark'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos',
+            default='1000',
+            help=f'Tamaños de catálogo separados por coma (ej. {",".join(map(str, TAMANOS))}; default: 1000)',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=30,
+            help='Peticiones medidas por escenario (default: 30)',
+        )
+        parser.add_argument(
+            '--reporte',
+            default='benchmark_endpoints.json',
+            help='Archivo JSON donde se escribe el reporte (default: benchmark_endpoints.json)',
+        )
+        parser.add_argument(
+            '--linea-base',
+            help='Reporte anterior contra el que se comparan latencia, consultas y memoria',
+        )
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=0.25,
+            help='Aumento máximo permitido sobre la línea base, como fracción (default: 0.25)',
+        )
+        parser.add_argument(
+            '--regenerar',
+            action='store_true',
+            help='Vuelve a generar los catálogos aunque ya existan',
+        )
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                'El benchmark corre sobre SQLite: use --settings=distribuidora.settings_benchmark'
+            )
+        try:
+            tamanos = [int(valor) for valor in kwargs['tamanos'].split(',') if valor.strip()]
+        except ValueError:
+            raise CommandError('--tamanos debe ser una lista de enteros separados por coma')
+
+        directorio = os.path.dirname(connection.settings_dict['NAME']) or '.'
+        os.makedirs(directorio, exist_ok=True)
+
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': connection.Database.sqlite_version,
+            'repeticiones': kwargs['repeticiones'],
+            'resultados': {},
+        }
+        for tamano in tamanos:
+            self.preparar_base(directorio, tamano, kwargs['regenerar'])
+            reporte['resultados'][str(tamano)] = self.medir(kwargs['repeticiones'])
+
+        fallas = self.verificar(reporte, kwargs['linea_base'], kwargs['tolerancia'])
+        reporte['fallas'] = fallas
+        with open(kwargs['reporte'], 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(f'\n Reporte: {kwargs["reporte"]}\n')
+
+        if fallas:
+            for falla in fallas:
+                self.stderr.write(self.style.ERROR(f'   ✗ {falla}'))
+            raise CommandError(f'{len(fallas)} escenarios fuera de presupuesto o de la línea base')
+        self.stdout.write(self.style.SUCCESS(' Todos los escenarios dentro de presupuesto\n'))
+
+    def preparar_base(self, directorio, tamano, regenerar):
+        """Apunta la conexión a ``benchmark_<tamano>.sqlite3`` y lo puebla si hace falta"""
+        ruta = os.path.join(directorio, f'benchmark_{tamano}.sqlite3')
+        if regenerar and os.path.exists(ruta):
+            os.remove(ruta)
+
+        connection.close()
+        connection.settings_dict['NAME'] = ruta
+        call_command('migrate', verbosity=0)
+
+        existentes = Producto.objects.count()
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n Catálogo de {tamano} productos ({ruta})'))
+        if existentes < tamano:
+            call_command(
+                'poblar_datos',
+                productos=tamano - existentes,
+                proveedores=max(20, tamano // 200),
+                proveedores_por_producto='1-8',
+                seed=42,
+                lote=5000,
+                procesos=min(os.cpu_count() or 1, 4) if tamano >= 100000 else 1,
+                stdout=self.stdout,
+            )
+
+    def medir(self, repeticiones):
+        cliente = APIClient(SERVER_NAME='localhost')
+        producto = Producto.objects.filter(
+            cantidad_proveedores__gte=2, clave__regex=r'^[A-Z]{3}-'
+        ).order_by('pk').first() or Producto.objects.order_by('pk').first()
+        if producto is None or not TipoProducto.objects.exists():
+            raise CommandError('El catálogo de benchmark está vacío')
+
+        contexto = {'producto': producto, 'corrida': int(time.time())}
+        resultados = {}
+        for nombre, metodo, url, datos in escenarios(contexto):
+            peticion = getattr(cliente, metodo)
+
+            def ejecutar(n):
+                valor = datos(n) if callable(datos) else datos
+                if metodo == 'get':
+                    return peticion(url, valor)
+                return peticion(url, valor, format='json')
+
+            # Calentamiento (conexión, caches de Python, plan de SQLite)
+            ejecutar(-1)
+
+            tiempos = []
+            consultas = []
+            for n in range(repeticiones):
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    respuesta = ejecutar(n)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                consultas.append(len(capturadas))
+                if respuesta.status_code >= 400:
+                    raise CommandError(f'{nombre}: {metodo.upper()} {url} respondió {respuesta.status_code}')
+
+            # Memoria en una corrida aparte: tracemalloc distorsiona los tiempos
+            tracemalloc.start()
+            ejecutar(repeticiones)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            resultados[nombre] = {
+                'p50_ms': round(percentil(tiempos, 50), 3),
+                'p95_ms': round(percentil(tiempos, 95), 3),
+                'p99_ms': round(percentil(tiempos, 99), 3),
+                'media_ms': round(statistics.mean(tiempos), 3),
+                'max_ms': round(max(tiempos), 3),
+                'consultas': max(consultas),
+                'memoria_pico_kb': round(pico / 1024, 1),
+            }
+            self.stdout.write(
+                f'   {nombre:22} p50={resultados[nombre]["p50_ms"]:8.2f} ms  '
+                f'p95={resultados[nombre]["p95_ms"]:8.2f} ms  '
+                f'consultas={resultados[nombre]["consultas"]:3}  '
+                f'memoria={resultados[nombre]["memoria_pico_kb"]:8.1f} KB'
+            )
+        return resultados
+
+    def verificar(self, reporte, linea_base, tolerancia):
+        fallas = []
+        for tamano, resultados in reporte['resultados'].items():
+            for nombre, medicion in resultados.items():
+                presupuesto = PRESUPUESTOS_CONSULTAS.get(nombre)
+                if presupuesto is not None and medicion['consultas'] > presupuesto:
+                    fallas.append(
+                        f'[{tamano}] {nombre}: {medicion["consultas"]} consultas (presupuesto {presupuesto})'
+                    )
+
+        if not linea_base:
+            return fallas
+        with open(linea_base, encoding='utf-8') as archivo:
+            base = json.load(archivo)['resultados']
+
+        for tamano, resultados in reporte['resultados'].items():
+            for nombre, medicion in resultados.items():
+                anterior = base.get(tamano, {}).get(nombre)
+                if anterior is None:
+                    continue
+                for metrica in ('p95_ms', 'consultas', 'memoria_pico_kb'):
+                    limite = anterior[metrica] * (1 + tolerancia)
+                    if metrica == 'consultas':
+                        limite = anterior[metrica]
+                    if medicion[metrica] > limite:
+                        fallas.append(
+                            f'[{tamano}] {nombre}: {metrica} {medicion[metrica]} '
+                            f'(línea base {anterior[metrica]}, límite {round(limite, 3)})'
+                        )
+        return fallas
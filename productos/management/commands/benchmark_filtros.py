@@ -0,0 +1,118 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from productos.models import Producto
+from productos.views import ProductoViewSet
+
+
+ESCENARIOS = [
+    {'costo_min': '100'},
+    {'costo_max': '500'},
+    {'costo_min': '100', 'costo_max': '500'},
+    {'departamento': 'Electrónicos'},
+    {'costo_min': '100', 'costo_max': '500', 'departamento': 'Electrónicos'},
+]
+
+
+def queryset_anterior(parametros):
+    """Forma anterior de los filtros: JOIN a producto_proveedor + DISTINCT"""
+    queryset = Producto.objects.select_related('tipo_producto')
+
+    costo_filters = Q()
+    if 'costo_min' in parametros:
+        costo_filters &= Q(producto_proveedores__costo__gte=float(parametros['costo_min']))
+    if 'costo_max' in parametros:
+        costo_filters &= Q(producto_proveedores__costo__lte=float(parametros['costo_max']))
+    if costo_filters:
+        queryset = queryset.filter(
+            costo_filters & Q(producto_proveedores__activo=True)
+        ).distinct()
+
+    if 'departamento' in parametros:
+        queryset = queryset.filter(
+            producto_proveedores__proveedor__departamento=parametros['departamento'],
+            producto_proveedores__activo=True
+        ).distinct()
+
+    return queryset.order_by('clave')
+
+
+def queryset_actual(parametros):
+    """Queryset que arma ProductoViewSet.list para los mismos parámetros"""
+    request = Request(APIRequestFactory().get('/api/productos/', parametros))
+    view = ProductoViewSet(request=request, action='list', format_kwarg=None, kwargs={})
+    return view.filter_queryset(view.get_queryset())
+
+
+def plan(queryset):
+    """Filas de EXPLAIN (EXPLAIN QUERY PLAN en SQLite) de la consulta"""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    prefijo = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefijo + sql, params)
+        return [' | '.join(str(valor) for valor in fila) for fila in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara plan y latencia de los filtros de costo y departamento del listado '
+        'de productos (JOIN + DISTINCT contra EXISTS) sobre los datos actuales'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Ejecuciones por escenario (default: 20)',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=50,
+            help='Filas leídas por ejecución, como una página del listado (default: 50)',
+        )
+        parser.add_argument(
+            '--sin-plan',
+            action='store_true',
+            help='No imprime el plan de ejecución (EXPLAIN)',
+        )
+
+    def handle(self, *args, **kwargs):
+        repeticiones = kwargs['repeticiones']
+        page_size = kwargs['page_size']
+
+        self.stdout.write(
+            f'\n Catálogo: {Producto.objects.count()} productos\n'
+        )
+
+        for parametros in ESCENARIOS:
+            descripcion = '&'.join(f'{clave}={valor}' for clave, valor in parametros.items())
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n {descripcion}'))
+
+            for etiqueta, construir in (('antes', queryset_anterior), ('después', queryset_actual)):
+                queryset = construir(parametros)
+                tiempos = []
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    list(queryset.values_list('pk', flat=True)[:page_size])
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+
+                tiempos.sort()
+                p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+                self.stdout.write(
+                    f'   {etiqueta:8} p50={statistics.median(tiempos):8.2f} ms  '
+                    f'p95={p95:8.2f} ms  filas={queryset.count()}'
+                )
+                if not kwargs['sin_plan']:
+                    for linea in plan(queryset.values_list('pk', flat=True)[:page_size]):
+                        self.stdout.write(f'            {linea}')
+
+        self.stdout.write('')
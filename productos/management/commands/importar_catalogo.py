@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from productos.importacion import (
+    FORMATOS,
+    LOTE_MAXIMO,
+    ErrorImportacion,
+    ImportadorCatalogo,
+    detectar_formato,
+    leer_filas,
+)
+
+
+class Command(BaseCommand):
+    help = 'Importa productos y costos de proveedores desde un archivo CSV o XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV o XLSX')
+        parser.add_argument(
+            '--formato',
+            choices=FORMATOS,
+            help='Formato del archivo (por defecto se deduce de la extensión)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help=f'Filas por lote de escritura, de 1 a {LOTE_MAXIMO} (default: 1000)',
+        )
+
+    def handle(self, *args, **kwargs):
+        ruta = kwargs['archivo']
+        if not 1 <= kwargs['lote'] <= LOTE_MAXIMO:
+            raise CommandError(f'--lote debe ser un número entre 1 y {LOTE_MAXIMO}')
+
+        try:
+            formato = kwargs['formato'] or detectar_formato(ruta)
+            self.stdout.write(f'\n Importando {ruta} ({formato}, lotes de {kwargs["lote"]})...\n')
+            with open(ruta, 'rb') as archivo:
+                importador = ImportadorCatalogo(tamano_lote=kwargs['lote'])
+                resumen = importador.importar(leer_filas(archivo, formato))
+        except FileNotFoundError:
+            raise CommandError(f'No existe el archivo "{ruta}"')
+        except ErrorImportacion as e:
+            raise CommandError(str(e))
+
+        for error in resumen['detalle_errores']:
+            self.stdout.write(self.style.WARNING(f'   Línea {error["linea"]}: {error["error"]}'))
+        if resumen['errores'] > len(resumen['detalle_errores']):
+            self.stdout.write(self.style.WARNING(
+                f'   ... y {resumen["errores"] - len(resumen["detalle_errores"])} errores más'
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n {resumen["filas"]} filas procesadas en {resumen["segundos"]} s '
+            f'({resumen["filas_por_segundo"]} filas/s)'
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f' Productos: {resumen["productos"]}, Relaciones: {resumen["relaciones"]}, '
+            f'Errores: {resumen["errores"]}\n'
+        ))
@@ -0,0 +1,112 @@
+import glob
+import io
+import os
+import pstats
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+ORDENES = ('cumulative', 'tottime', 'calls')
+
+
+def listar_perfiles(directorio):
+    """``[(ruta .prof, fecha de modificación)]`` del más reciente al más antiguo"""
+    perfiles = [
+        (ruta, datetime.fromtimestamp(os.path.getmtime(ruta)))
+        for ruta in glob.glob(os.path.join(directorio, '*.prof'))
+    ]
+    return sorted(perfiles, key=lambda perfil: perfil[1], reverse=True)
+
+
+class Command(BaseCommand):
+    help = (
+        'Lista los perfiles capturados con ?_profile=1 o muestra las funciones más '
+        'costosas de uno de ellos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'perfil',
+            nargs='?',
+            help='Nombre o ruta de un .prof; "ultimo" para el más reciente. Sin él se listan todos',
+        )
+        parser.add_argument(
+            '--orden',
+            choices=ORDENES,
+            default='cumulative',
+            help='Criterio para ordenar las funciones del resumen (default: cumulative)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=25,
+            help='Funciones a mostrar en el resumen (default: 25)',
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=50,
+            help='Perfiles a listar (default: 50)',
+        )
+        parser.add_argument(
+            '--limpiar',
+            action='store_true',
+            help='Elimina todos los perfiles (.prof y .folded) del directorio',
+        )
+
+    def handle(self, *args, **kwargs):
+        directorio = str(settings.PERFILADO_DIRECTORIO)
+        perfiles = listar_perfiles(directorio)
+
+        if kwargs['limpiar']:
+            eliminados = 0
+            for ruta, _ in perfiles:
+                for archivo in (ruta, ruta[:-len('.prof')] + '.folded'):
+                    if os.path.exists(archivo):
+                        os.remove(archivo)
+                        eliminados += 1
+            self.stdout.write(self.style.SUCCESS(f' {eliminados} archivos eliminados de {directorio}\n'))
+            return
+
+        if kwargs['perfil']:
+            self.resumir(self.resolver(kwargs['perfil'], directorio, perfiles), kwargs['orden'], kwargs['top'])
+            return
+
+        if not perfiles:
+            self.stdout.write(f'\n No hay perfiles en {directorio}\n')
+            return
+
+        self.stdout.write(f'\n Perfiles en {directorio}\n')
+        self.stdout.write(f'   {"fecha":19}  {"total ms":>10}  {"llamadas":>10}  archivo')
+        for ruta, fecha in perfiles[:kwargs['limite']]:
+            estadisticas = pstats.Stats(ruta)
+            self.stdout.write(
+                f'   {fecha:%Y-%m-%d %H:%M:%S}  {estadisticas.total_tt * 1000:10.1f}  '
+                f'{estadisticas.total_calls:10}  {os.path.basename(ruta)}'
+            )
+        if len(perfiles) > kwargs['limite']:
+            self.stdout.write(f'   ... {len(perfiles) - kwargs["limite"]} más')
+        self.stdout.write('')
+
+    def resolver(self, perfil, directorio, perfiles):
+        if perfil == 'ultimo':
+            if not perfiles:
+                raise CommandError(f'No hay perfiles en {directorio}')
+            return perfiles[0][0]
+        candidatos = [perfil, os.path.join(directorio, perfil), os.path.join(directorio, perfil + '.prof')]
+        for ruta in candidatos:
+            if os.path.isfile(ruta):
+                return ruta
+        raise CommandError(f'No existe el perfil: {perfil}')
+
+    def resumir(self, ruta, orden, top):
+        self.stdout.write(f'\n {ruta}\n')
+        folded = ruta[:-len('.prof')] + '.folded' if ruta.endswith('.prof') else None
+        if folded and os.path.exists(folded):
+            self.stdout.write(f' Flamegraph: flamegraph.pl {folded} > perfil.svg (o abrirlo en speedscope.app)\n')
+        # pstats escribe por fragmentos; OutputWrapper agregaría saltos de línea
+        salida = io.StringIO()
+        pstats.Stats(ruta, stream=salida).strip_dirs().sort_stats(orden).print_stats(top)
+        self.stdout.write(salida.getvalue())
@@ -1,8 +1,22 @@
-from django.core.management.base import BaseCommand
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from productos.cache_respuestas import invalidar_respuestas
+from productos.datos_sinteticos import (
+    DEPARTAMENTOS, generar_bloque, generar_proveedores, parsear_rango
+)
 from productos.models import TipoProducto, Proveedor, Producto, ProductoProveedor
+from productos.referencia import invalidar_referencia
 from decimal import Decimal
 
 
+def _generar_bloque(argumentos):
+    return generar_bloque(*argumentos)
+
+
 class Command(BaseCommand):
     help = 'Pobla la base de datos con datos de prueba'
 
@@ -12,12 +26,46 @@ class Command(BaseCommand):
             action='store_true',
             help='Elimina todos los datos antes de crear nuevos',
         )
+        parser.add_argument(
+            '--productos',
+            type=int,
+            help='Genera esta cantidad de productos sintéticos en lugar de los datos de ejemplo',
+        )
+        parser.add_argument(
+            '--proveedores',
+            type=int,
+            default=100,
+            help='Proveedores sintéticos a crear junto con --productos (default: 100)',
+        )
+        parser.add_argument(
+            '--proveedores-por-producto',
+            default='1-4',
+            help='Rango de proveedores por producto, ej. 1-8 (default: 1-4)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semilla: la misma semilla genera los mismos datos (default: 42)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Productos por bulk_create (default: 5000)',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=1,
+            help='Procesos que generan los datos en paralelo; la inserción es secuencial (default: 1)',
+        )
 
     def handle(self, *args, **kwargs):
         limpiar = kwargs.get('limpiar', False)
         
         # Verificar si ya hay datos
-        if Producto.objects.exists() and not limpiar:
+        if Producto.objects.exists() and not limpiar and kwargs.get('productos') is None:
             self.stdout.write(
                 self.style.WARNING(
                     f'\n  Ya existen {Producto.objects.count()} productos en la base de datos.'
@@ -36,12 +84,13 @@ class Command(BaseCommand):
 
         if limpiar:
             self.stdout.write(self.style.WARNING('\n  Limpiando datos existentes...'))
-            ProductoProveedor.objects.all().delete()
-            Producto.objects.all().delete()
-            TipoProducto.objects.all().delete()
-            Proveedor.objects.all().delete()
+            self.limpiar_tablas()
             self.stdout.write(self.style.SUCCESS('   ✓ Datos eliminados'))
 
+        if kwargs.get('productos') is not None:
+            self.generar_sinteticos(**kwargs)
+            return
+
         self.stdout.write('\n Creando/Actualizando datos de prueba...\n')
 
         # Crear/Actualizar Tipos de Producto
@@ -212,4 +261,127 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f'\n Productos: {productos_creados} creados, {productos_actualizados} actualizados'))
         self.stdout.write(self.style.SUCCESS(f' Relaciones: {relaciones_creadas} creadas, {relaciones_actualizadas} actualizadas'))
-        self.stdout.write(self.style.SUCCESS('\n🎉 ¡Proceso completado exitosamente!\n'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('\n🎉 ¡Proceso completado exitosamente!\n'))
+
+    def limpiar_tablas(self):
+        """
+        DELETE directo por tabla: ``queryset.delete()`` cargaría cada fila para
+        enviar las señales, lo que no escala con catálogos grandes
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            for modelo in (ProductoProveedor, Producto, TipoProducto, Proveedor):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+        invalidar_respuestas()
+        invalidar_referencia()
+
+    def generar_sinteticos(self, **kwargs):
+        cantidad = kwargs['productos']
+        lote = kwargs['lote']
+        procesos = kwargs['procesos']
+        try:
+            por_producto = parsear_rango(kwargs['proveedores_por_producto'])
+        except ValueError:
+            raise CommandError('--proveedores-por-producto debe tener la forma MIN-MAX, ej. 1-8')
+        if cantidad < 0 or lote < 1 or procesos < 1 or kwargs['proveedores'] < 0:
+            raise CommandError('--productos, --proveedores, --lote y --procesos deben ser positivos')
+
+        self.stdout.write(
+            f'\n Generando {cantidad} productos sintéticos '
+            f'(semilla {kwargs["seed"]}, {por_producto[0]}-{por_producto[1]} proveedores por producto)...\n'
+        )
+        inicio = time.perf_counter()
+
+        tipos = {}
+        for departamento, (tipo, *_) in DEPARTAMENTOS.items():
+            tipos[tipo] = TipoProducto.objects.get_or_create(
+                nombre=tipo, defaults={'descripcion': f'Artículos de {departamento.lower()}'}
+            )[0].pk
+
+        # Ids explícitos: las relaciones se arman sin leer de vuelta los productos
+        # (MySQL no devuelve ids en bulk_create)
+        primer_proveedor = (Proveedor.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0) + 1
+        proveedores = generar_proveedores(kwargs['seed'], kwargs['proveedores'], primer_proveedor)
+        Proveedor.objects.bulk_create(
+            [
+                Proveedor(id=pk, nombre=nombre, descripcion=descripcion, departamento=departamento)
+                for pk, nombre, descripcion, departamento in proveedores
+            ],
+            batch_size=lote
+        )
+        self.stdout.write(self.style.SUCCESS(f'   ✓ {len(proveedores)} proveedores'))
+
+        por_departamento = {}
+        for pk, _, _, departamento in proveedores:
+            por_departamento.setdefault(departamento, []).append(pk)
+        parametros = {
+            'semilla': kwargs['seed'],
+            'primer_id': (Producto.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0) + 1,
+            'tipos': tipos,
+            'proveedores': por_departamento,
+            'todos_los_proveedores': [pk for pk, *_ in proveedores],
+            'por_producto': por_producto if proveedores else (0, 0),
+        }
+        bloques = [
+            (parametros, desde, min(desde + lote, cantidad))
+            for desde in range(0, cantidad, lote)
+        ]
+
+        total_productos = 0
+        total_relaciones = 0
+        if procesos > 1:
+            with Pool(procesos) as pool:
+                for productos, relaciones in pool.imap(_generar_bloque, bloques):
+                    self.insertar_bloque(productos, relaciones, lote)
+                    total_productos += len(productos)
+                    total_relaciones += len(relaciones)
+                    self.reportar_avance(total_productos, cantidad, inicio)
+        else:
+            for bloque in bloques:
+                productos, relaciones = generar_bloque(*bloque)
+                self.insertar_bloque(productos, relaciones, lote)
+                total_productos += len(productos)
+                total_relaciones += len(relaciones)
+                self.reportar_avance(total_productos, cantidad, inicio)
+
+        # bulk_create no envía señales
+        invalidar_respuestas()
+        invalidar_referencia()
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'\n {total_productos} productos y {total_relaciones} relaciones en {segundos:.1f} s '
+            f'({total_productos / segundos:.0f} productos/s, {total_relaciones / segundos:.0f} relaciones/s)\n'
+            if segundos else '\n Sin productos que generar\n'
+        ))
+
+    def insertar_bloque(self, productos, relaciones, lote):
+        with transaction.atomic():
+            Producto.objects.bulk_create(
+                [
+                    Producto(
+                        id=pk, clave=clave, nombre=nombre, tipo_producto_id=tipo_id, activo=activo,
+                        costo_minimo=costo_minimo, cantidad_proveedores=cantidad_proveedores,
+                        proveedor_costo_minimo_id=proveedor_costo_minimo,
+                    )
+                    for pk, clave, nombre, tipo_id, activo, costo_minimo, cantidad_proveedores,
+                    proveedor_costo_minimo in productos
+                ],
+                batch_size=lote
+            )
+            ProductoProveedor.objects.bulk_create(
+                [
+                    ProductoProveedor(
+                        producto_id=producto_id, proveedor_id=proveedor_id,
+                        clave_proveedor=clave_proveedor, costo=costo, activo=activo,
+                    )
+                    for producto_id, proveedor_id, clave_proveedor, costo, activo in relaciones
+                ],
+                batch_size=lote
+            )
+
+    def reportar_avance(self, hechos, total, inicio):
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(
+            f'   {hechos}/{total} productos ({hechos / segundos:.0f}/s)',
+            ending='\r' if hechos < total else '\n'
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from productos.models import Producto
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen de proveedores (costo mínimo, cantidad, proveedor más barato) de los productos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Cantidad de productos a recalcular por UPDATE (default: 1000)',
+        )
+
+    def handle(self, *args, **kwargs):
+        lote = kwargs['lote']
+        ids = Producto.objects.order_by('pk').values_list('pk', flat=True)
+
+        self.stdout.write('\n Recalculando resumen de proveedores...\n')
+
+        total = 0
+        ultimo_id = 0
+        while True:
+            # Recorrido por rangos de pk para no bloquear toda la tabla a la vez
+            lote_ids = list(ids.filter(pk__gt=ultimo_id)[:lote])
+            if not lote_ids:
+                break
+            total += Producto.actualizar_resumen_proveedores(lote_ids)
+            ultimo_id = lote_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f' {total} productos recalculados\n'))
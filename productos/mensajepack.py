@@ -0,0 +1,188 @@
+"""
+Codificación MessagePack (https://msgpack.org) sin dependencias externas.
+
+Cubre los tipos que producen los serializers y los renderers de la API:
+nil, booleanos, enteros de 64 bits, float64, str, bin, arreglos y mapas.
+Igual que el JSONRenderer, Decimal se envía como float y las fechas como
+texto ISO 8601. El resultado se lee con cualquier implementación estándar
+(``msgpack.unpackb`` en Python, ``@msgpack/msgpack`` en JavaScript).
+"""
+import datetime
+import decimal
+import struct
+import uuid
+
+
+_ENTERO_POSITIVO = (
+    (0xff, b'\xcc', struct.Struct('>B')),
+    (0xffff, b'\xcd', struct.Struct('>H')),
+    (0xffffffff, b'\xce', struct.Struct('>I')),
+    (0xffffffffffffffff, b'\xcf', struct.Struct('>Q')),
+)
+_ENTERO_NEGATIVO = (
+    (-0x80, b'\xd0', struct.Struct('>b')),
+    (-0x8000, b'\xd1', struct.Struct('>h')),
+    (-0x80000000, b'\xd2', struct.Struct('>i')),
+    (-0x8000000000000000, b'\xd3', struct.Struct('>q')),
+)
+_FLOAT = struct.Struct('>d')
+_U8 = struct.Struct('>B')
+_U16 = struct.Struct('>H')
+_U32 = struct.Struct('>I')
+
+
+def _longitud(escribir, n, corto, base_corto, marcas):
+    """Encabezado de str/bin/array/map: forma corta o marca de 8/16/32 bits"""
+    if corto and n < corto:
+        escribir(_U8.pack(base_corto | n))
+        return
+    for limite, marca, formato in marcas:
+        if n <= limite:
+            escribir(marca + formato.pack(n))
+            return
+    raise ValueError('Objeto demasiado grande para MessagePack')
+
+
+_MARCAS_STR = ((0xff, b'\xd9', _U8), (0xffff, b'\xda', _U16), (0xffffffff, b'\xdb', _U32))
+_MARCAS_BIN = ((0xff, b'\xc4', _U8), (0xffff, b'\xc5', _U16), (0xffffffff, b'\xc6', _U32))
+_MARCAS_ARRAY = ((0xffff, b'\xdc', _U16), (0xffffffff, b'\xdd', _U32))
+_MARCAS_MAP = ((0xffff, b'\xde', _U16), (0xffffffff, b'\xdf', _U32))
+
+
+def _texto_fecha(valor):
+    # Mismo formato que el codificador JSON de DRF
+    texto = valor.isoformat()
+    if isinstance(valor, datetime.datetime) and texto.endswith('+00:00'):
+        texto = texto[:-6] + 'Z'
+    return texto
+
+
+def _empaquetar(valor, escribir):
+    if valor is None:
+        escribir(b'\xc0')
+    elif valor is True:
+        escribir(b'\xc3')
+    elif valor is False:
+        escribir(b'\xc2')
+    elif isinstance(valor, int):
+        if 0 <= valor < 0x80 or -0x20 <= valor < 0:
+            escribir(struct.pack('>b' if valor < 0 else '>B', valor))
+        elif valor > 0:
+            for limite, marca, formato in _ENTERO_POSITIVO:
+                if valor <= limite:
+                    escribir(marca + formato.pack(valor))
+                    break
+            else:
+                raise OverflowError('Entero fuera del rango de MessagePack')
+        else:
+            for limite, marca, formato in _ENTERO_NEGATIVO:
+                if valor >= limite:
+                    escribir(marca + formato.pack(valor))
+                    break
+            else:
+                raise OverflowError('Entero fuera del rango de MessagePack')
+    elif isinstance(valor, float):
+        escribir(b'\xcb' + _FLOAT.pack(valor))
+    elif isinstance(valor, str):
+        datos = valor.encode('utf-8')
+        _longitud(escribir, len(datos), 32, 0xa0, _MARCAS_STR)
+        escribir(datos)
+    elif isinstance(valor, (bytes, bytearray, memoryview)):
+        datos = bytes(valor)
+        _longitud(escribir, len(datos), 0, 0, _MARCAS_BIN)
+        escribir(datos)
+    elif isinstance(valor, dict):
+        _longitud(escribir, len(valor), 16, 0x80, _MARCAS_MAP)
+        for clave, elemento in valor.items():
+            _empaquetar(clave, escribir)
+            _empaquetar(elemento, escribir)
+    elif isinstance(valor, (list, tuple)):
+        _longitud(escribir, len(valor), 16, 0x90, _MARCAS_ARRAY)
+        for elemento in valor:
+            _empaquetar(elemento, escribir)
+    elif isinstance(valor, decimal.Decimal):
+        escribir(b'\xcb' + _FLOAT.pack(float(valor)))
+    elif isinstance(valor, (datetime.date, datetime.time)):
+        _empaquetar(_texto_fecha(valor), escribir)
+    elif isinstance(valor, datetime.timedelta):
+        _empaquetar(str(valor.total_seconds()), escribir)
+    elif isinstance(valor, uuid.UUID):
+        _empaquetar(str(valor), escribir)
+    elif hasattr(valor, '__iter__'):
+        _empaquetar(list(valor), escribir)
+    else:
+        _empaquetar(str(valor), escribir)
+
+
+def empaquetar(valor):
+    partes = []
+    _empaquetar(valor, partes.append)
+    return b''.join(partes)
+
+
+class _Lector:
+
+    def __init__(self, datos):
+        self.datos = memoryview(datos)
+        self.posicion = 0
+
+    def leer(self, n):
+        inicio = self.posicion
+        self.posicion += n
+        if self.posicion > len(self.datos):
+            raise ValueError('MessagePack truncado')
+        return self.datos[inicio:self.posicion]
+
+    def numero(self, formato):
+        return struct.unpack(formato, self.leer(struct.calcsize(formato)))[0]
+
+    def valor(self):
+        marca = self.leer(1)[0]
+        if marca <= 0x7f:
+            return marca
+        if marca >= 0xe0:
+            return marca - 0x100
+        if 0xa0 <= marca <= 0xbf:
+            return str(self.leer(marca & 0x1f), 'utf-8')
+        if 0x90 <= marca <= 0x9f:
+            return [self.valor() for _ in range(marca & 0x0f)]
+        if 0x80 <= marca <= 0x8f:
+            return self.mapa(marca & 0x0f)
+
+        simples = {0xc0: None, 0xc2: False, 0xc3: True}
+        if marca in simples:
+            return simples[marca]
+        numeros = {
+            0xca: '>f', 0xcb: '>d', 0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+            0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q',
+        }
+        if marca in numeros:
+            return self.numero(numeros[marca])
+        longitudes = {0xd9: '>B', 0xda: '>H', 0xdb: '>I', 0xc4: '>B', 0xc5: '>H', 0xc6: '>I',
+                      0xdc: '>H', 0xdd: '>I', 0xde: '>H', 0xdf: '>I'}
+        if marca in longitudes:
+            n = self.numero(longitudes[marca])
+            if marca in (0xd9, 0xda, 0xdb):
+                return str(self.leer(n), 'utf-8')
+            if marca in (0xc4, 0xc5, 0xc6):
+                return bytes(self.leer(n))
+            if marca in (0xdc, 0xdd):
+                return [self.valor() for _ in range(n)]
+            return self.mapa(n)
+        raise ValueError(f'Tipo de MessagePack no soportado: 0x{marca:02x}')
+
+    def mapa(self, n):
+        resultado = {}
+        for _ in range(n):
+            clave = self.valor()
+            resultado[clave] = self.valor()
+        return resultado
+
+
+def desempaquetar(datos):
+    """Inverso de ``empaquetar`` (para pruebas y clientes sin la librería msgpack)"""
+    lector = _Lector(datos)
+    valor = lector.valor()
+    if lector.posicion != len(lector.datos):
+        raise ValueError('Datos sobrantes después del valor MessagePack')
+    return valor
@@ -13,6 +13,7 @@ def crear_datos_iniciales(apps, schema_editor):
     Proveedor = apps.get_model('productos', 'Proveedor')
     Producto = apps.get_model('productos', 'Producto')
     ProductoProveedor = apps.get_model('productos', 'ProductoProveedor')
+    db_alias = schema_editor.connection.alias
     
     # Insertar Tipos de Producto
     tipos_producto = [
@@ -23,7 +24,7 @@ def crear_datos_iniciales(apps, schema_editor):
     ]
     
     for tipo_data in tipos_producto:
-        TipoProducto.objects.create(
+        TipoProducto.objects.using(db_alias).create(
             nombre=tipo_data['nombre'],
             descripcion=tipo_data['descripcion'],
             activo=True,
@@ -41,7 +42,7 @@ def crear_datos_iniciales(apps, schema_editor):
     ]
     
     for prov_data in proveedores_data:
-        Proveedor.objects.create(
+        Proveedor.objects.using(db_alias).create(
             nombre=prov_data['nombre'],
             descripcion=prov_data['descripcion'],
             departamento=prov_data['departamento'],
@@ -51,9 +52,9 @@ def crear_datos_iniciales(apps, schema_editor):
         )
     
     # Insertar Productos
-    tipo_electronica = TipoProducto.objects.get(nombre='Electrónica')
-    tipo_alimentos = TipoProducto.objects.get(nombre='Alimentos')
-    tipo_ropa = TipoProducto.objects.get(nombre='Ropa')
+    tipo_electronica = TipoProducto.objects.using(db_alias).get(nombre='Electrónica')
+    tipo_alimentos = TipoProducto.objects.using(db_alias).get(nombre='Alimentos')
+    tipo_ropa = TipoProducto.objects.using(db_alias).get(nombre='Ropa')
     
     productos_data = [
         {'clave': 'ELEC-001', 'nombre': 'Laptop HP 15"', 'tipo_producto': tipo_electronica},
@@ -63,7 +64,7 @@ def crear_datos_iniciales(apps, schema_editor):
     ]
     
     for prod_data in productos_data:
-        Producto.objects.create(
+        Producto.objects.using(db_alias).create(
             clave=prod_data['clave'],
             nombre=prod_data['nombre'],
             tipo_producto=prod_data['tipo_producto'],
@@ -73,16 +74,16 @@ def crear_datos_iniciales(apps, schema_editor):
         )
     
     # Insertar Relaciones Producto-Proveedor
-    laptop = Producto.objects.get(clave='ELEC-001')
-    mouse = Producto.objects.get(clave='ELEC-002')
-    arroz = Producto.objects.get(clave='ALI-001')
-    playera = Producto.objects.get(clave='ROP-001')
+    laptop = Producto.objects.using(db_alias).get(clave='ELEC-001')
+    mouse = Producto.objects.using(db_alias).get(clave='ELEC-002')
+    arroz = Producto.objects.using(db_alias).get(clave='ALI-001')
+    playera = Producto.objects.using(db_alias).get(clave='ROP-001')
     
-    tech_supply = Proveedor.objects.get(nombre='TechSupply SA')
-    electro_mundo = Proveedor.objects.get(nombre='ElectroMundo')
-    alimenti_corp = Proveedor.objects.get(nombre='AlimentiCorp')
-    food_distributors = Proveedor.objects.get(nombre='FoodDistributors')
-    moda_total = Proveedor.objects.get(nombre='ModaTotal')
+    tech_supply = Proveedor.objects.using(db_alias).get(nombre='TechSupply SA')
+    electro_mundo = Proveedor.objects.using(db_alias).get(nombre='ElectroMundo')
+    alimenti_corp = Proveedor.objects.using(db_alias).get(nombre='AlimentiCorp')
+    food_distributors = Proveedor.objects.using(db_alias).get(nombre='FoodDistributors')
+    moda_total = Proveedor.objects.using(db_alias).get(nombre='ModaTotal')
     
     relaciones_data = [
         {'producto': laptop, 'proveedor': tech_supply, 'clave_proveedor': 'HP-LAP-001', 'costo': Decimal('8500.00')},
@@ -94,7 +95,7 @@ def crear_datos_iniciales(apps, schema_editor):
     ]
     
     for rel_data in relaciones_data:
-        ProductoProveedor.objects.create(
+        ProductoProveedor.objects.using(db_alias).create(
             producto=rel_data['producto'],
             proveedor=rel_data['proveedor'],
             clave_proveedor=rel_data['clave_proveedor'],
@@ -111,11 +112,12 @@ def eliminar_datos_iniciales(apps, schema_editor):
     Proveedor = apps.get_model('productos', 'Proveedor')
     Producto = apps.get_model('productos', 'Producto')
     ProductoProveedor = apps.get_model('productos', 'ProductoProveedor')
+    db_alias = schema_editor.connection.alias
     
-    ProductoProveedor.objects.all().delete()
-    Producto.objects.all().delete()
-    Proveedor.objects.all().delete()
-    TipoProducto.objects.all().delete()
+    ProductoProveedor.objects.using(db_alias).all().delete()
+    Producto.objects.using(db_alias).all().delete()
+    Proveedor.objects.using(db_alias).all().delete()
+    TipoProducto.objects.using(db_alias).all().delete()
 
 
 class Migration(migrations.Migration):
@@ -0,0 +1,59 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_resumen(apps, schema_editor):
+    """Llena las columnas de resumen con los proveedores existentes"""
+    Producto = apps.get_model('productos', 'Producto')
+    ProductoProveedor = apps.get_model('productos', 'ProductoProveedor')
+    db_alias = schema_editor.connection.alias
+
+    activos = ProductoProveedor.objects.filter(
+        producto=OuterRef('pk'),
+        activo=True
+    ).order_by()
+    mas_barato = activos.order_by('costo', 'pk')
+
+    Producto.objects.using(db_alias).update(
+        cantidad_proveedores=Coalesce(
+            Subquery(activos.values('producto').annotate(total=Count('pk')).values('total')),
+            Value(0)
+        ),
+        costo_minimo=Subquery(mas_barato.values('costo')[:1]),
+        proveedor_costo_minimo=Subquery(mas_barato.values('proveedor')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0002_producto_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='costo_minimo',
+            field=models.DecimalField(decimal_places=2, editable=False, help_text='Costo más bajo entre los proveedores activos', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='cantidad_proveedores',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Cantidad de proveedores activos'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='proveedor_costo_minimo',
+            field=models.ForeignKey(editable=False, help_text='Proveedor activo con el costo más bajo', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='productos.proveedor'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['costo_minimo'], name='producto_costo_minimo_idx'),
+        ),
+        migrations.RunPython(
+            calcular_resumen,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,77 @@
+from django.db import migrations
+
+
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE producto_busqueda USING fts5(
+        clave, nombre,
+        content='producto', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )
+    """,
+    """
+    CREATE TRIGGER producto_busqueda_ai AFTER INSERT ON producto BEGIN
+        INSERT INTO producto_busqueda(rowid, clave, nombre) VALUES (new.id, new.clave, new.nombre);
+    END
+    """,
+    """
+    CREATE TRIGGER producto_busqueda_ad AFTER DELETE ON producto BEGIN
+        INSERT INTO producto_busqueda(producto_busqueda, rowid, clave, nombre)
+        VALUES ('delete', old.id, old.clave, old.nombre);
+    END
+    """,
+    """
+    CREATE TRIGGER producto_busqueda_au AFTER UPDATE OF clave, nombre ON producto BEGIN
+        INSERT INTO producto_busqueda(producto_busqueda, rowid, clave, nombre)
+        VALUES ('delete', old.id, old.clave, old.nombre);
+        INSERT INTO producto_busqueda(rowid, clave, nombre) VALUES (new.id, new.clave, new.nombre);
+    END
+    """,
+    "INSERT INTO producto_busqueda(producto_busqueda) VALUES ('rebuild')",
+]
+
+SQLITE_ELIMINAR = [
+    'DROP TRIGGER IF EXISTS producto_busqueda_ai',
+    'DROP TRIGGER IF EXISTS producto_busqueda_ad',
+    'DROP TRIGGER IF EXISTS producto_busqueda_au',
+    'DROP TABLE IF EXISTS producto_busqueda',
+]
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    """
+    Índice de texto completo sobre clave y nombre (ver productos/busqueda.py).
+    En SQLite, las migraciones que reconstruyan la tabla producto deben
+    volver a crear los triggers.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE producto ADD FULLTEXT INDEX producto_busqueda_ft (clave, nombre)'
+        )
+    elif vendor == 'sqlite':
+        for sql in SQLITE_CREAR:
+            schema_editor.execute(sql)
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE producto DROP INDEX producto_busqueda_ft')
+    elif vendor == 'sqlite':
+        for sql in SQLITE_ELIMINAR:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_producto_resumen_proveedores'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            crear_indice_busqueda,
+            eliminar_indice_busqueda
+        ),
+    ]
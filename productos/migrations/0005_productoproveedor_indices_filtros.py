@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_producto_busqueda_texto'),
+    ]
+
+    operations = [
+        # Índices para los filtros costo_min/costo_max y departamento (EXISTS)
+        migrations.AddIndex(
+            model_name='productoproveedor',
+            index=models.Index(fields=['producto', 'activo', 'costo'], name='prod_prov_activo_costo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productoproveedor',
+            index=models.Index(fields=['proveedor', 'activo', 'producto'], name='prod_prov_proveedor_activo_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_productoproveedor_indices_filtros'),
+    ]
+
+    operations = [
+        # Modelo no administrado sobre la tabla FTS5 creada en 0004
+        migrations.CreateModel(
+            name='ProductoBusqueda',
+            fields=[
+                ('producto', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda_texto', serialize=False, to='productos.producto')),
+                ('clave', models.CharField(max_length=50)),
+                ('nombre', models.CharField(max_length=200)),
+                ('producto_busqueda', models.TextField(db_column='producto_busqueda')),
+            ],
+            options={
+                'db_table': 'producto_busqueda',
+                'managed': False,
+            },
+        ),
+    ]
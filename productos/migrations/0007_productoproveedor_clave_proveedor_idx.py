@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0006_productobusqueda'),
+    ]
+
+    operations = [
+        # Cruce de la lista de precios de un proveedor por su clave
+        migrations.AddIndex(
+            model_name='productoproveedor',
+            index=models.Index(fields=['proveedor', 'clave_proveedor'], name='prod_prov_clave_prov_idx'),
+        ),
+    ]
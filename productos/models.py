@@ -1,7 +1,12 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+from .cache_respuestas import invalidar_respuestas
+
 
 class TipoProducto(models.Model):
     """Tipo o categoría de producto"""
@@ -61,6 +66,31 @@ class Producto(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
 
+    # Resumen de proveedores activos (desnormalizado). Solo se escribe desde
+    # actualizar_resumen_proveedores(); ver productos/signals.py
+    costo_minimo = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        help_text='Costo más bajo entre los proveedores activos'
+    )
+    cantidad_proveedores = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Cantidad de proveedores activos'
+    )
+    proveedor_costo_minimo = models.ForeignKey(
+        Proveedor,
+        on_delete=models.SET_NULL,
+        null=True,
+        editable=False,
+        related_name='+',
+        help_text='Proveedor activo con el costo más bajo'
+    )
+
+    CAMPOS_RESUMEN = ('costo_minimo', 'cantidad_proveedores', 'proveedor_costo_minimo')
+
     class Meta:
         db_table = 'producto'
         verbose_name = 'Producto'
@@ -69,11 +99,56 @@ class Producto(models.Model):
         indexes = [
             models.Index(fields=['clave']),
             models.Index(fields=['tipo_producto']),
+            # Índices para la paginación por cursor según cada ordering
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_id_idx'),
+            models.Index(fields=['fecha_creacion', 'id'], name='producto_fecha_creacion_id_idx'),
+            models.Index(fields=['costo_minimo'], name='producto_costo_minimo_idx'),
         ]
 
     def __str__(self):
         return f"{self.clave} - {self.nombre}"
 
+    def save(self, *args, **kwargs):
+        # Las columnas de resumen no se sobrescriben con valores en memoria
+        # que pudieron quedar desactualizados
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.CAMPOS_RESUMEN
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def actualizar_resumen_proveedores(cls, producto_ids=None):
+        """
+        Recalcula costo mínimo, cantidad de proveedores activos y proveedor más
+        barato con un solo UPDATE. Si ``producto_ids`` es None recalcula todos.
+        También actualiza ``fecha_modificacion``: la representación del
+        producto incluye a sus proveedores (ver productos/condicional.py).
+        Las cargas masivas terminan aquí, por eso también invalida el cache
+        de respuestas.
+        """
+        activos = ProductoProveedor.objects.filter(
+            producto=OuterRef('pk'),
+            activo=True
+        ).order_by()
+        mas_barato = activos.order_by('costo', 'pk')
+
+        queryset = cls.objects.all()
+        if producto_ids is not None:
+            queryset = queryset.filter(pk__in=list(producto_ids))
+
+        invalidar_respuestas()
+        return queryset.update(
+            cantidad_proveedores=Coalesce(
+                Subquery(activos.values('producto').annotate(total=Count('pk')).values('total')),
+                Value(0)
+            ),
+            costo_minimo=Subquery(mas_barato.values('costo')[:1]),
+            proveedor_costo_minimo=Subquery(mas_barato.values('proveedor')[:1]),
+            fecha_modificacion=timezone.now(),
+        )
+
 
 class ProductoProveedor(models.Model):
     """Relación entre Producto y Proveedor con información adicional"""
@@ -106,6 +181,44 @@ class ProductoProveedor(models.Model):
         verbose_name_plural = 'Productos-Proveedores'
         unique_together = ['producto', 'proveedor']
         ordering = ['producto', 'proveedor']
+        indexes = [
+            # Semi-joins de los filtros costo_min/costo_max y departamento
+            models.Index(fields=['producto', 'activo', 'costo'], name='prod_prov_activo_costo_idx'),
+            models.Index(fields=['proveedor', 'activo', 'producto'], name='prod_prov_proveedor_activo_idx'),
+            # Cruce de la lista de precios por clave del proveedor
+            models.Index(fields=['proveedor', 'clave_proveedor'], name='prod_prov_clave_prov_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.producto.clave} - {self.proveedor.nombre} (${self.costo})"
\ No newline at end of file
+        return f"{self.producto.clave} - {self.proveedor.nombre} (${self.costo})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Permite recalcular el resumen del producto anterior si se reasigna
+        instance._producto_id_original = instance.__dict__.get('producto_id')
+        return instance
+
+
+class ProductoBusqueda(models.Model):
+    """
+    Tabla FTS5 con clave y nombre de cada producto (solo en SQLite; en MySQL
+    la búsqueda usa un índice FULLTEXT sobre producto). La crea y mantiene la
+    migración 0004 con triggers; ver productos/busqueda.py
+    """
+    producto = models.OneToOneField(
+        Producto,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='busqueda_texto'
+    )
+    clave = models.CharField(max_length=50)
+    nombre = models.CharField(max_length=200)
+    # Columna oculta de FTS5 con el nombre de la tabla: operando de MATCH y bm25()
+    producto_busqueda = models.TextField(db_column='producto_busqueda')
+
+    class Meta:
+        managed = False
+        db_table = 'producto_busqueda'
@@ -0,0 +1,222 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+
+from .asincrono import en_lista, en_paralelo
+
+
+class ProductoCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) para el listado de productos.
+
+    La página N cuesta lo mismo que la página 1: el cursor codifica la
+    posición del último registro y la consulta usa ``WHERE campo > valor``
+    sobre un índice en lugar de ``OFFSET``. El campo del cursor sigue al
+    parámetro ``ordering`` (clave, nombre o fecha_creacion), siempre con
+    ``pk`` como desempate: la posición guarda ``[valor, pk]`` y la consulta
+    es ``campo > valor OR (campo = valor AND pk > pk_cursor)``, así que los
+    valores repetidos no saltan ni repiten filas en ningún sentido (el
+    desplazamiento de DRF no alcanza al volver atrás).
+
+    Con ``?search=`` y sin ``ordering`` explícito, las páginas siguen la
+    relevancia calculada por ``BusquedaProductoFilter``.
+
+    El total es opcional y se pide con ``?total=exacto`` (``COUNT(*)``) o
+    ``?total=estimado`` (estimación del optimizador en MySQL, sin recorrer
+    la tabla).
+
+    ``paginate_queryset`` sigue el mismo algoritmo que el de DRF, dividido en
+    ``consulta_pagina`` y ``cerrar_pagina`` para que ``apaginate_queryset``
+    lea la página con el ORM asíncrono.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'clave'
+    total_query_param = 'total'
+    ordering_relevancia = ('-relevancia',)
+
+    def get_ordering(self, request, queryset, view):
+        if 'relevancia' in queryset.query.annotations and not request.query_params.get('ordering'):
+            ordering = self.ordering_relevancia
+        else:
+            ordering = super().get_ordering(request, queryset, view)
+        # nombre, fecha_creacion y relevancia se repiten
+        if not {'pk', '-pk'} & set(ordering):
+            ordering = (*ordering, 'pk')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total = None
+        self.total_estimado = False
+
+        modo_total = request.query_params.get(self.total_query_param)
+        if modo_total == 'exacto':
+            self.total = queryset.count()
+        elif modo_total == 'estimado':
+            self.total, self.total_estimado = self.estimar_total(queryset)
+
+        consulta = self.consulta_pagina(queryset, request, view)
+        if consulta is None:
+            return None
+        return self.cerrar_pagina(list(consulta))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Versión asíncrona: la página y el total se consultan a la vez"""
+        self.total = None
+        self.total_estimado = False
+        consulta = self.consulta_pagina(queryset, request, view)
+        if consulta is None:
+            return None
+
+        consultas = [en_lista(consulta)]
+        modo_total = request.query_params.get(self.total_query_param)
+        if modo_total == 'exacto':
+            consultas.append(queryset.acount())
+        elif modo_total == 'estimado':
+            consultas.append(sync_to_async(self.estimar_total)(queryset))
+        resultados, *total = await en_paralelo(*consultas)
+
+        if modo_total == 'exacto':
+            self.total = total[0]
+        elif modo_total == 'estimado':
+            self.total, self.total_estimado = total[0]
+        return self.cerrar_pagina(resultados)
+
+    def consulta_pagina(self, queryset, request, view=None):
+        """
+        Primera mitad de ``CursorPagination.paginate_queryset``: el queryset
+        de la página más una fila (para saber si hay siguiente), sin
+        ejecutarlo. None si la paginación está desactivada.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self._pk = queryset.model._meta.pk.attname
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+        self._posicion_cursor = (offset, reverse, current_position)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                valor, pk = json.loads(current_position)
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            # Después de la posición en el orden que se consulta
+            orden = _reverse_ordering(self.ordering) if reverse else self.ordering
+            campo, desempate = orden[0], orden[-1]
+            queryset = queryset.filter(
+                Q(**{self.despues_de(campo): valor})
+                | Q(**{campo.lstrip('-'): valor, self.despues_de(desempate): pk})
+            )
+
+        return queryset[offset:offset + self.page_size + 1]
+
+    @staticmethod
+    def despues_de(campo):
+        return campo.lstrip('-') + ('__lt' if campo.startswith('-') else '__gt')
+
+    def _get_position_from_instance(self, instance, ordering):
+        """``[valor del campo de orden, pk]`` en JSON: única aunque el valor se repita"""
+        valor = super()._get_position_from_instance(instance, ordering)
+        pk = instance[self._pk] if isinstance(instance, dict) else instance.pk
+        return json.dumps([valor, pk])
+
+    def cerrar_pagina(self, results):
+        """Segunda mitad: la página y las posiciones next/previous a partir de las filas leídas"""
+        offset, reverse, current_position = self._posicion_cursor
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # La consulta se hizo en orden inverso: se devuelve al orden pedido
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def estimar_total(self, queryset):
+        """
+        Retorna ``(total, es_estimado)``.
+
+        En MySQL se usa la columna ``rows`` de ``EXPLAIN``, que sale de las
+        estadísticas del índice. En otros motores se cae a ``COUNT(*)``.
+        """
+        connection = connections[queryset.db]
+        if connection.vendor != 'mysql':
+            return queryset.count(), False
+
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            columnas = [col[0].lower() for col in cursor.description]
+            fila = cursor.fetchone()
+
+        if not fila or 'rows' not in columnas:
+            return queryset.count(), False
+
+        filas = fila[columnas.index('rows')] or 0
+        if 'filtered' in columnas and fila[columnas.index('filtered')] is not None:
+            filas = filas * float(fila[columnas.index('filtered')]) / 100
+        return int(filas), True
+
+    def get_paginated_response(self, data):
+        respuesta = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.total is not None:
+            respuesta['total'] = self.total
+            respuesta['total_estimado'] = self.total_estimado
+        respuesta['results'] = data
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['total'] = {
+            'type': 'integer',
+            'nullable': True,
+        }
+        response_schema['properties']['total_estimado'] = {
+            'type': 'boolean',
+        }
+        return response_schema
@@ -0,0 +1,201 @@
+"""
+Datos de referencia (tipos de producto, proveedores y departamentos) servidos
+desde memoria del proceso con una versión por contenido.
+
+Cada conjunto se renderiza a JSON una sola vez y su versión es el hash de
+esos bytes. Las páginas reciben las versiones al renderizarse y piden
+``/api/tipos-producto/?v=<version>``: si la versión es la vigente la
+respuesta lleva ``Cache-Control: immutable`` y el navegador no vuelve a
+pedirla; una versión vieja o ausente recibe el contenido actual con
+``no-cache`` y ETag.
+
+Guardar o eliminar un TipoProducto o Proveedor incrementa una generación en
+el cache de Django, ahora y otra vez al confirmar la transacción (como
+``invalidar_respuestas``); cada proceso recalcula sus conjuntos cuando la
+generación cambia. Si el contenido resultante es el mismo, la versión no
+cambia. Además cada conjunto se recalcula a los
+``PRODUCTOS_REFERENCIA_CACHE_TTL`` segundos: sin cache compartido
+(``REDIS_URL``) la generación es de cada proceso y ese es el plazo en que
+los demás workers ven un cambio.
+
+Lo leído de una réplica se responde pero no se guarda: una réplica atrasada
+fijaría filas viejas bajo la generación nueva.
+"""
+import hashlib
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.renderers import JSONRenderer
+
+from distribuidora.metricas import registrar_cache
+from distribuidora.replicas import alias_lectura
+
+from .models import TipoProducto, Proveedor
+from .serializers import TipoProductoSerializer, ProveedorSerializer
+
+
+CLAVE_GENERACION = 'productos:referencia:generacion'
+MAX_AGE_VERSIONADO = 60 * 60 * 24 * 365
+
+_conjuntos = {}
+_candado = threading.Lock()
+
+
+def _departamentos():
+    return Proveedor.objects.exclude(
+        departamento__isnull=True
+    ).exclude(
+        departamento__exact=''
+    ).values_list('departamento', flat=True).distinct().order_by('departamento')
+
+
+# Por conjunto: consulta y formato de las filas leídas
+FUENTES = {
+    'tipos_producto': (
+        lambda: TipoProducto.objects.order_by('nombre'),
+        lambda filas: TipoProductoSerializer(filas, many=True).data,
+    ),
+    'proveedores': (
+        lambda: Proveedor.objects.order_by('nombre'),
+        lambda filas: ProveedorSerializer(filas, many=True).data,
+    ),
+    'departamentos': (
+        _departamentos,
+        lambda filas: {'departamentos': filas},
+    ),
+}
+
+
+def calcular(nombre):
+    consulta, formato = FUENTES[nombre]
+    return formato(list(consulta()))
+
+
+async def acalcular(nombre):
+    consulta, formato = FUENTES[nombre]
+    return formato([fila async for fila in consulta().aiterator()])
+
+
+CONJUNTOS = {nombre: partial(calcular, nombre) for nombre in FUENTES}
+
+
+def generacion_actual():
+    cache.add(CLAVE_GENERACION, 1, None)
+    return cache.get(CLAVE_GENERACION, 1)
+
+
+def _incrementar_generacion():
+    try:
+        cache.incr(CLAVE_GENERACION)
+    except ValueError:
+        cache.add(CLAVE_GENERACION, 1, None)
+        cache.incr(CLAVE_GENERACION)
+
+
+def invalidar_referencia():
+    """
+    Incrementa la generación ahora y otra vez al confirmar la transacción:
+    un conjunto calculado con filas previas al commit queda invalidado.
+    """
+    _incrementar_generacion()
+    transaction.on_commit(_incrementar_generacion)
+
+
+def ttl_referencia():
+    return getattr(settings, 'PRODUCTOS_REFERENCIA_CACHE_TTL', 300)
+
+
+def vigente(nombre):
+    """``(generacion, (version, contenido_json) o None si hay que recalcular)``"""
+    generacion = generacion_actual()
+    guardado = _conjuntos.get(nombre)
+    if (
+        guardado is not None and guardado[0] == generacion
+        and time.monotonic() - guardado[3] < ttl_referencia()
+    ):
+        registrar_cache('referencia', acierto=True)
+        return generacion, (guardado[1], guardado[2])
+    registrar_cache('referencia', acierto=False)
+    return generacion, None
+
+
+def guardar(nombre, generacion, datos):
+    contenido = JSONRenderer().render(datos)
+    version = hashlib.md5(contenido).hexdigest()[:16]
+    if alias_lectura() == DEFAULT_DB_ALIAS:
+        _conjuntos[nombre] = (generacion, version, contenido, time.monotonic())
+    return version, contenido
+
+
+def obtener(nombre):
+    """``(version, contenido_json)`` vigentes del conjunto ``nombre``"""
+    generacion, guardado = vigente(nombre)
+    if guardado is not None:
+        return guardado
+    with _candado:
+        return guardar(nombre, generacion, CONJUNTOS[nombre]())
+
+
+async def aobtener(nombre):
+    """``obtener`` con el ORM asíncrono"""
+    generacion, guardado = vigente(nombre)
+    if guardado is not None:
+        return guardado
+    return guardar(nombre, generacion, await acalcular(nombre))
+
+
+def versiones():
+    """Versiones vigentes para construir las URLs versionadas en las plantillas"""
+    return {nombre: obtener(nombre)[0] for nombre in CONJUNTOS}
+
+
+def respuesta_referencia(request, nombre):
+    """Respuesta JSON del conjunto con los encabezados de cache que correspondan"""
+    return respuesta_versionada(request, *obtener(nombre))
+
+
+async def arespuesta_referencia(request, nombre):
+    return respuesta_versionada(request, *await aobtener(nombre))
+
+
+def respuesta_versionada(request, version, contenido):
+    etag = f'"{version}"'
+    response = HttpResponse(contenido, content_type='application/json')
+    response['ETag'] = etag
+    if request.GET.get('v') == version:
+        patch_cache_control(response, public=True, max_age=MAX_AGE_VERSIONADO, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    # Como GetCondicionalMixin: If-None-Match con ETags débiles, listas o '*'
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+class DatosReferenciaMixin:
+    """
+    Sirve el listado completo (sin filtros ni ordering) desde ``obtener``.
+    Con cualquier otro parámetro se usa el flujo normal del ViewSet.
+    """
+    conjunto_referencia = None
+    parametros_referencia = {'v'}
+
+    def es_listado_de_referencia(self, request):
+        return (
+            request.accepted_renderer.format == 'json'
+            and set(request.query_params) <= self.parametros_referencia
+        )
+
+    def list(self, request, *args, **kwargs):
+        if self.es_listado_de_referencia(request):
+            return respuesta_referencia(request, self.conjunto_referencia)
+        return super().list(request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        if self.es_listado_de_referencia(request):
+            return await arespuesta_referencia(request, self.conjunto_referencia)
+        return await super().alist(request, *args, **kwargs)
@@ -0,0 +1,214 @@
+"""
+Formatos de respuesta para consumidores masivos, junto al JSONRenderer.
+
+- ``?format=msgpack`` / ``Accept: application/msgpack``: la misma estructura
+  que el JSON, en MessagePack.
+- ``?format=columnar`` / ``Accept: application/vnd.distribuidora.columnar+msgpack``:
+  los listados como una columna por campo, en MessagePack::
+
+      {
+        "filas": 2,
+        "columnas": ["id", "proveedor_nombre", "costo", ...],
+        "datos": {
+          "id": {"tipo": "<i8", "valores": <bin>},
+          "proveedor_nombre": {"tipo": "diccionario", "diccionario": ["A", "B"],
+                               "indices": {"tipo": "<i4", "valores": <bin>}},
+          "costo": {"tipo": "<i8", "escala": 100, "valores": <bin>},
+          "activo": {"tipo": "|b1", "valores": <bin>},
+          "clave_proveedor": {"tipo": "texto", "valores": ["X1", "X2"]}
+        },
+        "next": ..., "previous": ...
+      }
+
+  Las columnas numéricas son arreglos binarios little-endian con el ``dtype``
+  de NumPy en ``tipo`` (``numpy.frombuffer(valores, dtype=tipo)``). Los
+  decimales van como enteros escalados (``costo / escala``). Los textos que
+  vienen de una relación (``proveedor_nombre``, ``tipo_producto_nombre``) se
+  codifican como diccionario; el índice -1 es nulo, como en
+  ``pandas.Categorical.from_codes``. Una columna numérica con nulos agrega
+  ``"nulos": <bin>`` (``|b1``, 1 donde el valor es nulo).
+
+Las respuestas que no son listados (detalle, errores) se envían en
+MessagePack sin transformar.
+"""
+import sys
+from array import array
+from decimal import Decimal
+
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+
+from .mensajepack import empaquetar
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return empaquetar(data)
+
+
+def _binario(codigo, valores):
+    arreglo = array(codigo, valores)
+    if sys.byteorder == 'big':
+        arreglo.byteswap()
+    return arreglo.tobytes()
+
+
+DTYPE_ENTERO = '<i8'
+DTYPE_INDICE = f'<i{array("i").itemsize}'
+DTYPE_FLOTANTE = '<f8'
+DTYPE_BOOLEANO = '|b1'
+
+
+def columna_numerica(valores, codigo, dtype):
+    nulos = [valor is None for valor in valores]
+    columna = {
+        'tipo': dtype,
+        'valores': _binario(codigo, [0 if valor is None else valor for valor in valores]),
+    }
+    if any(nulos):
+        columna['nulos'] = bytes(nulos)
+    return columna
+
+
+def columna_escalada(valores, decimales):
+    enteros = [
+        None if valor in (None, '') else int(Decimal(str(valor)).scaleb(decimales).to_integral_value())
+        for valor in valores
+    ]
+    columna = columna_numerica(enteros, 'q', DTYPE_ENTERO)
+    columna['escala'] = 10 ** decimales
+    return columna
+
+
+def columna_diccionario(valores):
+    indices = {}
+    codigos = []
+    for valor in valores:
+        if valor is None:
+            codigos.append(-1)
+        else:
+            codigos.append(indices.setdefault(valor, len(indices)))
+    return {
+        'tipo': 'diccionario',
+        'diccionario': list(indices),
+        'indices': {'tipo': DTYPE_INDICE, 'valores': _binario('i', codigos)},
+    }
+
+
+def tipo_columna(campo):
+    """Codificación según el campo del serializer; None para inferirla de los valores"""
+    if campo is None:
+        return None
+    if isinstance(campo, serializers.DecimalField) and campo.decimal_places is not None:
+        return 'escalado'
+    if isinstance(campo, serializers.BooleanField):
+        return 'booleano'
+    if isinstance(campo, serializers.IntegerField) or isinstance(campo, serializers.PrimaryKeyRelatedField):
+        return 'entero'
+    if isinstance(campo, serializers.FloatField):
+        return 'flotante'
+    if isinstance(campo, serializers.CharField):
+        # Nombres traídos de una relación: pocos valores distintos y muy repetidos
+        return 'diccionario' if len(campo.source_attrs) > 1 else 'texto'
+    return None
+
+
+def inferir_tipo(valores):
+    presentes = [valor for valor in valores if valor is not None]
+    if not presentes:
+        return 'nulo'
+    if all(isinstance(valor, bool) for valor in presentes):
+        return 'booleano'
+    if all(isinstance(valor, int) and not isinstance(valor, bool) for valor in presentes):
+        return 'entero'
+    if all(isinstance(valor, (int, float)) and not isinstance(valor, bool) for valor in presentes):
+        return 'flotante'
+    if all(isinstance(valor, str) for valor in presentes):
+        return 'texto'
+    return 'objeto'
+
+
+def codificar_columna(valores, campo=None):
+    inferido = inferir_tipo(valores)
+    tipo = tipo_columna(campo) or inferido
+    # El tipo del campo solo se usa si los valores lo respetan
+    if tipo in ('booleano', 'entero', 'flotante', 'texto') and inferido not in (tipo, 'nulo'):
+        tipo = 'flotante' if (tipo, inferido) == ('flotante', 'entero') else inferido
+    if tipo == 'diccionario' and inferido not in ('texto', 'nulo'):
+        tipo = inferido
+
+    if tipo == 'escalado':
+        return columna_escalada(valores, campo.decimal_places)
+    if tipo == 'booleano':
+        return columna_numerica(valores, 'b', DTYPE_BOOLEANO)
+    if tipo == 'entero' and all(valor is None or -2 ** 63 <= valor < 2 ** 63 for valor in valores):
+        return columna_numerica(valores, 'q', DTYPE_ENTERO)
+    if tipo == 'flotante':
+        return columna_numerica(valores, 'd', DTYPE_FLOTANTE)
+    if tipo == 'diccionario':
+        return columna_diccionario(valores)
+    if tipo in ('texto', 'nulo'):
+        return {'tipo': 'texto', 'valores': valores}
+    return {'tipo': 'objeto', 'valores': valores}
+
+
+def a_columnas(filas, campos=None):
+    """Lista de filas (dicts con las mismas claves) a la estructura columnar"""
+    campos = campos or {}
+    nombres = list(filas[0]) if filas else list(campos)
+    return {
+        'filas': len(filas),
+        'columnas': nombres,
+        'datos': {
+            nombre: codificar_columna([fila.get(nombre) for fila in filas], campos.get(nombre))
+            for nombre in nombres
+        },
+    }
+
+
+class ColumnarRenderer(BaseRenderer):
+    media_type = 'application/vnd.distribuidora.columnar+msgpack'
+    format = 'columnar'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if response is not None and response.exception:
+            return empaquetar(data)
+
+        # Listado simple o paginado ({'next', 'previous', ..., 'results'})
+        if isinstance(data, list):
+            filas, extras = data, {}
+        elif isinstance(data, dict) and isinstance(data.get('results'), list):
+            filas = data['results']
+            extras = {clave: valor for clave, valor in data.items() if clave != 'results'}
+        else:
+            return empaquetar(data)
+        if not all(isinstance(fila, dict) for fila in filas):
+            return empaquetar(data)
+
+        columnar = a_columnas(filas, self.campos_vista(renderer_context.get('view'), filas))
+        columnar.update(extras)
+        return empaquetar(columnar)
+
+    def campos_vista(self, view, filas):
+        """Campos del serializer de la vista, para saber qué columnas son decimales o relaciones"""
+        if view is None or not hasattr(view, 'campos_serializer'):
+            # Sin información del serializer el tipo se infiere de los valores
+            return {}
+        campos = view.campos_serializer()
+        if filas:
+            return {nombre: campo for nombre, campo in campos.items() if nombre in filas[0]}
+        solicitados = view.campos_solicitados()
+        return {nombre: campo for nombre, campo in campos.items() if solicitados is None or nombre in solicitados}
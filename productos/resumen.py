@@ -0,0 +1,40 @@
+"""
+Recálculo del resumen de proveedores disparado por señales.
+
+Cada ``save()``/``delete()`` de ProductoProveedor recalcula el resumen de su
+producto (ver productos/signals.py). Dentro de ``resumen_diferido()`` los
+recálculos se acumulan y se aplican con un solo UPDATE al salir del bloque,
+para las operaciones que tocan varias relaciones a la vez.
+"""
+import threading
+from contextlib import contextmanager
+
+from .models import Producto
+
+
+_estado = threading.local()
+
+
+def recalcular_resumen(producto_ids):
+    pendientes = getattr(_estado, 'pendientes', None)
+    if pendientes is None:
+        Producto.actualizar_resumen_proveedores(producto_ids)
+    else:
+        pendientes.update(producto_ids)
+
+
+@contextmanager
+def resumen_diferido():
+    if getattr(_estado, 'pendientes', None) is not None:
+        # Bloque anidado: aplica el más externo
+        yield
+        return
+
+    _estado.pendientes = set()
+    try:
+        yield
+        pendientes = _estado.pendientes
+    finally:
+        _estado.pendientes = None
+    if pendientes:
+        Producto.actualizar_resumen_proveedores(pendientes)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
+from django.db import transaction
+from django.utils import timezone
 from .models import TipoProducto, Proveedor, Producto, ProductoProveedor
+from .resumen import recalcular_resumen, resumen_diferido
 from decimal import Decimal
 
 
@@ -34,23 +37,18 @@ class ProductoProveedorSerializer(serializers.ModelSerializer):
 class ProductoListSerializer(serializers.ModelSerializer):
     """Serializer para listar productos (vista simplificada)"""
     tipo_producto_nombre = serializers.CharField(source='tipo_producto.nombre', read_only=True)
-    cantidad_proveedores = serializers.SerializerMethodField()
-    costo_minimo = serializers.SerializerMethodField()
+    costo_minimo = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        coerce_to_string=False,
+        read_only=True
+    )
     
     class Meta:
         model = Producto
         fields = ['id', 'clave', 'nombre', 'tipo_producto', 'tipo_producto_nombre', 
-                  'cantidad_proveedores', 'costo_minimo', 'activo']
-    
-    def get_cantidad_proveedores(self, obj):
-        return obj.producto_proveedores.filter(activo=True).count()
-    
-    def get_costo_minimo(self, obj):
-        """Calcula el costo mínimo de todos los proveedores activos"""
-        proveedores_activos = obj.producto_proveedores.filter(activo=True)
-        if proveedores_activos.exists():
-            return min(pp.costo for pp in proveedores_activos)
-        return None
+                  'cantidad_proveedores', 'costo_minimo', 'proveedor_costo_minimo', 'activo']
+        read_only_fields = ['cantidad_proveedores', 'proveedor_costo_minimo']
 
 
 class ProductoDetailSerializer(serializers.ModelSerializer):
@@ -111,47 +109,132 @@ class ProductoCreateUpdateSerializer(serializers.ModelSerializer):
             except (ValueError, TypeError):
                 raise serializers.ValidationError("El costo debe ser un número válido")
         
+        try:
+            proveedor_ids = [int(prov['proveedor']) for prov in value]
+        except (ValueError, TypeError):
+            raise serializers.ValidationError("El proveedor debe ser un id válido")
+        if len(set(proveedor_ids)) != len(proveedor_ids):
+            raise serializers.ValidationError("Un proveedor no puede repetirse en el mismo producto")
+        
+        # Una sola consulta para todos los proveedores referenciados
+        existentes = set(Proveedor.objects.filter(pk__in=proveedor_ids).values_list('pk', flat=True))
+        faltantes = sorted(set(proveedor_ids) - existentes)
+        if faltantes:
+            raise serializers.ValidationError(
+                f"No existen los proveedores: {', '.join(str(pk) for pk in faltantes)}"
+            )
+        
         return value
     
+    def relacion_desde_datos(self, producto, prov_data):
+        """ProductoProveedor (sin guardar) con los valores normalizados de ``prov_data``"""
+        relacion = ProductoProveedor(
+            producto=producto,
+            proveedor_id=int(prov_data['proveedor']),
+            clave_proveedor=str(prov_data['clave_proveedor']),
+            costo=Decimal(str(prov_data['costo'])).quantize(Decimal('0.01')),
+            activo=prov_data.get('activo', True)
+        )
+        relacion.activo = ProductoProveedor._meta.get_field('activo').to_python(relacion.activo)
+        return relacion
+    
     def create(self, validated_data):
         proveedores_data = validated_data.pop('proveedores', [])
-        producto = Producto.objects.create(**validated_data)
         
-        # Crear relaciones con proveedores
-        for prov_data in proveedores_data:
-            ProductoProveedor.objects.create(
-                producto=producto,
-                proveedor_id=prov_data['proveedor'],
-                clave_proveedor=prov_data['clave_proveedor'],
-                costo=prov_data['costo'],
-                activo=prov_data.get('activo', True)
-            )
+        with transaction.atomic():
+            producto = Producto.objects.create(**validated_data)
+            
+            # Crear relaciones con proveedores en un solo INSERT
+            if proveedores_data:
+                ProductoProveedor.objects.bulk_create([
+                    self.relacion_desde_datos(producto, prov_data)
+                    for prov_data in proveedores_data
+                ])
+                Producto.actualizar_resumen_proveedores([producto.pk])
         
         return producto
     
     def update(self, instance, validated_data):
         proveedores_data = validated_data.pop('proveedores', None)
         
-        # Actualizar campos del producto
-        instance.clave = validated_data.get('clave', instance.clave)
-        instance.nombre = validated_data.get('nombre', instance.nombre)
-        instance.tipo_producto = validated_data.get('tipo_producto', instance.tipo_producto)
-        instance.activo = validated_data.get('activo', instance.activo)
-        instance.save()
+        with transaction.atomic(), resumen_diferido():
+            # Actualizar campos del producto
+            instance.clave = validated_data.get('clave', instance.clave)
+            instance.nombre = validated_data.get('nombre', instance.nombre)
+            instance.tipo_producto = validated_data.get('tipo_producto', instance.tipo_producto)
+            instance.activo = validated_data.get('activo', instance.activo)
+            instance.save()
+            
+            # Actualizar proveedores si se enviaron
+            if proveedores_data is not None:
+                self.sincronizar_proveedores(instance, proveedores_data)
+        
+        return instance
+    
+    def sincronizar_proveedores(self, producto, proveedores_data):
+        """
+        Compara la lista recibida con las relaciones existentes (por proveedor)
+        y aplica a lo más un INSERT, un UPDATE y un DELETE. Las relaciones sin
+        cambios conservan su id y fecha de creación.
+        """
+        existentes = {
+            relacion.proveedor_id: relacion
+            for relacion in producto.producto_proveedores.all()
+        }
         
-        # Actualizar proveedores si se enviaron
-        if proveedores_data is not None:
-            # Eliminar relaciones existentes
-            instance.producto_proveedores.all().delete()
+        nuevas = []
+        modificadas = []
+        ahora = timezone.now()
+        for prov_data in proveedores_data:
+            recibida = self.relacion_desde_datos(producto, prov_data)
+            relacion = existentes.pop(recibida.proveedor_id, None)
+            if relacion is None:
+                nuevas.append(recibida)
+                continue
             
-            # Crear nuevas relaciones
-            for prov_data in proveedores_data:
-                ProductoProveedor.objects.create(
-                    producto=instance,
-                    proveedor_id=prov_data['proveedor'],
-                    clave_proveedor=prov_data['clave_proveedor'],
-                    costo=prov_data['costo'],
-                    activo=prov_data.get('activo', True)
-                )
+            valores = (recibida.clave_proveedor, recibida.costo, recibida.activo)
+            if (relacion.clave_proveedor, relacion.costo, relacion.activo) != valores:
+                relacion.clave_proveedor, relacion.costo, relacion.activo = valores
+                relacion.fecha_modificacion = ahora
+                modificadas.append(relacion)
         
-        return instance
\ No newline at end of file
+        # Las que quedaron en ``existentes`` ya no vienen en la lista
+        if existentes:
+            ProductoProveedor.objects.filter(
+                pk__in=[relacion.pk for relacion in existentes.values()]
+            ).delete()
+        if modificadas:
+            ProductoProveedor.objects.bulk_update(
+                modificadas, ['clave_proveedor', 'costo', 'activo', 'fecha_modificacion']
+            )
+        if nuevas:
+            ProductoProveedor.objects.bulk_create(nuevas)
+        
+        if existentes or modificadas or nuevas:
+            recalcular_resumen([producto.pk])
+
+
+class ProveedorAltaMasivaSerializer(serializers.Serializer):
+    """Proveedor de un producto en la alta masiva (sin consultas: ver productos/alta_masiva.py)"""
+    proveedor = serializers.IntegerField()
+    clave_proveedor = serializers.CharField(max_length=100)
+    costo = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    activo = serializers.BooleanField(default=True)
+
+
+class ProductoAltaMasivaSerializer(serializers.Serializer):
+    """
+    Producto de la alta masiva. Valida solo forma y tipos; la unicidad de la
+    clave y las referencias se validan para toda la lista con una consulta
+    """
+    clave = serializers.CharField(max_length=50)
+    nombre = serializers.CharField(max_length=200)
+    tipo_producto = serializers.IntegerField()
+    activo = serializers.BooleanField(default=True)
+    proveedores = ProveedorAltaMasivaSerializer(many=True, required=False, default=list)
+    
+    def validate_proveedores(self, value):
+        proveedor_ids = [prov['proveedor'] for prov in value]
+        if len(set(proveedor_ids)) != len(proveedor_ids):
+            raise serializers.ValidationError("Un proveedor no puede repetirse en el mismo producto")
+        return value
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache_respuestas import invalidar_respuestas
+from .referencia import invalidar_referencia
+from .models import TipoProducto, Proveedor, Producto, ProductoProveedor
+from .resumen import recalcular_resumen
+
+
+@receiver(post_save, sender=ProductoProveedor)
+def actualizar_resumen_al_guardar(sender, instance, **kwargs):
+    """Mantiene el resumen de proveedores del producto tras crear o editar la relación"""
+    producto_ids = {instance.producto_id}
+    producto_original = getattr(instance, '_producto_id_original', None)
+    if producto_original:
+        producto_ids.add(producto_original)
+    instance._producto_id_original = instance.producto_id
+    recalcular_resumen(producto_ids)
+
+
+@receiver(post_delete, sender=ProductoProveedor)
+def actualizar_resumen_al_eliminar(sender, instance, **kwargs):
+    """Mantiene el resumen de proveedores del producto tras eliminar la relación"""
+    recalcular_resumen([instance.producto_id])
+
+
+@receiver(post_save, sender=TipoProducto)
+@receiver(post_delete, sender=TipoProducto)
+@receiver(post_save, sender=Proveedor)
+@receiver(post_delete, sender=Proveedor)
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=ProductoProveedor)
+@receiver(post_delete, sender=ProductoProveedor)
+def invalidar_cache_respuestas(sender, **kwargs):
+    """Cualquier escritura (API, admin o shell) deja obsoletas las respuestas cacheadas"""
+    invalidar_respuestas()
+
+
+@receiver(post_save, sender=TipoProducto)
+@receiver(post_delete, sender=TipoProducto)
+@receiver(post_save, sender=Proveedor)
+@receiver(post_delete, sender=Proveedor)
+def invalidar_datos_referencia(sender, **kwargs):
+    """Tipos, proveedores y departamentos se recalculan en la siguiente lectura"""
+    invalidar_referencia()
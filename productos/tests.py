@@ -1,3 +1,1848 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import tempfile
+import time
+import types
+from collections import Counter
+from decimal import Decimal
+from functools import partial
+from unittest import mock
 
-# Create your tests here.
+import numpy
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APITestCase
+
+from distribuidora import metricas, perfilado, replicas
+from distribuidora.instrumentacion import InstrumentacionMiddleware
+from distribuidora.mysql_pool.pool import PoolAgotado, PoolConexiones
+
+from . import asincrono, datos_sinteticos, exportacion, mensajepack, referencia
+from .management.commands import benchmark_asgi, benchmark_endpoints
+from .busqueda import buscar_productos
+from .facetas import parsear_rangos
+from .importacion import LOTE_MAXIMO, ImportadorCatalogo, leer_filas
+from .models import TipoProducto, Proveedor, Producto, ProductoProveedor
+from .pagination import ProductoCursorPagination
+from .serializers import ProductoListSerializer, ProductoProveedorSerializer
+from .views import ProductoViewSet, ProveedorViewSet, TipoProductoViewSet
+
+
+class ProductoListQueryCountTest(APITestCase):
+    """El listado de productos debe costar un número fijo de consultas"""
+
+    url = '/api/api/productos/'
+
+    def crear_catalogo(self, cantidad):
+        ProductoProveedor.objects.all().delete()
+        Producto.objects.all().delete()
+
+        tipo = TipoProducto.objects.create(nombre='Pruebas')
+        proveedores = [
+            Proveedor.objects.create(nombre=f'Proveedor Prueba {i}', departamento='Pruebas')
+            for i in range(3)
+        ]
+        productos = Producto.objects.bulk_create([
+            Producto(clave=f'PRB-{i:05d}', nombre=f'Producto {i}', tipo_producto=tipo)
+            for i in range(cantidad)
+        ])
+        ProductoProveedor.objects.bulk_create([
+            ProductoProveedor(
+                producto=producto,
+                proveedor=proveedor,
+                clave_proveedor=f'{proveedor.pk}-{producto.clave}',
+                costo=Decimal('10.00') + j,
+                activo=j < 2,
+            )
+            for producto in productos
+            for j, proveedor in enumerate(proveedores)
+        ])
+        Producto.actualizar_resumen_proveedores()
+
+    def assert_consultas_constantes(self, cantidad):
+        self.crear_catalogo(cantidad)
+
+        # Página + estado de tipo_producto y proveedor para el ETag
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'page_size': 500})
+
+        self.assertEqual(response.status_code, 200)
+        resultados = response.json()['results']
+        self.assertEqual(len(resultados), min(cantidad, 500))
+        self.assertEqual(resultados[0]['cantidad_proveedores'], 2)
+        self.assertEqual(Decimal(str(resultados[0]['costo_minimo'])), Decimal('10.00'))
+
+    def test_consultas_con_10_productos(self):
+        self.assert_consultas_constantes(10)
+
+    def test_consultas_con_10000_productos(self):
+        self.assert_consultas_constantes(10000)
+
+    def test_producto_sin_proveedores_activos(self):
+        self.crear_catalogo(1)
+        ProductoProveedor.objects.update(activo=False)
+        Producto.actualizar_resumen_proveedores()
+
+        response = self.client.get(self.url)
+
+        resultado = response.json()['results'][0]
+        self.assertEqual(resultado['cantidad_proveedores'], 0)
+        self.assertIsNone(resultado['costo_minimo'])
+
+
+class ProductoResumenProveedoresTest(APITestCase):
+    """El resumen desnormalizado sigue a las escrituras de ProductoProveedor"""
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Pruebas')
+        self.producto = Producto.objects.create(clave='RES-001', nombre='Resumen', tipo_producto=tipo)
+        self.barato = Proveedor.objects.create(nombre='Barato', departamento='Pruebas')
+        self.caro = Proveedor.objects.create(nombre='Caro', departamento='Pruebas')
+
+    def agregar(self, proveedor, costo):
+        url = f'/api/api/productos/{self.producto.pk}/agregar_proveedor/'
+        return self.client.post(url, {
+            'proveedor': proveedor.pk,
+            'clave_proveedor': f'{proveedor.nombre}-1',
+            'costo': costo,
+        }, format='json')
+
+    def assert_resumen(self, cantidad, costo, proveedor):
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.cantidad_proveedores, cantidad)
+        self.assertEqual(self.producto.costo_minimo, costo)
+        self.assertEqual(self.producto.proveedor_costo_minimo, proveedor)
+
+    def test_agregar_desactivar_y_eliminar_proveedor(self):
+        self.agregar(self.caro, '20.00')
+        self.agregar(self.barato, '10.00')
+        self.assert_resumen(2, Decimal('10.00'), self.barato)
+
+        relacion = ProductoProveedor.objects.get(producto=self.producto, proveedor=self.barato)
+        self.client.patch(
+            f'/api/api/productos-proveedores/{relacion.pk}/', {'activo': False}, format='json'
+        )
+        self.assert_resumen(1, Decimal('20.00'), self.caro)
+
+        self.client.delete(
+            f'/api/api/productos/{self.producto.pk}/eliminar_proveedor/{self.caro.pk}/'
+        )
+        self.assert_resumen(0, None, None)
+
+    def test_guardar_producto_no_pisa_el_resumen(self):
+        producto_en_memoria = Producto.objects.get(pk=self.producto.pk)
+        self.agregar(self.barato, '10.00')
+
+        producto_en_memoria.nombre = 'Renombrado'
+        producto_en_memoria.save()
+
+        self.assert_resumen(1, Decimal('10.00'), self.barato)
+
+
+class ProductoBusquedaTest(APITestCase):
+    """Búsqueda por prefijo e insensible a acentos sobre el índice de texto"""
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Pruebas')
+        Producto.objects.create(clave='BUS-001', nombre='Juego de Sábanas King', tipo_producto=tipo)
+        Producto.objects.create(clave='BUS-002', nombre='Teclado Mecánico', tipo_producto=tipo)
+
+    def buscar(self, consulta, **filtros):
+        response = self.client.get('/api/api/productos/', {'search': consulta, **filtros})
+        return [producto['clave'] for producto in response.json()['results']]
+
+    def test_sin_acentos_y_por_prefijo(self):
+        self.assertEqual(self.buscar('sabanas'), ['BUS-001'])
+        self.assertEqual(self.buscar('MEC'), ['BUS-002'])
+        self.assertEqual(self.buscar('teclado mecá'), ['BUS-002'])
+
+    def test_sigue_cambios_de_nombre(self):
+        producto = Producto.objects.get(clave='BUS-002')
+        producto.nombre = 'Ratón Inalámbrico'
+        producto.save()
+
+        self.assertEqual(self.buscar('mecanico'), [])
+        self.assertEqual(self.buscar('raton'), ['BUS-002'])
+
+    def test_dentro_de_una_subconsulta(self):
+        # El MATCH va por el join con ProductoBusqueda, no por SQL ligado al alias externo
+        encontrados = buscar_productos(Producto.objects.all(), 'sabanas king')
+        self.assertEqual(
+            list(Producto.objects.filter(pk__in=encontrados.values('pk')).values_list('clave', flat=True)),
+            ['BUS-001'],
+        )
+        facetas = self.client.get('/api/api/productos/facetas/', {'search': 'teclado'}).json()
+        self.assertEqual(facetas['total'], 1)
+
+    def test_relevancia_y_operadores(self):
+        tipo = TipoProducto.objects.get(nombre='Pruebas')
+        Producto.objects.create(
+            clave='BUS-003', nombre='Teclado numérico con cable largo y soporte', tipo_producto=tipo
+        )
+        # El nombre más corto es más relevante para el mismo término
+        self.assertEqual(self.buscar('teclado'), ['BUS-002', 'BUS-003'])
+        # Comillas y operadores de FTS5 se tratan como texto
+        self.assertEqual(self.buscar('"teclado" -cable*'), ['BUS-003'])
+        self.assertEqual(self.buscar('teclado', clave='BUS-003'), ['BUS-003'])
+
+
+class ProductoCursorPaginacionTest(APITestCase):
+    """Recorrido completo por cursor con valores repetidos en el campo de orden"""
+
+    url = '/api/api/productos/'
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Pruebas')
+        nombres = ['Paginado Igual'] * 5 + ['Paginado Alfa', 'Paginado Zeta']
+        for numero, nombre in enumerate(nombres, start=1):
+            Producto.objects.create(clave=f'PAG-{numero:03}', nombre=nombre, tipo_producto=tipo)
+        self.productos = Producto.objects.filter(clave__startswith='PAG-')
+        # Todos con la misma fecha de creación
+        self.productos.update(fecha_creacion=self.productos.first().fecha_creacion)
+
+    def recorrer(self, parametros, enlace):
+        """Claves de todas las páginas siguiendo ``enlace`` (next o previous)"""
+        claves, paginas = [], 0
+        datos = self.client.get(self.url, {'clave': 'PAG-', 'page_size': 2, **parametros}).json()
+        while True:
+            paginas += 1
+            pagina = [producto['clave'] for producto in datos['results']]
+            claves = pagina + claves if enlace == 'previous' else claves + pagina
+            if not datos[enlace]:
+                return claves, paginas
+            datos = self.client.get(datos[enlace]).json()
+
+    def test_recorre_cada_orden_sin_saltar_ni_repetir(self):
+        for orden in ('clave', '-clave', 'nombre', '-nombre', 'fecha_creacion', '-fecha_creacion'):
+            with self.subTest(orden=orden):
+                esperadas = list(
+                    self.productos.order_by(orden, 'pk').values_list('clave', flat=True)
+                )
+                claves, paginas = self.recorrer({'ordering': orden}, 'next')
+                self.assertEqual(claves, esperadas)
+                self.assertEqual(paginas, 4)
+
+                # Hacia atrás desde la última página
+                ultima = self.client.get(self.url, {'clave': 'PAG-', 'page_size': 2, 'ordering': orden})
+                while ultima.json()['next']:
+                    ultima = self.client.get(ultima.json()['next'])
+                hacia_atras = []
+                datos = ultima.json()
+                while True:
+                    hacia_atras = [producto['clave'] for producto in datos['results']] + hacia_atras
+                    if not datos['previous']:
+                        break
+                    datos = self.client.get(datos['previous']).json()
+                self.assertEqual(hacia_atras, esperadas)
+
+    def test_recorre_por_relevancia(self):
+        claves, _ = self.recorrer({'search': 'paginado'}, 'next')
+        self.assertEqual(sorted(claves), [f'PAG-{numero:03}' for numero in range(1, 8)])
+
+    def test_cursor_invalido(self):
+        cursor = base64.b64encode(b'p=Paginado+Igual').decode()
+        response = self.client.get(self.url, {'clave': 'PAG-', 'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+    def test_total(self):
+        datos = self.client.get(self.url, {'clave': 'PAG-', 'page_size': 2}).json()
+        self.assertNotIn('total', datos)
+
+        datos = self.client.get(self.url, {'clave': 'PAG-', 'page_size': 2, 'total': 'exacto'}).json()
+        self.assertEqual((datos['total'], datos['total_estimado']), (7, False))
+        self.assertEqual(len(datos['results']), 2)
+
+        # Fuera de MySQL la estimación cae a COUNT(*)
+        datos = self.client.get(self.url, {'clave': 'PAG-', 'total': 'estimado'}).json()
+        self.assertEqual((datos['total'], datos['total_estimado']), (7, False))
+
+    def test_total_estimado_con_explain(self):
+        explain = mock.MagicMock(description=[('id',), ('rows',), ('filtered',)])
+        explain.fetchone.return_value = (1, 200, 50.0)
+        conexion = mock.MagicMock(vendor='mysql')
+        conexion.cursor.return_value.__enter__.return_value = explain
+        with mock.patch('productos.pagination.connections', {DEFAULT_DB_ALIAS: conexion}):
+            total = ProductoCursorPagination().estimar_total(self.productos)
+        self.assertEqual(total, (100, True))
+        self.assertTrue(explain.execute.call_args[0][0].startswith('EXPLAIN SELECT'))
+
+
+@override_settings(PRODUCTOS_RESPUESTAS_CACHE_TTL=0)
+class GetCondicionalTest(APITestCase):
+    """ETag / Last-Modified en listados y detalle"""
+
+    def setUp(self):
+        self.tipo = TipoProducto.objects.create(nombre='Herramientas')
+        self.proveedor = Proveedor.objects.create(nombre='Proveedor Uno', departamento='Ferretería')
+        self.producto = Producto.objects.create(clave='HER-001', nombre='Martillo', tipo_producto=self.tipo)
+        self.relacion = ProductoProveedor.objects.create(
+            producto=self.producto, proveedor=self.proveedor,
+            clave_proveedor='P1-HER-001', costo=Decimal('50.00')
+        )
+
+    def test_listado_responde_304_sin_serializar(self):
+        url = '/api/api/productos/'
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        # Solo las consultas de validadores; el serializer no corre
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_detalle_con_if_modified_since(self):
+        url = f'/api/api/productos/{self.producto.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cambio_de_proveedor_invalida_etag(self):
+        url = f'/api/api/productos/{self.producto.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        self.relacion.costo = Decimal('40.00')
+        self.relacion.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detalle_inexistente(self):
+        self.assertEqual(self.client.get('/api/api/productos/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/api/tipos-producto/abc/').status_code, 404)
+
+
+@override_settings(PRODUCTOS_RESPUESTAS_CACHE_TTL=60)
+class CacheRespuestasTest(APITestCase):
+    """Cache de listado y detalle invalidado por escrituras"""
+
+    def setUp(self):
+        self.tipo = TipoProducto.objects.create(nombre='Herramientas')
+        self.proveedor = Proveedor.objects.create(nombre='Proveedor Uno', departamento='Ferretería')
+        self.producto = Producto.objects.create(clave='HER-001', nombre='Martillo', tipo_producto=self.tipo)
+        self.relacion = ProductoProveedor.objects.create(
+            producto=self.producto, proveedor=self.proveedor,
+            clave_proveedor='P1-HER-001', costo=Decimal('50.00')
+        )
+
+    def test_acierto_sin_consultas_y_parametros_normalizados(self):
+        url = '/api/api/productos/'
+        primera = self.client.get(url + '?activo=true&clave=HER')
+        self.assertEqual(primera['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            segunda = self.client.get(url + '?clave=HER&activo=true')
+        self.assertEqual(segunda['X-Cache'], 'HIT')
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+
+        respuesta = self.client.get(url + '?clave=HER&activo=true', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_escrituras_invalidan(self):
+        url = f'/api/api/productos/{self.producto.pk}/'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        self.proveedor.nombre = 'Proveedor Renombrado'
+        self.proveedor.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['proveedores_detalle'][0]['proveedor_nombre'], 'Proveedor Renombrado')
+
+        self.relacion.delete()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['proveedores_detalle'], [])
+
+    def test_importacion_sin_proveedores_invalida(self):
+        url = f'/api/api/productos/{self.producto.pk}/'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        filas = [{'clave': 'HER-001', 'nombre': 'Martillo de bola', 'tipo_producto': 'Herramientas'}]
+        ImportadorCatalogo().importar(filas)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['nombre'], 'Martillo de bola')
+
+    def test_contadores(self):
+        antes = self.client.get('/api/api/productos/cache/').json()
+        self.client.get('/api/api/productos-proveedores/')
+        self.client.get('/api/api/productos-proveedores/')
+        despues = self.client.get('/api/api/productos/cache/').json()
+
+        self.assertEqual(despues['aciertos'] - antes['aciertos'], 1)
+        self.assertEqual(despues['fallos'] - antes['fallos'], 1)
+
+
+class DatosReferenciaTest(APITestCase):
+    """Tipos, proveedores y departamentos servidos con versión por contenido"""
+
+    def setUp(self):
+        TipoProducto.objects.create(nombre='Herramientas')
+        Proveedor.objects.create(nombre='Proveedor Uno', departamento='Ferretería')
+
+    def test_url_versionada_inmutable_y_sin_consultas(self):
+        version = referencia.versiones()['departamentos']
+        url = '/api/api/proveedores/departamentos/'
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'v': version})
+        self.assertIn('Ferretería', response.json()['departamentos'])
+        self.assertIn('immutable', response['Cache-Control'])
+
+        response = self.client.get(url, {'v': 'vieja'})
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_if_none_match_debil_lista_y_comodin(self):
+        version = referencia.versiones()['tipos_producto']
+        url = '/api/api/tipos-producto/'
+        for encabezado in (f'W/"{version}"', f'"otra", "{version}"', f'"otra",W/"{version}"', '*'):
+            with self.subTest(encabezado=encabezado):
+                response = self.client.get(url, {'v': version}, HTTP_IF_NONE_MATCH=encabezado)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], f'"{version}"')
+                self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"otra", W/"vieja"').status_code, 200)
+
+    def test_guardar_cambia_version(self):
+        version = referencia.versiones()['tipos_producto']
+        TipoProducto.objects.create(nombre='Eléctricos')
+
+        nueva = referencia.versiones()['tipos_producto']
+        self.assertNotEqual(nueva, version)
+        nombres = [tipo['nombre'] for tipo in self.client.get('/api/api/tipos-producto/', {'v': nueva}).json()]
+        self.assertIn('Eléctricos', nombres)
+        self.assertEqual(nombres, sorted(nombres))
+
+        # Con filtros se usa el flujo normal
+        response = self.client.get('/api/api/tipos-producto/', {'search': 'Eléctri'})
+        self.assertEqual([tipo['nombre'] for tipo in response.json()], ['Eléctricos'])
+
+    def test_lectura_concurrente_previa_al_commit(self):
+        proveedor = Proveedor.objects.get(nombre='Proveedor Uno')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                proveedor.nombre = 'Proveedor Renombrado'
+                proveedor.save()
+                # Otro proceso lee las filas previas al commit con la generación nueva
+                referencia.guardar('proveedores', referencia.generacion_actual(), [{'nombre': 'Proveedor Uno'}])
+
+        nombres = [fila['nombre'] for fila in json.loads(referencia.obtener('proveedores')[1])]
+        self.assertIn('Proveedor Renombrado', nombres)
+        self.assertNotIn('Proveedor Uno', nombres)
+
+    def test_ttl(self):
+        version, _ = referencia.obtener('tipos_producto')
+        # Un cambio que no incrementó la generación (otro proceso sin cache compartido)
+        TipoProducto.objects.filter(nombre='Herramientas').update(nombre='Herramientas manuales')
+        self.assertEqual(referencia.obtener('tipos_producto')[0], version)
+        with mock.patch('productos.referencia.time.monotonic', return_value=time.monotonic() + 3600):
+            self.assertNotEqual(referencia.obtener('tipos_producto')[0], version)
+
+
+class ListaPreciosTest(APITestCase):
+    """Carga masiva de la lista de precios de un proveedor"""
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Herramientas')
+        self.proveedor = Proveedor.objects.create(nombre='Proveedor Uno', departamento='Ferretería')
+        self.productos = Producto.objects.bulk_create([
+            Producto(clave=f'HER-{i:03d}', nombre=f'Herramienta {i}', tipo_producto=tipo)
+            for i in range(4)
+        ])
+        for producto, costo in zip(self.productos[:3], ('10.00', '20.00', '30.00')):
+            ProductoProveedor.objects.create(
+                producto=producto, proveedor=self.proveedor,
+                clave_proveedor=f'P1-{producto.clave}', costo=Decimal(costo)
+            )
+        self.url = f'/api/api/proveedores/{self.proveedor.pk}/lista_precios/'
+
+    def test_resumen_de_cambios(self):
+        response = self.client.post(self.url, {
+            'lineas': [
+                {'clave_proveedor': 'P1-HER-000', 'costo': '10.00'},
+                {'clave': 'HER-001', 'costo': 25},
+                {'clave': 'HER-003', 'clave_proveedor': 'P1-HER-003', 'costo': '5.5'},
+                {'clave_proveedor': 'NO-EXISTE', 'costo': '1.00'},
+                {'clave': 'HER-002', 'costo': '-3'},
+            ],
+            'desactivar_faltantes': True,
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        resumen = response.json()
+        self.assertEqual(
+            {clave: resumen[clave] for clave in ('creados', 'actualizados', 'sin_cambios', 'sin_coincidencia', 'errores', 'desactivados')},
+            {'creados': 1, 'actualizados': 1, 'sin_cambios': 1, 'sin_coincidencia': 1, 'errores': 1, 'desactivados': 1}
+        )
+
+        relaciones = {
+            relacion.producto.clave: relacion
+            for relacion in ProductoProveedor.objects.filter(proveedor=self.proveedor).select_related('producto')
+        }
+        self.assertEqual(relaciones['HER-001'].costo, Decimal('25.00'))
+        self.assertEqual(relaciones['HER-003'].costo, Decimal('5.50'))
+        self.assertFalse(relaciones['HER-002'].activo)
+
+        # El resumen desnormalizado refleja la carga
+        self.assertEqual(Producto.objects.get(clave='HER-003').costo_minimo, Decimal('5.50'))
+        self.assertEqual(Producto.objects.get(clave='HER-002').cantidad_proveedores, 0)
+
+    def test_cuerpo_invalido(self):
+        response = self.client.post(self.url, {'lineas': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SincronizarProveedoresTest(APITestCase):
+    """La edición de un producto aplica solo las diferencias en sus proveedores"""
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Herramientas')
+        self.proveedores = [
+            Proveedor.objects.create(nombre=f'Proveedor {letra}', departamento='Ferretería')
+            for letra in 'ABCD'
+        ]
+        response = self.client.post('/api/api/productos/', {
+            'clave': 'HER-001',
+            'nombre': 'Martillo',
+            'tipo_producto': tipo.pk,
+            'proveedores': [
+                {'proveedor': proveedor.pk, 'clave_proveedor': f'C-{proveedor.pk}', 'costo': costo}
+                for proveedor, costo in zip(self.proveedores[:3], ('10.00', '20.00', '30.00'))
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.producto = Producto.objects.get(clave='HER-001')
+        self.tipo = tipo
+
+    def test_conserva_filas_sin_cambios(self):
+        a, b, c, d = self.proveedores
+        antes = {relacion.proveedor_id: relacion for relacion in self.producto.producto_proveedores.all()}
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.put(f'/api/api/productos/{self.producto.pk}/', {
+                'clave': 'HER-001',
+                'nombre': 'Martillo',
+                'tipo_producto': self.tipo.pk,
+                'proveedores': [
+                    {'proveedor': a.pk, 'clave_proveedor': f'C-{a.pk}', 'costo': '10.00'},
+                    {'proveedor': b.pk, 'clave_proveedor': f'C-{b.pk}', 'costo': 5},
+                    {'proveedor': d.pk, 'clave_proveedor': f'C-{d.pk}', 'costo': '40.00'},
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        escrituras = [
+            consulta['sql'].split()[0] for consulta in consultas.captured_queries
+            if re.match(r'(INSERT INTO|UPDATE|DELETE FROM) "producto_proveedor"', consulta['sql'])
+        ]
+        self.assertEqual(sorted(escrituras), ['DELETE', 'INSERT', 'UPDATE'])
+
+        despues = {relacion.proveedor_id: relacion for relacion in self.producto.producto_proveedores.all()}
+        self.assertEqual(set(despues), {a.pk, b.pk, d.pk})
+        self.assertEqual(despues[a.pk].fecha_creacion, antes[a.pk].fecha_creacion)
+        self.assertEqual(despues[a.pk].fecha_modificacion, antes[a.pk].fecha_modificacion)
+        self.assertEqual(despues[b.pk].pk, antes[b.pk].pk)
+        self.assertEqual(despues[b.pk].costo, Decimal('5.00'))
+
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.costo_minimo, Decimal('5.00'))
+        self.assertEqual(self.producto.cantidad_proveedores, 3)
+
+    def test_proveedor_inexistente(self):
+        response = self.client.patch(f'/api/api/productos/{self.producto.pk}/', {
+            'proveedores': [{'proveedor': 999999, 'clave_proveedor': 'X', 'costo': '1.00'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AltaMasivaTest(APITestCase):
+    """POST /api/productos/bulk/"""
+
+    url = '/api/api/productos/bulk/'
+
+    def setUp(self):
+        self.tipo = TipoProducto.objects.create(nombre='Herramientas')
+        self.proveedor = Proveedor.objects.create(nombre='Proveedor Uno', departamento='Ferretería')
+        Producto.objects.create(clave='EXISTE-001', nombre='Existente', tipo_producto=self.tipo)
+
+    def elementos(self):
+        return [
+            {
+                'clave': f'ALTA-{i:03d}', 'nombre': f'Producto {i}', 'tipo_producto': self.tipo.pk,
+                'proveedores': [{'proveedor': self.proveedor.pk, 'clave_proveedor': f'P-{i}', 'costo': '12.50'}],
+            }
+            for i in range(50)
+        ] + [
+            {'clave': 'EXISTE-001', 'nombre': 'Repetido', 'tipo_producto': self.tipo.pk},
+            {'clave': 'ALTA-000', 'nombre': 'Duplicado', 'tipo_producto': 999999},
+            {'clave': 'ALTA-900', 'nombre': 'Sin costo', 'tipo_producto': self.tipo.pk,
+             'proveedores': [{'proveedor': self.proveedor.pk, 'clave_proveedor': 'X', 'costo': '0'}]},
+        ]
+
+    def test_sin_modo_parcial_no_crea_nada(self):
+        response = self.client.post(self.url, self.elementos(), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['indice'] for error in response.json()['errores']], [50, 51, 52])
+        self.assertFalse(Producto.objects.filter(clave__startswith='ALTA-').exists())
+
+    def test_modo_parcial_con_consultas_constantes(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url + '?parcial=true', self.elementos(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['creados'], 50)
+        self.assertEqual(len(response.json()['errores']), 3)
+        # Claves, tipos, proveedores, INSERT productos, INSERT relaciones y resumen
+        self.assertLessEqual(len(consultas.captured_queries), 10)
+
+        producto = Producto.objects.get(clave='ALTA-007')
+        self.assertEqual(producto.cantidad_proveedores, 1)
+        self.assertEqual(producto.costo_minimo, Decimal('12.50'))
+
+
+class ImportacionCatalogoTest(APITestCase):
+    """importar_catalogo y POST /api/productos/importar/"""
+
+    url = '/api/api/productos/importar/'
+    filas = [
+        ('clave', 'nombre', 'tipo_producto', 'proveedor', 'clave_proveedor', 'costo', 'activo'),
+        ('IMP-001', 'Martillo', 'Herramientas', 'Proveedor Uno', 'P1', '10.50', '1'),
+        ('IMP-002', 'Pinzas', 'Herramientas', '', '', '', ''),
+        ('IMP-003', 'Sin tipo', 'Inexistente', '', '', '', ''),
+        ('IMP-001', 'Martillo grande', 'Herramientas', 'Proveedor Uno', 'P1', '12.00', '1'),
+        ('IMP-004', 'Llave', 'Herramientas', 'Proveedor Uno', 'P4', 'abc', ''),
+        ('IMP-005', 'Desarmador', 'Herramientas', 'Otro', 'P5', '3', ''),
+        ('IMP-006', 'Nivel', 'Herramientas', 'Proveedor Uno', 'P6', '7.25', 'no'),
+    ]
+
+    def setUp(self):
+        TipoProducto.objects.create(nombre='Herramientas')
+        Proveedor.objects.create(nombre='Proveedor Uno', departamento='Ferretería')
+
+    def csv(self):
+        return ''.join(','.join(fila) + '\n' for fila in self.filas).encode()
+
+    def xlsx(self):
+        from openpyxl import Workbook
+
+        libro = Workbook()
+        for fila in self.filas:
+            libro.active.append(fila)
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        return contenido.getvalue()
+
+    def comprobar_catalogo(self):
+        self.assertEqual(
+            sorted(Producto.objects.filter(clave__startswith='IMP-').values_list('clave', 'nombre')),
+            [('IMP-001', 'Martillo grande'), ('IMP-002', 'Pinzas'), ('IMP-006', 'Nivel')],
+        )
+        martillo = Producto.objects.get(clave='IMP-001')
+        self.assertEqual(martillo.producto_proveedores.get().costo, Decimal('12.00'))
+        self.assertEqual(martillo.costo_minimo, Decimal('12.00'))
+        nivel = Producto.objects.get(clave='IMP-006')
+        self.assertFalse(nivel.producto_proveedores.get().activo)
+        self.assertEqual(nivel.cantidad_proveedores, 0)
+        self.assertEqual(ProductoProveedor.objects.filter(producto__clave__startswith='IMP-').count(), 2)
+
+    def test_comando_por_lotes_y_upsert(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ruta = os.path.join(directorio, 'catalogo.csv')
+        with open(ruta, 'wb') as archivo:
+            archivo.write(self.csv())
+
+        # Lotes [2, 3], [4, 5], [6, 7], [8]: IMP-001 se actualiza en el segundo
+        salida = io.StringIO()
+        call_command('importar_catalogo', ruta, lote=2, stdout=salida)
+        self.assertIn('Línea 4: No existe el tipo de producto "Inexistente"', salida.getvalue())
+        self.assertIn('Línea 6: El costo debe ser un número válido', salida.getvalue())
+        self.assertIn('Línea 7: No existe el proveedor "Otro"', salida.getvalue())
+        self.assertIn('Productos: 4, Relaciones: 3, Errores: 3', salida.getvalue())
+        self.comprobar_catalogo()
+
+        # En un solo lote la última fila de la clave gana; repetir no duplica nada
+        salida = io.StringIO()
+        call_command('importar_catalogo', ruta, stdout=salida)
+        self.assertIn('Productos: 3, Relaciones: 2, Errores: 3', salida.getvalue())
+        self.comprobar_catalogo()
+
+    def test_upsert_sin_unique_fields(self):
+        """Como en MySQL: sin ``unique_fields``, el conflicto lo resuelve cualquier índice único"""
+        def sin_objetivo(fields, on_conflict, update_fields, unique_fields):
+            self.assertEqual(list(unique_fields), [])
+            columnas = map(connection.ops.quote_name, update_fields)
+            return 'ON CONFLICT DO UPDATE SET ' + ', '.join(f'{columna} = EXCLUDED.{columna}' for columna in columnas)
+
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch.object(connection.ops, 'on_conflict_suffix_sql', sin_objetivo):
+            for _ in range(2):
+                ImportadorCatalogo(tamano_lote=2).importar(leer_filas(io.BytesIO(self.csv()), 'csv'))
+        self.comprobar_catalogo()
+
+    def test_comando_lote_fuera_de_rango(self):
+        for lote in (0, -1, LOTE_MAXIMO + 1):
+            with self.subTest(lote=lote), self.assertRaisesMessage(CommandError, '--lote'):
+                call_command('importar_catalogo', 'catalogo.csv', lote=lote, stdout=io.StringIO())
+
+    def test_endpoint(self):
+        for nombre, contenido in (('catalogo.csv', self.csv()), ('catalogo.xlsx', self.xlsx())):
+            with self.subTest(formato=nombre):
+                response = self.client.post(
+                    self.url, {'archivo': SimpleUploadedFile(nombre, contenido), 'lote': 2}, format='multipart'
+                )
+                self.assertEqual(response.status_code, 200)
+                resumen = response.json()
+                self.assertEqual(resumen['filas'], 7)
+                self.assertEqual((resumen['productos'], resumen['relaciones'], resumen['errores']), (4, 3, 3))
+                self.assertEqual([error['linea'] for error in resumen['detalle_errores']], [4, 6, 7])
+                self.comprobar_catalogo()
+
+        for lote in ('0', '-5', str(LOTE_MAXIMO + 1), 'abc'):
+            with self.subTest(lote=lote):
+                response = self.client.post(
+                    self.url, {'archivo': SimpleUploadedFile('catalogo.csv', self.csv()), 'lote': lote},
+                    format='multipart',
+                )
+                self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            self.url, {'archivo': SimpleUploadedFile('catalogo.txt', self.csv())}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class FiltrosProveedorTest(APITestCase):
+    """costo_min, costo_max y departamento como EXISTS sobre proveedores activos"""
+
+    url = '/api/api/productos/'
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Pruebas')
+        ferreteria = Proveedor.objects.create(nombre='Ferretería Uno', departamento='Ferretería')
+        pinturas = Proveedor.objects.create(nombre='Pinturas Dos', departamento='Pinturas')
+        otra = Proveedor.objects.create(nombre='Ferretería Tres', departamento='Ferretería')
+        # clave: [(proveedor, costo, activo)]
+        catalogo = {
+            'FIL-VARIOS': [(ferreteria, '10.00', True), (pinturas, '50.00', True), (otra, '12.00', True)],
+            'FIL-INACTIVOS': [(ferreteria, '10.00', False), (pinturas, '50.00', False)],
+            'FIL-MIXTO': [(ferreteria, '100.00', True), (pinturas, '20.00', False)],
+            'FIL-SIN': [],
+        }
+        for clave, relaciones in catalogo.items():
+            producto = Producto.objects.create(clave=clave, nombre=clave, tipo_producto=tipo)
+            for proveedor, costo, activo in relaciones:
+                ProductoProveedor.objects.create(
+                    producto=producto, proveedor=proveedor, clave_proveedor=f'{clave}-{proveedor.pk}',
+                    costo=Decimal(costo), activo=activo,
+                )
+
+    def claves(self, **filtros):
+        response = self.client.get(self.url, {'clave': 'FIL-', 'page_size': 500, **filtros})
+        return [producto['clave'] for producto in response.json()['results']]
+
+    def test_solo_proveedores_activos(self):
+        # Los costos y departamentos de relaciones inactivas no cuentan
+        self.assertEqual(self.claves(costo_max='15'), ['FIL-VARIOS'])
+        self.assertEqual(self.claves(costo_min='20', costo_max='20'), [])
+        self.assertEqual(self.claves(departamento='Pinturas'), ['FIL-VARIOS'])
+        self.assertEqual(sorted(self.claves(departamento='Ferretería')), ['FIL-MIXTO', 'FIL-VARIOS'])
+        self.assertEqual(sorted(self.claves(costo_min='0')), ['FIL-MIXTO', 'FIL-VARIOS'])
+
+    def test_varios_proveedores_sin_duplicar(self):
+        # Tres proveedores activos en el rango: el producto aparece una vez
+        self.assertEqual(self.claves(costo_min='5', costo_max='60'), ['FIL-VARIOS'])
+        self.assertEqual(
+            self.claves(costo_min='5', departamento='Ferretería', ordering='nombre'), ['FIL-MIXTO', 'FIL-VARIOS']
+        )
+        # El rango lo debe cumplir un mismo proveedor: 10 y 50 no están entre 20 y 40
+        self.assertEqual(self.claves(costo_min='20', costo_max='40'), [])
+        self.assertEqual(self.claves(costo_min='11', costo_max='13'), ['FIL-VARIOS'])
+
+        # El total cuenta productos, no relaciones
+        datos = self.client.get(self.url, {'clave': 'FIL-', 'costo_min': '0', 'total': 'exacto'}).json()
+        self.assertEqual(datos['total'], 2)
+
+    def test_valores_no_numericos_se_ignoran(self):
+        self.assertEqual(len(self.claves(costo_min='abc')), 4)
+
+
+@override_settings(PRODUCTOS_FACETAS_CACHE_TTL=0)
+class FacetasTest(APITestCase):
+    """GET /api/productos/facetas/ cuenta lo mismo que el listado con los mismos filtros"""
+
+    url = '/api/api/productos/facetas/'
+
+    def setUp(self):
+        self.herramientas = TipoProducto.objects.create(nombre='Herramientas')
+        pintura = TipoProducto.objects.create(nombre='Pintura')
+        ferreteria = Proveedor.objects.create(nombre='Ferretería Uno', departamento='Ferretería')
+        pinturas = Proveedor.objects.create(nombre='Pinturas Dos', departamento='Pinturas')
+        # clave: (nombre, tipo, activo, [(proveedor, costo, activo)])
+        catalogo = {
+            'FAC-001': ('Martillo facetado', self.herramientas, True, [(ferreteria, '50.00', True), (pinturas, '700.00', True)]),
+            'FAC-002': ('Brocha facetada', pintura, True, [(pinturas, '100.00', True)]),
+            'FAC-003': ('Rodillo', pintura, False, [(pinturas, '499.99', True)]),
+            'FAC-004': ('Pinzas facetadas', self.herramientas, True, [(ferreteria, '30.00', False)]),
+            'FAC-005': ('Nivel', self.herramientas, False, []),
+            'FAC-006': ('Taladro facetado', self.herramientas, True, [(ferreteria, '2500.00', True)]),
+        }
+        for clave, (nombre, tipo, activo, relaciones) in catalogo.items():
+            producto = Producto.objects.create(clave=clave, nombre=nombre, tipo_producto=tipo, activo=activo)
+            for proveedor, costo, relacion_activa in relaciones:
+                ProductoProveedor.objects.create(
+                    producto=producto, proveedor=proveedor, clave_proveedor=f'{clave}-{proveedor.pk}',
+                    costo=Decimal(costo), activo=relacion_activa,
+                )
+
+    def test_conteos_iguales_al_listado(self):
+        casos = [
+            {},
+            {'activo': 'true'},
+            {'tipo_producto': self.herramientas.pk},
+            {'costo_max': '600'},
+            {'departamento': 'Pinturas'},
+            {'search': 'facetado'},
+        ]
+        rangos = (Decimal('100'), Decimal('500'))
+        for filtros in casos:
+            with self.subTest(filtros=filtros):
+                parametros = {'clave': 'FAC-', **filtros}
+                listado = self.client.get('/api/api/productos/', {**parametros, 'page_size': 500}).json()['results']
+                facetas = self.client.get(self.url, {**parametros, 'rangos_costo': '100,500'}).json()
+
+                self.assertEqual(facetas['total'], len(listado))
+                self.assertEqual(
+                    {tipo['id']: tipo['total'] for tipo in facetas['tipo_producto']},
+                    dict(Counter(producto['tipo_producto'] for producto in listado)),
+                )
+                self.assertEqual(
+                    {activo['activo']: activo['total'] for activo in facetas['activo']},
+                    {True: sum(p['activo'] for p in listado), False: sum(not p['activo'] for p in listado)},
+                )
+
+                costos = [
+                    Decimal(str(producto['costo_minimo']))
+                    for producto in listado if producto['costo_minimo'] is not None
+                ]
+                esperados = [
+                    sum(costo < rangos[0] for costo in costos),
+                    sum(rangos[0] <= costo < rangos[1] for costo in costos),
+                    sum(rangos[1] <= costo for costo in costos),
+                    len(listado) - len(costos),
+                ]
+                self.assertEqual([rango['total'] for rango in facetas['costo']], esperados)
+
+                departamentos = Counter(
+                    departamento
+                    for producto in listado
+                    for departamento in set(ProductoProveedor.objects.filter(
+                        producto_id=producto['id'], activo=True
+                    ).values_list('proveedor__departamento', flat=True))
+                )
+                self.assertEqual(
+                    {depto['departamento']: depto['total'] for depto in facetas['departamento']},
+                    dict(departamentos),
+                )
+
+    def test_tres_consultas_agrupadas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url, {'clave': 'FAC-', 'activo': 'true', 'costo_min': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(consultas.captured_queries), 3)
+
+    def test_parsear_rangos(self):
+        self.assertEqual(parsear_rangos(' 500, 100,100,'), (Decimal('100'), Decimal('500')))
+        invalidos = ['', ',', 'abc', '100,abc', 'NaN', '100,Infinity', ','.join(str(n) for n in range(21))]
+        for valor in invalidos:
+            with self.subTest(valor=valor):
+                self.assertIsNone(parsear_rangos(valor))
+                response = self.client.get(self.url, {'rangos_costo': valor})
+                self.assertEqual(response.status_code, 400)
+
+    @override_settings(PRODUCTOS_FACETAS_CACHE_TTL=30)
+    def test_cache_por_parametros(self):
+        parametros = {'clave': 'FAC-', 'activo': 'true'}
+        primera = self.client.get(self.url, parametros).json()
+        with CaptureQueriesContext(connection) as consultas:
+            # Mismos parámetros en otro orden
+            segunda = self.client.get(self.url + '?activo=true&clave=FAC-').json()
+        self.assertEqual(segunda, primera)
+        self.assertEqual(len(consultas.captured_queries), 0)
+
+
+class ExportacionTest(APITestCase):
+    """GET /api/productos/export/ exporta exactamente los productos del listado con los mismos filtros"""
+
+    url = '/api/api/productos/export/'
+
+    def setUp(self):
+        herramientas = TipoProducto.objects.create(nombre='Herramientas')
+        self.pintura = TipoProducto.objects.create(nombre='Pintura')
+        ferreteria = Proveedor.objects.create(nombre='Ferretería Uno', departamento='Ferretería')
+        pinturas = Proveedor.objects.create(nombre='Pinturas Dos', departamento='Pinturas')
+        # clave: (nombre, tipo, activo, [(proveedor, costo, activo)])
+        catalogo = {
+            'EXP-001': ('Martillo exportable', herramientas, True, [(ferreteria, '10.00', True), (pinturas, '12.00', True)]),
+            'EXP-002': ('Brocha exportable', self.pintura, True, [(pinturas, '5.00', True)]),
+            'EXP-003': ('Rodillo', self.pintura, False, [(pinturas, '25.00', True)]),
+            'EXP-004': ('Pinzas', herramientas, True, [(ferreteria, '30.00', False)]),
+            'EXP-005': ('Nivel exportable', herramientas, True, []),
+            'EXP-006': ('Cinta', herramientas, False, [(ferreteria, '3.50', True)]),
+            'EXP-007': ('Lija', self.pintura, True, [(ferreteria, '1.25', True)]),
+        }
+        for clave, (nombre, tipo, activo, relaciones) in catalogo.items():
+            producto = Producto.objects.create(clave=clave, nombre=nombre, tipo_producto=tipo, activo=activo)
+            for proveedor, costo, relacion_activa in relaciones:
+                ProductoProveedor.objects.create(
+                    producto=producto, proveedor=proveedor, clave_proveedor=f'{clave}-{proveedor.pk}',
+                    costo=Decimal(costo), activo=relacion_activa,
+                )
+
+    def exportar(self, formato, parametros):
+        """Filas exportadas como diccionarios, con lotes de 2 productos"""
+        with mock.patch('productos.views.filas_catalogo', partial(exportacion.filas_catalogo, tamano_lote=2)):
+            response = self.client.get(self.url, {'formato': formato, **parametros})
+            self.assertEqual(response.status_code, 200)
+            contenido = b''.join(response.streaming_content)
+
+        if formato == 'csv':
+            return list(csv.DictReader(io.StringIO(contenido.decode())))
+        if formato == 'ndjson':
+            return [json.loads(linea) for linea in contenido.decode().splitlines()]
+        from openpyxl import load_workbook
+
+        filas = load_workbook(io.BytesIO(contenido), read_only=True).active.iter_rows(values_only=True)
+        encabezados = next(filas)
+        return [dict(zip(encabezados, fila)) for fila in filas]
+
+    def test_mismas_filas_que_el_listado(self):
+        casos = [
+            {},
+            {'activo': 'true'},
+            {'tipo_producto': self.pintura.pk},
+            {'search': 'exportable'},
+            {'costo_min': '5', 'costo_max': '20'},
+            {'departamento': 'Ferretería'},
+        ]
+        for filtros in casos:
+            parametros = {'clave': 'EXP-', **filtros}
+            listado = self.client.get('/api/api/productos/', {**parametros, 'page_size': 500}).json()['results']
+            esperadas = sorted(producto['clave'] for producto in listado)
+            for formato in exportacion.EXPORTADORES:
+                with self.subTest(filtros=filtros, formato=formato):
+                    filas = self.exportar(formato, parametros)
+                    # Una fila por relación, en orden de producto
+                    self.assertEqual(list(dict.fromkeys(fila['clave'] for fila in filas)), esperadas)
+
+    def test_columnas_y_varios_lotes(self):
+        for formato in exportacion.EXPORTADORES:
+            with self.subTest(formato=formato):
+                with CaptureQueriesContext(connection) as consultas:
+                    filas = self.exportar(formato, {'clave': 'EXP-'})
+                # 7 productos en lotes de 2
+                lotes = [c for c in consultas.captured_queries if 'LEFT OUTER JOIN "producto_proveedor"' in c['sql']]
+                self.assertEqual(len(lotes), 4)
+
+                self.assertEqual(len(filas), 8)
+                martillo = [fila for fila in filas if fila['clave'] == 'EXP-001']
+                self.assertEqual([fila['proveedor'] for fila in martillo], ['Ferretería Uno', 'Pinturas Dos'])
+                self.assertEqual(Decimal(str(martillo[0]['costo'])), Decimal('10.00'))
+                nivel = next(fila for fila in filas if fila['clave'] == 'EXP-005')
+                self.assertIn(nivel.get('proveedor'), (None, ''))
+                self.assertEqual(list(filas[0]), exportacion.ENCABEZADOS)
+
+    def test_formato_no_soportado(self):
+        self.assertEqual(self.client.get(self.url, {'formato': 'pdf'}).status_code, 400)
+
+
+class PoblarDatosSinteticosTest(APITestCase):
+    """poblar_datos --productos genera datos deterministas con el resumen correcto"""
+
+    def test_generacion_determinista_y_resumen(self):
+        call_command(
+            'poblar_datos', productos=300, proveedores=20, proveedores_por_producto='1-8',
+            seed=7, lote=64, stdout=io.StringIO()
+        )
+        self.assertEqual(Producto.objects.filter(clave__regex=r'^[A-Z]{3}-\d{7}$').count(), 300)
+        self.assertEqual(Proveedor.objects.filter(nombre__regex=r' \d{5} ').count(), 20)
+
+        # El resumen calculado al generar coincide con el de la base de datos
+        campos = ('pk', 'costo_minimo', 'cantidad_proveedores', 'proveedor_costo_minimo')
+        generado = list(Producto.objects.order_by('pk').values_list(*campos))
+        Producto.actualizar_resumen_proveedores()
+        self.assertEqual(list(Producto.objects.order_by('pk').values_list(*campos)), generado)
+
+        # El resultado no depende del tamaño del bloque
+        parametros = {
+            'semilla': 7, 'primer_id': 1, 'tipos': {'Electrónica': 1, 'Alimentos': 2, 'Ropa': 3,
+                                                     'Hogar': 4, 'Ferretería': 5},
+            'proveedores': {'Ropa': [1, 2]}, 'todos_los_proveedores': [1, 2, 3, 4],
+            'por_producto': (1, 3),
+        }
+        completo = datos_sinteticos.generar_bloque(parametros, 0, 10)
+        partes = [datos_sinteticos.generar_bloque(parametros, i, min(i + 3, 10)) for i in range(0, 10, 3)]
+        self.assertEqual(completo[0], [p for parte in partes for p in parte[0]])
+        self.assertEqual(completo[1], [r for parte in partes for r in parte[1]])
+
+
+class BenchmarkEndpointsTest(APITestCase):
+    """Reglas de falla del benchmark de endpoints"""
+
+    def test_presupuesto_y_linea_base(self):
+        comando = benchmark_endpoints.Command()
+        medicion = {'p95_ms': 10.0, 'consultas': 3, 'memoria_pico_kb': 100.0}
+        reporte = {'resultados': {'1000': {'lista': medicion}}}
+        self.assertEqual(comando.verificar(reporte, None, 0.25), [])
+
+        reporte['resultados']['1000']['lista'] = dict(medicion, consultas=4)
+        self.assertEqual(len(comando.verificar(reporte, None, 0.25)), 1)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as archivo:
+            json.dump({'resultados': {'1000': {'lista': dict(medicion, p95_ms=5.0)}}}, archivo)
+        self.addCleanup(os.remove, archivo.name)
+        reporte['resultados']['1000']['lista'] = medicion
+        fallas = comando.verificar(reporte, archivo.name, 0.25)
+        self.assertEqual(len(fallas), 1)
+        self.assertIn('p95_ms', fallas[0])
+
+
+class BenchmarkAsgiTest(APITestCase):
+    """Generador de carga HTTP/1.1 del benchmark ASGI contra un servidor local"""
+
+    async def test_keep_alive_longitud_y_fragmentado(self):
+        conexiones = []
+
+        async def atender(lector, escritor):
+            conexiones.append(escritor)
+            while (linea := await lector.readline()):
+                ruta = linea.split()[1]
+                while await lector.readline() not in (b'\r\n', b''):
+                    pass
+                if ruta == b'/fragmentado/':
+                    escritor.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                                   b'2\r\n[]\r\n0\r\n\r\n')
+                else:
+                    escritor.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 2\r\n\r\n{}')
+                await escritor.drain()
+            escritor.close()
+
+        servidor = await asyncio.start_server(atender, '127.0.0.1', 0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        async with servidor:
+            rutas = [('fragmentado', '/fragmentado/'), ('largo', '/largo/')]
+            mediciones = await benchmark_asgi.medir_carga(puerto, rutas, 3, 0.2)
+
+        # Una conexión por cliente, reutilizada en todas sus peticiones
+        self.assertEqual(len(conexiones), 3)
+        resumen = benchmark_asgi.resumir(mediciones, 0.2)
+        self.assertGreater(resumen['peticiones'], 6)
+        self.assertEqual(resumen['errores'], sum(1 for nombre, _, _ in mediciones if nombre == 'largo'))
+        self.assertEqual(set(resumen['escenarios']), {'fragmentado', 'largo'})
+
+
+class InstrumentacionTest(APITestCase):
+    """Middleware de instrumentación (Server-Timing, log por vista y SQL repetido)"""
+
+    @override_settings(INSTRUMENTACION_PETICIONES=True, INSTRUMENTACION_UMBRAL_REPETIDAS=3)
+    def test_server_timing_y_log(self):
+        tipo = TipoProducto.objects.create(nombre='Herramientas')
+        producto = Producto.objects.create(clave='HER-001', nombre='Martillo', tipo_producto=tipo)
+        for i in range(4):
+            proveedor = Proveedor.objects.create(nombre=f'Proveedor {i}', departamento='Ferretería')
+            ProductoProveedor.objects.create(
+                producto=producto, proveedor=proveedor, clave_proveedor=f'C{i}', costo=Decimal('10.00')
+            )
+
+        with self.assertLogs('distribuidora.instrumentacion', level='INFO') as logs:
+            response = self.client.get(f'/api/api/productos/{producto.pk}/proveedores/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ consultas", serializer;dur=')
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['vista'], 'ProductoViewSet.proveedores')
+        self.assertNotIn('repetidas', registro)
+
+        # La misma sentencia repetida por fila (N+1)
+        def vista(request):
+            for relacion in ProductoProveedor.objects.filter(producto=producto):
+                relacion.proveedor.nombre
+            return HttpResponse('ok')
+
+        middleware = InstrumentacionMiddleware(vista)
+        with self.assertLogs('distribuidora.instrumentacion', level='WARNING') as logs:
+            middleware(RequestFactory().get('/n+1/'))
+        registro = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(registro['repetidas'][0]['veces'], 4)
+        self.assertIn('"proveedor"', registro['repetidas'][0]['sql'])
+
+
+class PerfiladoTest(APITestCase):
+    """?_profile=1 para staff: archivos .prof y .folded y comando perfiles"""
+
+    url = '/api/api/productos/'
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(PERFILADO_DIRECTORIO=self.directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_solo_staff_y_con_marca(self):
+        self.client.force_login(User.objects.create_user('vendedor', password='x'))
+        response = self.client.get(self.url, {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Perfil-Pstats', response)
+
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        self.assertNotIn('X-Perfil-Pstats', self.client.get(self.url))
+        self.assertEqual(os.listdir(self.directorio.name), [])
+
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(os.path.isfile(response['X-Perfil-Pstats']))
+        with open(response['X-Perfil-Folded'], encoding='utf-8') as archivo:
+            lineas = archivo.read().splitlines()
+        self.assertTrue(lineas)
+        self.assertTrue(all(re.fullmatch(r'\S.* \d+', linea) for linea in lineas))
+        self.assertTrue(any('views.py' in linea and 'list' in linea for linea in lineas))
+
+        salida = io.StringIO()
+        call_command('perfiles', stdout=salida)
+        self.assertIn(os.path.basename(response['X-Perfil-Pstats']), salida.getvalue())
+
+        salida = io.StringIO()
+        call_command('perfiles', 'ultimo', '--top', '5', stdout=salida)
+        self.assertIn('function calls', salida.getvalue())
+        self.assertIn(response['X-Perfil-Folded'], salida.getvalue())
+
+    async def test_modo_asincrono_no_perfila(self):
+        staff = await User.objects.acreate(username='admin', is_staff=True)
+
+        async def get_response(request):
+            return HttpResponse('ok')
+
+        request = AsyncRequestFactory().get(self.url, {'_profile': '1'})
+        request.auser = sync_to_async(lambda: staff)
+        response = await perfilado.PerfiladoMiddleware(get_response)(request)
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(response[perfilado.ENCABEZADO_OMITIDO], 'asincrono')
+        self.assertNotIn('X-Perfil-Pstats', response)
+        self.assertEqual(os.listdir(self.directorio.name), [])
+
+    def test_pilas_colapsadas_suman_el_tiempo_total(self):
+        def hoja():
+            return sum(range(20000))
+
+        def raiz():
+            return hoja() + hoja()
+
+        perfil = perfilado.cProfile.Profile()
+        perfil.enable()
+        raiz()
+        perfil.disable()
+        estadisticas = perfilado.pstats.Stats(perfil)
+
+        pilas = perfilado.pilas_colapsadas(estadisticas)
+        self.assertTrue(any(pila.endswith(':raiz;tests.py:{}:hoja'.format(hoja.__code__.co_firstlineno))
+                            for pila in pilas))
+        # El reparto por llamador conserva el tiempo total (salvo redondeo a µs)
+        self.assertAlmostEqual(sum(pilas.values()), estadisticas.total_tt * 1e6, delta=len(pilas) + 5)
+
+
+class MetricasTest(APITestCase):
+    """/metrics: histogramas por vista y acción, errores, caches y suma entre procesos"""
+
+    def test_exposicion(self):
+        tipo = TipoProducto.objects.create(nombre='Herramientas')
+        producto = Producto.objects.create(clave='HER-001', nombre='Martillo', tipo_producto=tipo)
+        self.client.get(f'/api/api/productos/{producto.pk}/proveedores/')
+        self.client.get('/api/api/productos/999999/')
+        with override_settings(PRODUCTOS_FACETAS_CACHE_TTL=30):
+            self.client.get('/api/api/productos/facetas/', {'activo': 'true'})
+            self.client.get('/api/api/productos/facetas/', {'activo': 'true'})
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metricas.TIPO_CONTENIDO)
+        texto = response.content.decode()
+        self.assertIn('# TYPE distribuidora_http_request_duration_seconds histogram', texto)
+        self.assertRegex(
+            texto,
+            r'distribuidora_http_request_duration_seconds_bucket'
+            r'\{action="proveedores",viewset="ProductoViewSet",le="\+Inf"\} [1-9]'
+        )
+        self.assertRegex(
+            texto, r'distribuidora_http_request_db_queries_count\{action="proveedores",viewset="ProductoViewSet"\} [1-9]'
+        )
+        self.assertRegex(
+            texto,
+            r'distribuidora_http_errors_total\{action="retrieve",status="404",viewset="ProductoViewSet"\} [1-9]'
+        )
+        self.assertRegex(texto, r'distribuidora_cache_hit_ratio\{cache="facetas"\} (0|1|0\.\d+)\n')
+
+        # Buckets acumulados y no decrecientes
+        cuentas = [
+            int(valor) for valor in re.findall(
+                r'distribuidora_http_response_size_bytes_bucket'
+                r'\{action="proveedores",viewset="ProductoViewSet",le="[^"]+"\} (\d+)', texto
+            )
+        ]
+        self.assertEqual(len(cuentas), len(metricas.BUCKETS_TAMANO) + 1)
+        self.assertEqual(cuentas, sorted(cuentas))
+
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.8').status_code, 403)
+
+    def test_suma_archivos_de_todos_los_procesos(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(METRICAS_DIRECTORIO=directorio):
+            etiquetas = [['action', 'list'], ['viewset', 'OtroViewSet']]
+            with open(os.path.join(directorio, 'metricas_1.json'), 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'histogramas': [['distribuidora_http_request_db_queries', etiquetas, [0, 0, 0, 2] + [0] * 8 + [6]]],
+                    'contadores': [['distribuidora_cache_hits_total', [['cache', 'otro']], 3]],
+                }, archivo)
+            with open(os.path.join(directorio, 'metricas_2.json'), 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'histogramas': [['distribuidora_http_request_db_queries', etiquetas, [0, 0, 0, 1] + [0] * 8 + [3]]],
+                    'contadores': [['distribuidora_cache_misses_total', [['cache', 'otro']], 1]],
+                }, archivo)
+
+            texto = self.client.get('/metrics').content.decode()
+            self.assertTrue(os.path.exists(os.path.join(directorio, f'metricas_{os.getpid()}.json')))
+
+        self.assertIn(
+            'distribuidora_http_request_db_queries_bucket{action="list",viewset="OtroViewSet",le="2"} 0\n', texto
+        )
+        self.assertIn(
+            'distribuidora_http_request_db_queries_bucket{action="list",viewset="OtroViewSet",le="3"} 3\n', texto
+        )
+        self.assertIn('distribuidora_http_request_db_queries_sum{action="list",viewset="OtroViewSet"} 9\n', texto)
+        self.assertIn('distribuidora_cache_hit_ratio{cache="otro"} 0.75\n', texto)
+
+    def test_medidores_solo_de_procesos_vivos(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(METRICAS_DIRECTORIO=directorio):
+            etiquetas = [['database', 'otra'], ['state', 'idle']]
+            for pid in (os.getpid() + 1, 99999999):
+                with open(os.path.join(directorio, f'metricas_{pid}.json'), 'w', encoding='utf-8') as archivo:
+                    json.dump({'medidores': [['distribuidora_db_pool_connections', etiquetas, 3]]}, archivo)
+            with mock.patch.object(metricas, 'proceso_vivo', side_effect=lambda pid: pid != 99999999):
+                texto = self.client.get('/metrics').content.decode()
+
+        self.assertIn('# TYPE distribuidora_db_pool_connections gauge\n', texto)
+        self.assertIn('distribuidora_db_pool_connections{database="otra",state="idle"} 3\n', texto)
+
+
+@override_settings(PRODUCTOS_RESPUESTAS_CACHE_TTL=0)
+class CamposDispersosTest(APITestCase):
+    """?fields= / ?exclude= recortan el serializer y la consulta"""
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Herramientas')
+        proveedor = Proveedor.objects.create(nombre='Ferremax', departamento='Ferretería')
+        self.producto = Producto.objects.create(clave='HER-001', nombre='Martillo', tipo_producto=tipo)
+        ProductoProveedor.objects.create(
+            producto=self.producto, proveedor=proveedor, clave_proveedor='F-1', costo=Decimal('80.00')
+        )
+
+    def test_listado_solo_columnas_pedidas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/api/api/productos/', {'fields': 'id,clave,nombre,costo_minimo'})
+        self.assertEqual(response.status_code, 200)
+        fila = next(fila for fila in response.data['results'] if fila['clave'] == 'HER-001')
+        self.assertEqual(list(fila), ['id', 'clave', 'nombre', 'costo_minimo'])
+        self.assertEqual(fila['costo_minimo'], Decimal('80.00'))
+        listado = [c['sql'] for c in consultas.captured_queries if 'FROM "producto" ORDER BY' in c['sql']]
+        self.assertEqual(len(listado), 1)
+        self.assertNotIn('JOIN', listado[0])
+        self.assertNotIn('"producto"."tipo_producto_id"', listado[0])
+
+        response = self.client.get('/api/api/productos-proveedores/', {'exclude': 'proveedor_nombre,activo'})
+        self.assertEqual(list(response.data[0]), ['id', 'proveedor', 'clave_proveedor', 'costo'])
+
+    def test_detalle_sin_relaciones_no_pedidas(self):
+        url = f'/api/api/productos/{self.producto.pk}/'
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, {'exclude': 'proveedores_detalle,tipo_producto_nombre'})
+        self.assertNotIn('proveedores_detalle', response.data)
+        self.assertEqual(response.data['clave'], 'HER-001')
+        sql = ' '.join(c['sql'] for c in consultas.captured_queries)
+        self.assertNotIn('"producto_proveedor"', sql)
+        self.assertNotIn('JOIN "tipo_producto"', sql)
+
+        response = self.client.get(url, {'fields': 'clave,proveedores_detalle'})
+        self.assertEqual(list(response.data), ['clave', 'proveedores_detalle'])
+        self.assertEqual(response.data['proveedores_detalle'][0]['proveedor_nombre'], 'Ferremax')
+
+    def test_campos_desconocidos(self):
+        response = self.client.get('/api/api/proveedores/', {'fields': 'nombre,precio'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('precio', response.data['error'])
+
+
+@override_settings(PRODUCTOS_RESPUESTAS_CACHE_TTL=0)
+class ListadoRapidoTest(APITestCase):
+    """El listado desde values() produce los mismos bytes que el serializer"""
+
+    def setUp(self):
+        tipo = TipoProducto.objects.create(nombre='Electrónica "Pro"')
+        proveedores = [
+            Proveedor.objects.create(nombre=f'Proveedor Ñandú {i}', departamento='Electrónicos') for i in range(2)
+        ]
+        for i in range(3):
+            producto = Producto.objects.create(clave=f'ELE-{i}', nombre=f'Cámara {i} ', tipo_producto=tipo)
+            for j, proveedor in enumerate(proveedores[:i]):
+                ProductoProveedor.objects.create(
+                    producto=producto, proveedor=proveedor, clave_proveedor=f'P{i}{j}',
+                    costo=Decimal('1234.5') + j, activo=j == 0,
+                )
+
+    def comparar(self, url, parametros=None):
+        with mock.patch.object(ProductoListSerializer, 'to_representation', side_effect=AssertionError), \
+                mock.patch.object(ProductoProveedorSerializer, 'to_representation', side_effect=AssertionError):
+            rapida = self.client.get(url, parametros)
+        with override_settings(PRODUCTOS_LISTADO_RAPIDO=False):
+            normal = self.client.get(url, parametros)
+        self.assertEqual(rapida.status_code, 200)
+        self.assertEqual(rapida.content, normal.content)
+        self.assertEqual(rapida['ETag'], normal['ETag'])
+        return json.loads(rapida.content)
+
+    def test_productos(self):
+        datos = self.comparar('/api/api/productos/')
+        self.assertIn(1234.5, [fila['costo_minimo'] for fila in datos['results']])
+        self.assertIn(None, [fila['costo_minimo'] for fila in datos['results']])
+        self.comparar('/api/api/productos/', {'page_size': 1, 'ordering': '-nombre', 'total': 'exacto'})
+        self.comparar('/api/api/productos/', {'search': 'Cámara'})
+        self.comparar('/api/api/productos/', {'fields': 'clave,tipo_producto_nombre,costo_minimo'})
+
+    def test_productos_proveedores(self):
+        datos = self.comparar('/api/api/productos-proveedores/')
+        self.assertIn('1235.50', [fila['costo'] for fila in datos])
+        self.comparar('/api/api/productos-proveedores/', {'exclude': 'proveedor_nombre', 'ordering': '-costo'})
+
+
+@override_settings(PRODUCTOS_RESPUESTAS_CACHE_TTL=0)
+class RenderersTest(APITestCase):
+    """MessagePack y formato columnar"""
+
+    def test_mensajepack(self):
+        self.assertEqual(mensajepack.empaquetar({'a': 1}), b'\x81\xa1a\x01')
+        self.assertEqual(
+            mensajepack.empaquetar([None, True, -1, -33, 200, 70000, 'é', Decimal('1.5')]),
+            b'\x98\xc0\xc3\xff\xd0\xdf\xcc\xc8\xce\x00\x01\x11\x70\xa2\xc3\xa9\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00'
+        )
+        valores = [
+            0, 127, 128, -32, -129, 2 ** 32, -2 ** 63, 2 ** 64 - 1, 1.25, 'x' * 40, 'y' * 300, b'\x00\x01',
+            {str(i): i for i in range(20)}, list(range(20)), {'anidado': [{'a': None}]},
+        ]
+        self.assertEqual(mensajepack.desempaquetar(mensajepack.empaquetar(valores)), valores)
+
+    def crear_catalogo(self):
+        tipo = TipoProducto.objects.create(nombre='Ferretería')
+        proveedores = [Proveedor.objects.create(nombre=nombre) for nombre in ('Truper', 'Urrea')]
+        for i in range(4):
+            producto = Producto.objects.create(clave=f'FER-{i}', nombre=f'Pinzas {i}', tipo_producto=tipo)
+            for j, proveedor in enumerate(proveedores):
+                ProductoProveedor.objects.create(
+                    producto=producto, proveedor=proveedor, clave_proveedor=f'{j}-{i}', costo=Decimal('10.25') + i
+                )
+
+    def test_msgpack_igual_al_json(self):
+        self.crear_catalogo()
+        for url in ('/api/api/productos/', '/api/api/productos-proveedores/', '/api/api/tipos-producto/'):
+            response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            self.assertEqual(mensajepack.desempaquetar(response.content), json.loads(self.client.get(url).content))
+
+    def test_columnar(self):
+        self.crear_catalogo()
+        response = self.client.get('/api/api/productos-proveedores/', {'format': 'columnar', 'proveedor': Proveedor.objects.get(nombre='Urrea').pk})
+        self.assertEqual(response['Content-Type'], 'application/vnd.distribuidora.columnar+msgpack')
+        datos = mensajepack.desempaquetar(response.content)
+        self.assertEqual(datos['filas'], 4)
+        self.assertEqual(datos['columnas'], ['id', 'proveedor', 'proveedor_nombre', 'clave_proveedor', 'costo', 'activo'])
+
+        columnas = datos['datos']
+        costo = columnas['costo']
+        self.assertEqual(costo['escala'], 100)
+        self.assertEqual(
+            numpy.frombuffer(costo['valores'], dtype=costo['tipo']).tolist(), [1025, 1125, 1225, 1325]
+        )
+        nombres = columnas['proveedor_nombre']
+        self.assertEqual(nombres['diccionario'], ['Urrea'])
+        self.assertEqual(
+            numpy.frombuffer(nombres['indices']['valores'], dtype=nombres['indices']['tipo']).tolist(), [0] * 4
+        )
+        self.assertEqual(numpy.frombuffer(columnas['activo']['valores'], dtype=columnas['activo']['tipo']).all(), True)
+        self.assertEqual(columnas['clave_proveedor'], {'tipo': 'texto', 'valores': ['1-0', '1-1', '1-2', '1-3']})
+
+        # Listado paginado: columnas más los enlaces; costo_minimo nulo marcado en "nulos"
+        tipo = TipoProducto.objects.get(nombre='Ferretería')
+        Producto.objects.create(clave='FER-9', nombre='Sin proveedor', tipo_producto=tipo)
+        datos = mensajepack.desempaquetar(
+            self.client.get('/api/api/productos/', {'format': 'columnar', 'tipo_producto': tipo.pk}).content
+        )
+        self.assertIn('next', datos)
+        costo_minimo = datos['datos']['costo_minimo']
+        self.assertEqual(sum(costo_minimo['nulos']), 1)
+        self.assertEqual(datos['datos']['tipo_producto_nombre']['diccionario'], ['Ferretería'])
+
+        # Errores y detalle se envían sin transformar
+        response = self.client.get('/api/api/productos/', {'format': 'columnar', 'fields': 'precio'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('precio', mensajepack.desempaquetar(response.content)['error'])
+
+
+@override_settings(PRODUCTOS_RESPUESTAS_CACHE_TTL=0)
+class LecturaAsyncTest(APITestCase):
+    """Las vistas asíncronas responden lo mismo que las síncronas"""
+
+    def setUp(self):
+        self.tipo = TipoProducto.objects.create(nombre='Jardinería')
+        proveedores = [
+            Proveedor.objects.create(nombre=nombre, departamento='Jardín') for nombre in ('Gardena', 'Truper')
+        ]
+        for i in range(60):
+            producto = Producto.objects.create(clave=f'JAR-{i:03d}', nombre=f'Manguera {i}', tipo_producto=self.tipo)
+            for j, proveedor in enumerate(proveedores[:1 + i % 2]):
+                ProductoProveedor.objects.create(
+                    producto=producto, proveedor=proveedor, clave_proveedor=f'G{j}-{i}',
+                    costo=Decimal('20.50') + i, activo=not (i % 7 == 0 and j == 1)
+                )
+        self.producto = Producto.objects.get(clave='JAR-001')
+        self.fabrica = AsyncRequestFactory()
+
+    async def comparar(self, vista, url, **kwargs):
+        sincrona = await sync_to_async(self.client.get)(url)
+        asincrona = await vista(self.fabrica.get(url), **kwargs)
+        self.assertEqual(asincrona.status_code, sincrona.status_code)
+        self.assertEqual(asincrona.content, sincrona.content)
+        self.assertEqual(asincrona.get('ETag'), sincrona.get('ETag'))
+        return asincrona
+
+    async def test_listado_y_detalle(self):
+        listado = ProductoViewSet.as_vista_async({'get': 'list', 'post': 'create'})
+        respuesta = await self.comparar(listado, '/api/api/productos/?total=exacto')
+        datos = json.loads(respuesta.content)
+        self.assertEqual(datos['total'], await Producto.objects.acount())
+        await self.comparar(listado, datos['next'].replace('http://testserver', ''))
+        await self.comparar(listado, f'/api/api/productos/?tipo_producto={self.tipo.pk}&fields=id,clave,costo_minimo')
+        await self.comparar(listado, '/api/api/productos/?search=manguera&page_size=5')
+        await self.comparar(listado, '/api/api/productos/?fields=precio')
+
+        detalle = ProductoViewSet.as_vista_async({'get': 'retrieve', 'put': 'update'})
+        respuesta = await self.comparar(detalle, f'/api/api/productos/{self.producto.pk}/', pk=self.producto.pk)
+        self.assertEqual(len(json.loads(respuesta.content)['proveedores_detalle']), 2)
+        await self.comparar(detalle, '/api/api/productos/999999/', pk=999999)
+
+        # 304 con el ETag de la respuesta síncrona
+        peticion = self.fabrica.get(
+            f'/api/api/productos/{self.producto.pk}/', headers={'If-None-Match': respuesta['ETag']}
+        )
+        self.assertEqual((await detalle(peticion, pk=self.producto.pk)).status_code, 304)
+
+    async def test_proveedores_y_referencia(self):
+        proveedores = ProductoViewSet.as_vista_async({'get': 'proveedores'})
+        for producto in (self.producto, await Producto.objects.aget(clave='JAR-007')):
+            await self.comparar(proveedores, f'/api/api/productos/{producto.pk}/proveedores/', pk=producto.pk)
+        await self.comparar(proveedores, '/api/api/productos/999999/proveedores/', pk=999999)
+
+        departamentos = ProveedorViewSet.as_vista_async({'get': 'departamentos'})
+        respuesta = await self.comparar(departamentos, '/api/api/proveedores/departamentos/')
+        self.assertIn('Jardín', json.loads(respuesta.content)['departamentos'])
+        await self.comparar(TipoProductoViewSet.as_vista_async({'get': 'list'}), '/api/api/tipos-producto/')
+        await self.comparar(ProveedorViewSet.as_vista_async({'get': 'list'}), '/api/api/proveedores/?search=gar')
+
+    @override_settings(PRODUCTOS_ASYNC_PARALELO=False)
+    async def test_sin_paralelo(self):
+        listado = ProductoViewSet.as_vista_async({'get': 'list'})
+        await self.comparar(listado, '/api/api/productos/?total=exacto&ordering=-nombre')
+
+    async def test_escrituras_por_la_vista_sincrona(self):
+        listado = TipoProductoViewSet.as_vista_async({'get': 'list', 'post': 'create'})
+        peticion = self.fabrica.post('/api/api/tipos-producto/', {'nombre': 'Riego'}, content_type='application/json')
+        respuesta = await listado(peticion)
+        respuesta.render()
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertTrue(await TipoProducto.objects.filter(nombre='Riego').aexists())
+
+        # El navegador de la API también se atiende de forma síncrona
+        respuesta = await listado(self.fabrica.get('/api/api/tipos-producto/?format=api'))
+        respuesta.render()
+        self.assertIn(b'<html', respuesta.content)
+
+    @override_settings(INSTRUMENTACION_PETICIONES=True, METRICAS_ACTIVAS=True)
+    async def test_middlewares_en_modo_asincrono(self):
+        with self.assertLogs('distribuidora.instrumentacion', level='INFO') as logs:
+            respuesta = await self.async_client.get('/api/api/tipos-producto/?search=jard')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertRegex(respuesta['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ consultas"')
+        self.assertIn('TipoProductoViewSet.list', logs.output[0])
+
+    def test_respuesta_renderizada_conserva_cookies(self):
+        response = Response({'ok': True})
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = 'application/json'
+        response.renderer_context = {}
+        response.set_cookie('replicas_primaria', '1', max_age=5)
+        final = asincrono.respuesta_renderizada(response)
+        self.assertEqual(final.content, b'{"ok":true}')
+        self.assertEqual(final.cookies['replicas_primaria'].value, '1')
+        self.assertEqual(final.cookies['replicas_primaria']['max-age'], 5)
+
+
+@override_settings(REPLICAS_LECTURA=['replica'], REPLICAS_PEGAJOSIDAD=30)
+class ReplicasTest(APITestCase):
+    """Réplicas de lectura con un segundo archivo SQLite como réplica"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.mkdtemp()
+        configuracion = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.directorio, 'replica.sqlite3')}
+        connections.settings['replica'] = connections.configure_settings(
+            {DEFAULT_DB_ALIAS: {}, 'replica': configuracion}
+        )['replica']
+        call_command('migrate', database='replica', verbosity=0)
+        # Fuera del atributo de clase: el runner solo prepara y revisa las
+        # bases de DATABASES
+        cls.databases = {DEFAULT_DB_ALIAS, 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directorio)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.solo_replica = TipoProducto.objects.using('replica').create(pk=900001, nombre='Solo en réplica')
+        cls.url = f'/api/api/tipos-producto/{cls.solo_replica.pk}/'
+        # Mismo producto en las dos bases; la réplica no recibe los cambios
+        for alias in (DEFAULT_DB_ALIAS, 'replica'):
+            tipo = TipoProducto.objects.using(alias).create(pk=900002, nombre='Replicado')
+            Producto.objects.using(alias).create(pk=900002, clave='REP-001', nombre='Original', tipo_producto=tipo)
+
+    def test_get_lee_de_la_replica(self):
+        self.assertEqual(self.client.get(self.url).json()['nombre'], 'Solo en réplica')
+        # Fuera de una petición se lee de la primaria
+        self.assertFalse(TipoProducto.objects.filter(pk=self.solo_replica.pk).exists())
+
+    def test_escritura_fija_la_primaria_al_cliente(self):
+        response = self.client.post('/api/api/tipos-producto/', {'nombre': 'Escrito en primaria'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(TipoProducto.objects.filter(nombre='Escrito en primaria').exists())
+        self.assertFalse(TipoProducto.objects.using('replica').filter(nombre='Escrito en primaria').exists())
+        self.assertIn(replicas.COOKIE_PRIMARIA, response.cookies)
+
+        # Dentro de la ventana el cliente lee su escritura de la primaria
+        self.assertEqual(self.client.get(f'/api/api/tipos-producto/{response.json()["id"]}/').status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        with mock.patch('distribuidora.replicas.time.time', return_value=time.time() + 31):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        # Otro cliente sigue en la réplica
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_lectura_despues_de_escritura_en_la_peticion(self):
+        router = replicas.ReplicasRouter()
+        token = replicas._peticion.set(replicas.EstadoPeticion('replica'))
+        self.addCleanup(replicas._peticion.reset, token)
+        self.assertEqual(router.db_for_read(Producto), 'replica')
+        self.assertIsNone(router.db_for_read(User))
+        self.assertEqual(router.db_for_write(Producto), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(Producto), DEFAULT_DB_ALIAS)
+
+    def test_seleccion_de_replica(self):
+        with override_settings(REPLICAS_LECTURA=['r1', 'r2']):
+            primera, segunda = replicas.elegir_replica(), replicas.elegir_replica()
+            self.assertEqual({primera, segunda}, {'r1', 'r2'})
+
+            with override_settings(REPLICAS_SELECCION='menor_latencia'), \
+                    mock.patch.dict(replicas._latencias, {'r1': 0.05, 'r2': 0.01}, clear=True):
+                elegidas = [replicas.elegir_replica() for _ in range(replicas.MUESTREO_LATENCIA * 2)]
+                # La más rápida salvo las peticiones de muestreo
+                self.assertGreaterEqual(elegidas.count('r2'), len(elegidas) - 2)
+
+        with mock.patch.dict(replicas._latencias, clear=True):
+            with connections['replica'].execute_wrapper(replicas.medir_latencia):
+                TipoProducto.objects.using('replica').count()
+            self.assertGreater(replicas._latencias['replica'], 0)
+
+    @override_settings(PRODUCTOS_RESPUESTAS_CACHE_TTL=60)
+    def test_cache_de_respuestas_respeta_la_lectura_despues_de_escritura(self):
+        url = '/api/api/productos/900002/'
+        response = self.client.patch(url, {'nombre': 'Cambiado'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(replicas.COOKIE_PRIMARIA, self.client.cookies)
+
+        # Otro cliente lee la réplica atrasada con la versión ya incrementada
+        otro = self.client_class()
+        self.assertEqual(otro.get(url).json()['nombre'], 'Original')
+        self.assertEqual(otro.get(url)['X-Cache'], 'HIT')
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['nombre'], 'Cambiado')
+
+    def test_cache_de_referencia_no_guarda_lo_leido_de_la_replica(self):
+        referencia._conjuntos.clear()
+        self.assertIn('Solo en réplica', [tipo['nombre'] for tipo in self.client.get('/api/api/tipos-producto/').json()])
+        self.assertNotIn('tipos_producto', referencia._conjuntos)
+
+        # Un cliente pegado a la primaria no recibe lo leído de la réplica
+        self.client.post('/api/api/tipos-producto/', {'nombre': 'Escrito en primaria'}, format='json')
+        nombres = [tipo['nombre'] for tipo in self.client.get('/api/api/tipos-producto/').json()]
+        self.assertIn('Escrito en primaria', nombres)
+        self.assertNotIn('Solo en réplica', nombres)
+        self.assertIn('tipos_producto', referencia._conjuntos)
+
+    async def test_vista_asincrona_lee_de_la_replica(self):
+        vista = TipoProductoViewSet.as_vista_async({'get': 'retrieve'})
+
+        async def get_response(request):
+            return await vista(request, pk=str(self.solo_replica.pk))
+
+        response = await replicas.ReplicasMiddleware(get_response)(AsyncRequestFactory().get(self.url))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['nombre'], 'Solo en réplica')
+
+
+class ConexionPrueba:
+    """Conexión del driver de prueba: solo ping() y close()"""
+
+    def __init__(self):
+        self.rota = False
+        self.cerrada = False
+
+    def ping(self):
+        if self.rota or self.cerrada:
+            raise OSError('Conexión perdida')
+
+    def close(self):
+        self.cerrada = True
+
+
+class PoolConexionesTest(APITestCase):
+    """Pool del backend distribuidora.mysql_pool con un driver de prueba"""
+
+    def crear_pool(self, nombre, **kwargs):
+        abiertas = []
+
+        def conectar():
+            abiertas.append(ConexionPrueba())
+            return abiertas[-1]
+
+        kwargs.setdefault('espera_maxima', 0.05)
+        pool = PoolConexiones(conectar, nombre=nombre, verificar=lambda conexion: conexion.ping(), **kwargs)
+        self.addCleanup(pool.cerrar)
+        return pool, abiertas
+
+    def test_reutiliza_y_respeta_el_maximo(self):
+        pool, abiertas = self.crear_pool('prueba_maximo', maximo=2)
+        primera, _ = pool.obtener(), pool.obtener()
+        with self.assertRaises(PoolAgotado):
+            pool.obtener()
+        pool.devolver(primera)
+        self.assertIs(pool.obtener(), primera)
+        self.assertEqual(len(abiertas), 2)
+        self.assertEqual(pool.estado(), {'libres': 0, 'en_uso': 2, 'esperando': 0, 'maximo': 2})
+
+        texto = metricas.exposicion(metricas.recolectar())
+        self.assertRegex(texto, r'distribuidora_db_pool_timeouts_total\{database="prueba_maximo"\} [1-9]')
+        self.assertIn('distribuidora_db_pool_connections{database="prueba_maximo",state="in_use"} 2\n', texto)
+
+    def test_espera_a_que_se_devuelva(self):
+        pool, abiertas = self.crear_pool('prueba_espera', maximo=1, espera_maxima=5)
+        ocupada = pool.obtener()
+        hilo = threading.Timer(0.05, pool.devolver, args=[ocupada])
+        hilo.start()
+        self.addCleanup(hilo.join)
+        self.assertIs(pool.obtener(), ocupada)
+        self.assertEqual(len(abiertas), 1)
+
+        texto = metricas.exposicion(metricas.recolectar())
+        conteo = re.search(r'distribuidora_db_pool_wait_seconds_count\{database="prueba_espera"\} (\d+)', texto)
+        self.assertEqual(int(conteo.group(1)), 2)
+        self.assertIn('distribuidora_db_pool_wait_seconds_bucket{database="prueba_espera",le="0.01"} 1\n', texto)
+
+    def test_verificacion_y_vida_maxima(self):
+        pool, abiertas = self.crear_pool('prueba_vida', maximo=2, vida_maxima=60)
+        conexion = pool.obtener()
+        pool.devolver(conexion)
+        conexion.rota = True
+        # La conexión rota se descarta al entregarla
+        nueva = pool.obtener()
+        self.assertIsNot(nueva, conexion)
+        self.assertTrue(conexion.cerrada)
+
+        with mock.patch('distribuidora.mysql_pool.pool.time.monotonic', return_value=time.monotonic() + 61):
+            pool.devolver(nueva)
+        self.assertTrue(nueva.cerrada)
+        self.assertEqual(pool.estado()['libres'], 0)
+        self.assertEqual(len(abiertas), 2)
+
+    def test_minimo_y_fallo_al_conectar(self):
+        pool, abiertas = self.crear_pool('prueba_minimo', minimo=2, maximo=3)
+        pool.llenar()
+        self.assertEqual(pool.estado()['libres'], 2)
+        # Una descartada se repone para mantener el mínimo
+        pool.devolver(pool.obtener(), descartar=True)
+        self.assertEqual(pool.estado(), {'libres': 2, 'en_uso': 0, 'esperando': 0, 'maximo': 3})
+        self.assertEqual(len(abiertas), 3)
+
+        fallido = PoolConexiones(mock.Mock(side_effect=OSError('Sin servidor')), nombre='prueba_fallo', maximo=1)
+        with self.assertRaises(OSError):
+            fallido.obtener()
+        # El lugar reservado se libera
+        fallido.conectar = ConexionPrueba
+        self.assertIsInstance(fallido.obtener(), ConexionPrueba)
+
+
+class MySQLdbPrueba(types.ModuleType):
+    """Módulo MySQLdb mínimo para importar django.db.backends.mysql sin el driver"""
+
+    version_info = (2, 2, 0)
+    __version__ = '2.2.0'
+
+    class Error(Exception):
+        pass
+
+    class DatabaseError(Error):
+        pass
+
+    InterfaceError = DataError = OperationalError = IntegrityError = InternalError = \
+        ProgrammingError = NotSupportedError = DatabaseError
+
+    def __init__(self):
+        super().__init__('MySQLdb')
+        self.__path__ = []
+        self.abiertas = []
+        self.connect = mock.Mock(side_effect=self.conectar)
+
+    def conectar(self, **parametros):
+        conexion = mock.Mock(encoders={}, parametros=parametros)
+        conexion.cursor.return_value.fetchone.return_value = ('8.0.36', '', 'InnoDB', 0, 0, 1)
+        self.abiertas.append(conexion)
+        return conexion
+
+    def modulos(self):
+        constantes = types.ModuleType('MySQLdb.constants')
+        constantes.CLIENT = types.SimpleNamespace(FOUND_ROWS=2)
+        # Cualquier tipo de columna que pidan los módulos del backend
+        constantes.FIELD_TYPE = mock.Mock()
+        convertidores = types.ModuleType('MySQLdb.converters')
+        convertidores.conversions = {}
+        return {'MySQLdb': self, 'MySQLdb.constants': constantes, 'MySQLdb.converters': convertidores}
+
+
+class BackendMySQLPoolTest(SimpleTestCase):
+    """Backend distribuidora.mysql_pool detrás de ``connections`` con un MySQLdb de prueba"""
+
+    @classmethod
+    def setUpClass(cls):
+        configuracion = {
+            'ENGINE': 'distribuidora.mysql_pool', 'NAME': 'distribuidora_db', 'USER': 'root',
+            'POOL': {'MINIMO': 0, 'MAXIMO': 2, 'ESPERA_MAXIMA': 0.05, 'VERIFICAR': True},
+        }
+        connections.settings['pool'] = connections.configure_settings(
+            {DEFAULT_DB_ALIAS: {}, 'pool': configuracion}
+        )['pool']
+        # Como en ReplicasTest: el runner no debe preparar esta base
+        cls.databases = {'pool'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del connections.settings['pool']
+
+    def setUp(self):
+        self.driver = MySQLdbPrueba()
+        # Al salir se quitan también los módulos del backend importados con el driver de prueba
+        modulos = mock.patch.dict(sys.modules, self.driver.modulos())
+        modulos.start()
+        self.addCleanup(modulos.stop)
+        self.conexion = connections['pool']
+        self.addCleanup(self.quitar_conexion)
+
+    def quitar_conexion(self):
+        self.conexion.close_pool()
+        del connections['pool']
+
+    def test_obtiene_y_devuelve_por_connections(self):
+        self.conexion.ensure_connection()
+        cruda = self.conexion.connection
+        self.assertEqual(self.conexion.pool.estado()['en_uso'], 1)
+        self.assertEqual(cruda.parametros['database'], 'distribuidora_db')
+
+        self.conexion.close()
+        self.assertIsNone(self.conexion.connection)
+        cruda.close.assert_not_called()
+        self.assertEqual(self.conexion.pool.estado(), {'libres': 1, 'en_uso': 0, 'esperando': 0, 'maximo': 2})
+
+        # La siguiente conexión del hilo sale del pool, verificada con ping()
+        self.conexion.ensure_connection()
+        self.assertIs(self.conexion.connection, cruda)
+        cruda.ping.assert_called()
+        self.assertEqual(self.driver.connect.call_count, 1)
+        self.conexion.close()
+
+    def test_cerrada_dentro_de_atomic_se_revierte(self):
+        with transaction.atomic(using='pool'):
+            cruda = self.conexion.connection
+            self.conexion.close()
+            cruda.rollback.assert_called_once()
+            self.assertEqual(self.conexion.pool.estado()['libres'], 1)
+        cruda.close.assert_not_called()
+
+        # Si el rollback falla, la conexión se descarta en vez de volver al pool
+        with transaction.atomic(using='pool'):
+            cruda = self.conexion.connection
+            cruda.rollback.side_effect = MySQLdbPrueba.OperationalError('Conexión perdida')
+            self.conexion.close()
+        cruda.close.assert_called_once()
+        self.assertEqual(self.conexion.pool.estado()['libres'], 0)
+
+    def test_cambio_de_base_reemplaza_el_pool(self):
+        pool = self.conexion.pool
+        self.assertIs(self.conexion.pool, pool)
+        self.conexion.ensure_connection()
+        self.conexion.close()
+
+        # Como al crear la base de pruebas
+        self.addCleanup(self.conexion.settings_dict.__setitem__, 'NAME', 'distribuidora_db')
+        self.conexion.settings_dict['NAME'] = 'test_distribuidora_db'
+        nuevo = self.conexion.pool
+        self.assertIsNot(nuevo, pool)
+        self.assertEqual(pool.estado()['libres'], 0)
+        self.driver.abiertas[0].close.assert_called_once()
+
+        self.conexion.ensure_connection()
+        self.assertEqual(self.conexion.connection.parametros['database'], 'test_distribuidora_db')
+        self.assertEqual(nuevo.estado()['en_uso'], 1)
+        self.conexion.close()
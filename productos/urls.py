@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -17,6 +18,22 @@ router.register(r'proveedores', ProveedorViewSet, basename='proveedor')
 router.register(r'productos', ProductoViewSet, basename='producto')
 router.register(r'productos-proveedores', ProductoProveedorViewSet, basename='productoproveedor')
 
+# Lecturas asíncronas bajo ASGI (ver productos/asincrono.py); van antes del
+# router y atienden las mismas rutas (pk entero: facetas/, export/, etc. siguen en
+# el router)
+LISTADO = {'get': 'list', 'post': 'create'}
+DETALLE = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+rutas_async = [
+    path('productos/', ProductoViewSet.as_vista_async(LISTADO)),
+    path('productos/<int:pk>/', ProductoViewSet.as_vista_async(DETALLE)),
+    path('productos/<int:pk>/proveedores/', ProductoViewSet.as_vista_async({'get': 'proveedores'})),
+    path('proveedores/departamentos/', ProveedorViewSet.as_vista_async({'get': 'departamentos'})),
+    path('proveedores/', ProveedorViewSet.as_vista_async(LISTADO)),
+    path('proveedores/<int:pk>/', ProveedorViewSet.as_vista_async(DETALLE)),
+    path('tipos-producto/', TipoProductoViewSet.as_vista_async(LISTADO)),
+    path('tipos-producto/<int:pk>/', TipoProductoViewSet.as_vista_async(DETALLE)),
+]
+
 urlpatterns = [
     # Frontend URLs
     path('', producto_list, name='producto_list'),
@@ -24,5 +41,6 @@ urlpatterns = [
     path('editar/<int:pk>/', producto_edit, name='producto_edit'),
     
     # API URLs
+    *([path('api/', include(rutas_async))] if settings.PRODUCTOS_VISTAS_ASYNC else []),
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,8 +1,31 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Exists, OuterRef
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils.http import urlencode
+import hashlib
+from distribuidora.metricas import registrar_cache
 from .models import TipoProducto, Proveedor, Producto, ProductoProveedor
+from .asincrono import LecturaAsyncMixin, en_lista, en_paralelo
+from .alta_masiva import AltaMasivaProductos, ErrorAltaMasiva
+from .busqueda import BusquedaProductoFilter
+from .cache_respuestas import CacheRespuestaMixin, estadisticas as estadisticas_cache
+from .campos import CamposDispersosMixin
+from .condicional import GetCondicionalMixin
+from .exportacion import EXPORTADORES, FORMATOS as FORMATOS_EXPORTACION, filas_catalogo
+from .facetas import RANGOS_COSTO, calcular_facetas, parsear_rangos
+from .importacion import LOTE_MAXIMO, ErrorImportacion, ImportadorCatalogo, detectar_formato, leer_filas
+from .listado_rapido import ListadoRapidoMixin
+from .lista_precios import ErrorListaPrecios, ListaPrecios
+from .pagination import ProductoCursorPagination
+from .referencia import (
+    CONJUNTOS as CONJUNTOS_REFERENCIA, DatosReferenciaMixin, acalcular as calcular_referencia,
+    arespuesta_referencia, respuesta_referencia, versiones
+)
 from .serializers import (
     TipoProductoSerializer,
     ProveedorSerializer,
@@ -13,10 +36,12 @@ from .serializers import (
 )
 
 
-class TipoProductoViewSet(viewsets.ModelViewSet):
+class TipoProductoViewSet(DatosReferenciaMixin, GetCondicionalMixin, CamposDispersosMixin, LecturaAsyncMixin,
+                          viewsets.ModelViewSet):
     """
     ViewSet para gestionar Tipos de Producto
     """
+    conjunto_referencia = 'tipos_producto'
     queryset = TipoProducto.objects.all()
     serializer_class = TipoProductoSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -38,10 +63,12 @@ class TipoProductoViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ProveedorViewSet(viewsets.ModelViewSet):
+class ProveedorViewSet(DatosReferenciaMixin, GetCondicionalMixin, CamposDispersosMixin, LecturaAsyncMixin,
+                       viewsets.ModelViewSet):
     """
     ViewSet para gestionar Proveedores
     """
+    conjunto_referencia = 'proveedores'
     queryset = Proveedor.objects.all()
     serializer_class = ProveedorSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -53,17 +80,42 @@ class ProveedorViewSet(viewsets.ModelViewSet):
     def departamentos(self, request):
         """
         Endpoint para obtener la lista de departamentos únicos
-        GET /api/proveedores/departamentos/
+        GET /api/proveedores/departamentos/?v=<version>
+        """
+        if request.accepted_renderer.format == 'json':
+            return respuesta_referencia(request, 'departamentos')
+        return Response(CONJUNTOS_REFERENCIA['departamentos']())
+
+    async def adepartamentos(self, request):
+        if request.accepted_renderer.format == 'json':
+            return await arespuesta_referencia(request, 'departamentos')
+        return Response(await calcular_referencia('departamentos'))
+
+    @action(detail=True, methods=['post'])
+    def lista_precios(self, request, pk=None):
+        """
+        Endpoint para cargar la lista de precios completa de un proveedor
+        POST /api/proveedores/{id}/lista_precios/
+        Body: {
+            "lineas": [
+                {"clave_proveedor": "ABC123", "clave": "PROD-001", "costo": 100.50, "activo": true}
+            ],
+            "desactivar_faltantes": false
+        }
         """
-        departamentos = Proveedor.objects.exclude(
-            departamento__isnull=True
-        ).exclude(
-            departamento__exact=''
-        ).values_list('departamento', flat=True).distinct().order_by('departamento')
+        proveedor = self.get_object()
+        # También se acepta la lista de líneas directamente como cuerpo
+        datos = request.data if isinstance(request.data, dict) else {'lineas': request.data}
         
-        return Response({
-            'departamentos': list(departamentos)
-        })
+        try:
+            resumen = ListaPrecios(proveedor).aplicar(
+                datos.get('lineas'),
+                desactivar_faltantes=bool(datos.get('desactivar_faltantes', False))
+            )
+        except ErrorListaPrecios as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(resumen)
 
     def destroy(self, request, *args, **kwargs):
         """Elimina un proveedor si no tiene productos asociados"""
@@ -79,17 +131,19 @@ class ProveedorViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(CacheRespuestaMixin, ListadoRapidoMixin, GetCondicionalMixin, CamposDispersosMixin,
+                      LecturaAsyncMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar Productos
     """
     queryset = Producto.objects.select_related('tipo_producto').prefetch_related(
         'producto_proveedores__proveedor'
     )
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['clave', 'nombre']
+    filter_backends = [BusquedaProductoFilter, filters.OrderingFilter]
     ordering_fields = ['clave', 'nombre', 'fecha_creacion']
     ordering = ['clave']
+    pagination_class = ProductoCursorPagination
+    dependencias_validacion = (TipoProducto, Proveedor)
 
     def get_serializer_class(self):
         """Retorna el serializer apropiado según la acción"""
@@ -105,10 +159,15 @@ class ProductoViewSet(viewsets.ModelViewSet):
         """
         queryset = super().get_queryset()
         
-        # Filtro por clave
+        if self.action in ('list', 'proveedores'):
+            # El listado lee el resumen desnormalizado y la acción proveedores
+            # consulta sus propias relaciones; no necesitan el prefetch
+            queryset = queryset.prefetch_related(None)
+        
+        # Filtro por clave (prefijo, para aprovechar el índice)
         clave = self.request.query_params.get('clave', None)
         if clave:
-            queryset = queryset.filter(clave__icontains=clave)
+            queryset = queryset.filter(clave__istartswith=clave)
         
         # Filtro por tipo de producto
         tipo_producto = self.request.query_params.get('tipo_producto', None)
@@ -124,6 +183,13 @@ class ProductoViewSet(viewsets.ModelViewSet):
         costo_min = self.request.query_params.get('costo_min', None)
         costo_max = self.request.query_params.get('costo_max', None)
         
+        # Semi-joins (EXISTS) sobre proveedores activos: no multiplican filas,
+        # no requieren DISTINCT y usan el índice (producto_id, activo, costo)
+        proveedores_activos = ProductoProveedor.objects.filter(
+            producto=OuterRef('pk'),
+            activo=True
+        )
+        
         if costo_min is not None or costo_max is not None:
             # Construir filtros para el rango de costos
             costo_filters = Q()
@@ -131,30 +197,29 @@ class ProductoViewSet(viewsets.ModelViewSet):
             if costo_min is not None:
                 try:
                     costo_min_val = float(costo_min)
-                    costo_filters &= Q(producto_proveedores__costo__gte=costo_min_val)
+                    costo_filters &= Q(costo__gte=costo_min_val)
                 except (ValueError, TypeError):
                     pass
             
             if costo_max is not None:
                 try:
                     costo_max_val = float(costo_max)
-                    costo_filters &= Q(producto_proveedores__costo__lte=costo_max_val)
+                    costo_filters &= Q(costo__lte=costo_max_val)
                 except (ValueError, TypeError):
                     pass
             
             if costo_filters:
                 # Filtrar productos que tengan al menos un proveedor activo dentro del rango de costos
                 queryset = queryset.filter(
-                    costo_filters & Q(producto_proveedores__activo=True)
-                ).distinct()
+                    Exists(proveedores_activos.filter(costo_filters))
+                )
         
         # Filtro por departamento de proveedor
         departamento = self.request.query_params.get('departamento', None)
         if departamento:
             queryset = queryset.filter(
-                producto_proveedores__proveedor__departamento=departamento,
-                producto_proveedores__activo=True
-            ).distinct()
+                Exists(proveedores_activos.filter(proveedor__departamento=departamento))
+            )
         
         return queryset
 
@@ -165,10 +230,20 @@ class ProductoViewSet(viewsets.ModelViewSet):
         GET /api/productos/{id}/proveedores/
         """
         producto = self.get_object()
-        proveedores = producto.producto_proveedores.filter(activo=True)
+        proveedores = producto.producto_proveedores.filter(activo=True).select_related('proveedor')
         serializer = ProductoProveedorSerializer(proveedores, many=True)
         return Response(serializer.data)
 
+    async def aproveedores(self, request, pk=None):
+        # El producto (para el 404) y sus proveedores se consultan a la vez;
+        # la subconsulta aplica a los proveedores los mismos filtros del producto
+        queryset = self.filtro_objeto(await self.afilter_queryset(self.get_queryset()))
+        proveedores = ProductoProveedor.objects.filter(
+            producto__in=queryset.values('pk'), activo=True
+        ).select_related('proveedor')
+        _, proveedores = await en_paralelo(self.aget_object(queryset), en_lista(proveedores))
+        return Response(ProductoProveedorSerializer(proveedores, many=True).data)
+
     @action(detail=True, methods=['post'])
     def agregar_proveedor(self, request, pk=None):
         """
@@ -223,6 +298,124 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Endpoint para crear varios productos con sus proveedores
+        POST /api/productos/bulk/?parcial=true
+        Body: [
+            {
+                "clave": "PROD-001", "nombre": "Producto", "tipo_producto": 1,
+                "proveedores": [{"proveedor": 1, "clave_proveedor": "ABC123", "costo": 100.50}]
+            }
+        ]
+        Sin ``parcial`` cualquier error cancela toda la carga.
+        """
+        elementos = request.data.get('productos') if isinstance(request.data, dict) else request.data
+        parcial = request.query_params.get('parcial', '').lower() in ('1', 'true')
+        
+        try:
+            resultado = AltaMasivaProductos(parcial=parcial).procesar(elementos)
+        except ErrorAltaMasiva as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not resultado['creados'] and resultado['errores']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def importar(self, request):
+        """
+        Endpoint para importar productos y costos de proveedores desde CSV o XLSX
+        POST /api/productos/importar/
+        Form-data: archivo=<archivo>, formato=csv|xlsx (opcional), lote=1000 (opcional)
+        """
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            return Response(
+                {'error': 'Debe enviar el archivo en el campo "archivo"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            tamano_lote = int(request.data.get('lote', 1000))
+        except (ValueError, TypeError):
+            tamano_lote = 0
+        if not 1 <= tamano_lote <= LOTE_MAXIMO:
+            return Response(
+                {'error': f'El lote debe ser un número entre 1 y {LOTE_MAXIMO}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            formato = request.data.get('formato') or detectar_formato(archivo.name)
+            importador = ImportadorCatalogo(tamano_lote=tamano_lote)
+            resumen = importador.importar(leer_filas(archivo, formato))
+        except ErrorImportacion as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(resumen)
+
+    @action(detail=False, methods=['get'])
+    def facetas(self, request):
+        """
+        Endpoint para obtener conteos por tipo, departamento, estado y rango de costo
+        GET /api/productos/facetas/?rangos_costo=100,500,1000
+        Acepta los mismos filtros que el listado.
+        """
+        rangos = RANGOS_COSTO
+        if 'rangos_costo' in request.query_params:
+            rangos = parsear_rangos(request.query_params['rangos_costo'])
+            if rangos is None:
+                return Response(
+                    {'error': 'rangos_costo debe ser una lista de números separados por coma'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        ttl = getattr(settings, 'PRODUCTOS_FACETAS_CACHE_TTL', 0)
+        if ttl:
+            parametros = urlencode(sorted(request.query_params.lists()), doseq=True)
+            cache_key = 'productos:facetas:' + hashlib.md5(parametros.encode()).hexdigest()
+            datos = cache.get(cache_key)
+            registrar_cache('facetas', acierto=datos is not None)
+            if datos is None:
+                datos = calcular_facetas(self.filter_queryset(self.get_queryset()), rangos)
+                cache.set(cache_key, datos, ttl)
+        else:
+            datos = calcular_facetas(self.filter_queryset(self.get_queryset()), rangos)
+        
+        return Response(datos)
+
+    @action(detail=False, methods=['get'], url_path='cache')
+    def cache_respuestas(self, request):
+        """
+        Endpoint con los contadores de aciertos y fallos del cache de respuestas
+        GET /api/productos/cache/
+        """
+        return Response(estadisticas_cache())
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def exportar(self, request):
+        """
+        Endpoint para descargar el catálogo producto × proveedor como flujo
+        GET /api/productos/export/?formato=csv|ndjson|xlsx
+        Acepta los mismos filtros que el listado.
+        """
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in EXPORTADORES:
+            return Response(
+                {'error': f'Formato no soportado. Use: {", ".join(EXPORTADORES)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        productos = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            EXPORTADORES[formato](filas_catalogo(productos)),
+            content_type=FORMATOS_EXPORTACION[formato]
+        )
+        response['Content-Disposition'] = f'attachment; filename="catalogo.{formato}"'
+        return response
+
     def destroy(self, request, *args, **kwargs):
         """Elimina un producto y sus relaciones"""
         instance = self.get_object()
@@ -233,7 +426,8 @@ class ProductoViewSet(viewsets.ModelViewSet):
         )
 
 
-class ProductoProveedorViewSet(viewsets.ModelViewSet):
+class ProductoProveedorViewSet(CacheRespuestaMixin, ListadoRapidoMixin, GetCondicionalMixin, CamposDispersosMixin,
+                               viewsets.ModelViewSet):
     """
     ViewSet para gestionar la relación Producto-Proveedor
     """
@@ -242,6 +436,7 @@ class ProductoProveedorViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['costo', 'fecha_creacion']
     ordering = ['producto__clave']
+    dependencias_validacion = (Proveedor,)
 
     def get_queryset(self):
         """Filtra por producto o proveedor si se especifica"""
@@ -264,13 +459,16 @@ from django.views.decorators.http import require_http_methods
 
 def producto_list(request):
     """Vista para listar productos"""
-    return render(request, 'productos/producto_list.html')
+    return render(request, 'productos/producto_list.html', {
+        'versiones': versiones()
+    })
 
 
 def producto_create(request):
     """Vista para crear un producto"""
     return render(request, 'productos/producto_form.html', {
-        'modo': 'crear'
+        'modo': 'crear',
+        'versiones': versiones()
     })
 
 
@@ -280,5 +478,6 @@ def producto_edit(request, pk):
     producto = get_object_or_404(Producto, pk=pk)
     return render(request, 'productos/producto_form.html', {
         'modo': 'editar',
-        'producto_id': pk
+        'producto_id': pk,
+        'versiones': versiones()
     })
\ No newline at end of file